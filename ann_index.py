@@ -0,0 +1,126 @@
+"""Approximate neighbor search for large catalogs (NEIGHBOR_MODE=ann).
+
+Candidates come from the TF-IDF inverted index (term -> movies postings): a
+query keeps only its ANN_QUERY_TERMS highest-weighted terms, and one sparse
+product with the postings gives a partial cosine score for every movie that
+shares one of them. The ANN_CANDIDATES best partial scores per query are
+rescored exactly, so returned scores are true TF-IDF cosines and only recall
+is approximate. More terms / candidates: higher recall, more work per query.
+
+Pick the two settings with benchmarks/bench_ann.py, which reports recall@K
+and latency against the exact neighbors.
+"""
+import os
+
+import numpy as np
+from scipy import sparse
+
+from neighbors import BUILD_WORKERS, parallel_search, search_neighbors, top_k_rows
+
+ANN_QUERY_TERMS = int(os.getenv("ANN_QUERY_TERMS", "8"))
+ANN_CANDIDATES = int(os.getenv("ANN_CANDIDATES", "500"))
+
+BLOCK_SIZE = 512
+
+
+def prune_rows(matrix, max_terms):
+    """Copy of a CSR matrix keeping the max_terms largest entries of each row"""
+    matrix = sparse.csr_matrix(matrix)
+    counts = np.diff(matrix.indptr)
+    if counts.max(initial=0) <= max_terms:
+        return matrix
+    rows = np.repeat(np.arange(matrix.shape[0]), counts)
+    order = np.lexsort((-matrix.data, rows))
+    rank = np.arange(len(order)) - matrix.indptr[rows[order]]
+    keep = np.sort(order[rank < max_terms])
+    indptr = np.concatenate([[0], np.cumsum(np.minimum(counts, max_terms))])
+    return sparse.csr_matrix((matrix.data[keep], matrix.indices[keep], indptr), shape=matrix.shape)
+
+
+def recall_at_k(approx_scores, exact_scores):
+    """Mean share of approximate results that are true top-K neighbors.
+
+    Tie-aware: a result counts if its exact score reaches the K-th exact
+    score, so returning one of several equally similar movies isn't a miss.
+    """
+    kth = exact_scores[:, -1:]
+    return float(np.mean(approx_scores >= kth - 1e-6))
+
+
+def sample_recall(neighbor_scores, tfidf_matrix, sample=200, seed=42):
+    """recall_at_k of precomputed neighbor tables on a random sample of rows"""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(tfidf_matrix.shape[0], min(sample, tfidf_matrix.shape[0]), replace=False)
+    _, exact_scores = search_neighbors(tfidf_matrix[rows], tfidf_matrix, neighbor_scores.shape[1])
+    return recall_at_k(np.asarray(neighbor_scores[rows]), exact_scores)
+
+
+class AnnIndex:
+    """Term -> movies postings of a TF-IDF matrix (its transpose, in CSR)."""
+
+    def __init__(self, postings, query_terms=ANN_QUERY_TERMS, candidates=ANN_CANDIDATES):
+        self.postings = postings
+        self.query_terms = query_terms
+        self.candidates = candidates
+
+    @classmethod
+    def build(cls, tfidf_matrix, query_terms=ANN_QUERY_TERMS, candidates=ANN_CANDIDATES):
+        return cls(sparse.csr_matrix(tfidf_matrix.T), query_terms, candidates)
+
+    def arrays(self):
+        """Arrays to persist (see model_store.save_model)"""
+        return {
+            'postings_data': self.postings.data,
+            'postings_indices': self.postings.indices,
+            'postings_indptr': self.postings.indptr,
+        }
+
+    def _candidate_block(self, queries, min_width):
+        """(Q x width >= min_width) candidate rows per query, ascending, padded with -1"""
+        partial = (prune_rows(queries, self.query_terms) @ self.postings).tocsr()
+        counts = np.diff(partial.indptr)
+        width = max(min_width, min(self.candidates, counts.max(initial=0)))
+        candidates = np.full((queries.shape[0], width), -1, dtype=np.int64)
+        for i in range(queries.shape[0]):
+            start, stop = partial.indptr[i], partial.indptr[i + 1]
+            rows = partial.indices[start:stop]
+            if len(rows) > width:
+                rows = rows[np.argpartition(-partial.data[start:stop], width - 1)[:width]]
+            candidates[i, :len(rows)] = np.sort(rows)
+        return candidates
+
+    def search(self, queries, tfidf_matrix, k, block_size=BLOCK_SIZE):
+        """Approximate search_neighbors(): same arguments, shapes and ordering"""
+        queries = sparse.csr_matrix(queries)
+        n_queries = queries.shape[0]
+        width = min(k, tfidf_matrix.shape[0])
+        neighbor_ids = np.empty((n_queries, width), dtype=np.int32)
+        neighbor_scores = np.empty((n_queries, width), dtype=np.float32)
+
+        for start in range(0, n_queries, block_size):
+            block = queries[start:start + block_size]
+            candidates = self._candidate_block(block, width)
+            found = candidates >= 0
+
+            # Exact cosine for each (query, candidate) pair
+            pairs = np.nonzero(found)
+            exact = block[pairs[0]].multiply(tfidf_matrix[candidates[found]]).sum(axis=1)
+            sims = np.full(candidates.shape, -np.inf)
+            sims[found] = np.asarray(exact).ravel()
+
+            # Candidates are ascending, so ties still go to the lower row id
+            top, scores = top_k_rows(sims, width)
+            ids = np.take_along_axis(candidates, top, axis=1)
+            neighbor_ids[start:start + len(ids)], neighbor_scores[start:start + len(ids)] = ids, scores
+
+            # Queries sharing no term with enough movies: fall back to exact
+            short = np.flatnonzero(found.sum(axis=1) < width)
+            if len(short):
+                rows = start + short
+                neighbor_ids[rows], neighbor_scores[rows] = search_neighbors(block[short], tfidf_matrix, width)
+
+        return neighbor_ids, neighbor_scores
+
+    def neighbor_tables(self, tfidf_matrix, k=50, workers=BUILD_WORKERS):
+        """Approximate neighbors.build_neighbor_index(): (N, k + 1) ids and scores"""
+        return parallel_search(self.search, tfidf_matrix, tfidf_matrix, k + 1, workers)
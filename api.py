@@ -1,13 +1,29 @@
+import hashlib
+import hmac
 import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
 
-from flask import Flask, jsonify, request, send_from_directory, render_template_string, Response
+# Startup profile (STARTUP_PROFILE=1): the 'imports' phase is the imports below
+_imports_started = time.perf_counter()
+
+from flask import Flask, g, has_request_context, jsonify, request, send_from_directory, Response
 from flask_cors import CORS
-import pandas as pd
-import difflib
-import requests
-import re
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import linear_kernel
+
+import metrics
+from cache import MISSING, TTLCache
+from catalog import Catalog
+from catalog_updates import add_movies, refit_due
+from memstats import process_memory, report as report_memory
+from model_store import DEFAULT_CSV_PATH, load_model, load_or_build, phase, read_manifest, record_phase
+from posters import PosterResolver
+from search_index import SORTS, decode_cursor, encode_cursor
+
+record_phase('imports', time.perf_counter() - _imports_started)
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend
@@ -15,32 +31,73 @@ CORS(app)  # Enable CORS for frontend
 # TMDB API Configuration (override via env TMDB_API_KEY)
 TMDB_API_KEY = os.getenv("TMDB_API_KEY", "973eac1c6ee5c0af02fd6281ff2bb30b")
 
-# Simple in-memory cache to avoid repeated TMDB calls during a session
-poster_cache = {}
-
-# Load and prepare data
-print("Loading movie data...")
-df = pd.read_csv('movies_clean.csv')
-df['overview'] = df['overview'].fillna('')
-df['genres'] = df['genres'].fillna('')
-df['keywords'] = df['keywords'].fillna('')
-
-# Create soup
-df['soup'] = df['overview'] + ' ' + df['genres'] + ' ' + df['keywords']
-
-# Build TF-IDF matrix
-print("Building TF-IDF matrix...")
-tfidf = TfidfVectorizer(stop_words='english')
-tfidf_matrix = tfidf.fit_transform(df['soup'])
-
-# Compute cosine similarity
-print("Computing cosine similarity...")
-cosine_sim = linear_kernel(tfidf_matrix, tfidf_matrix)
-
-# Create indices
-indices = pd.Series(df.index, index=df['original_title']).drop_duplicates()
-
-print("✅ Model ready!")
+# Number of precomputed neighbors kept per movie (upper bound for n in recommendations)
+TOP_K_NEIGHBORS = int(os.getenv("TOP_K_NEIGHBORS", "50"))
+
+# Limits for POST /api/recommend/batch
+MAX_BATCH_SEEDS = 300
+MAX_BATCH_N = 100
+
+# Directory of the persisted model artifact built by `python model_store.py`
+MODEL_DIR = os.getenv("MODEL_DIR", "model_artifact")
+
+# Catalog updates (see catalog_updates.py): POST /api/admin/movies needs this
+# bearer token (disabled when unset); workers check the artifact for a newer
+# version every CATALOG_POLL_INTERVAL seconds, and patched-in updates trigger a
+# full refit once the last fit is CATALOG_REFIT_INTERVAL seconds old (0 = never)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+MAX_ADMIN_MOVIES = 1000
+CATALOG_POLL_INTERVAL = float(os.getenv("CATALOG_POLL_INTERVAL", "30"))
+CATALOG_REFIT_INTERVAL = float(os.getenv("CATALOG_REFIT_INTERVAL", "86400"))
+
+# When the model is loaded: 'eager' (at import, before serving; gunicorn
+# preloads it once for all workers), 'background' (a thread loads it while the
+# server already accepts connections) or 'lazy' (on the first request that
+# needs it). Until then /api/ready and model-backed endpoints answer 503.
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "eager")
+WARMUP_MODES = ('eager', 'background', 'lazy')
+
+# Served without a loaded model (liveness, readiness, metrics, static files)
+NO_MODEL_ENDPOINTS = {'health', 'ready', 'prometheus_metrics', 'home', 'serve_css', 'serve_js', 'static'}
+
+# Server-side response cache (LRU + expiry, see cache.py): title resolutions,
+# recommendation lists (posters are added per request from the poster cache)
+# and serialized GET responses, keyed by model version so a new catalog never
+# serves old entries. Serialized responses with a poster still missing expire
+# after RESPONSE_CACHE_RETRY seconds so it can be filled in. After each
+# (re)load every worker prefills recommendations for the RESPONSE_CACHE_WARM
+# most searched titles (the most popular ones before any search history).
+RESPONSE_CACHE_ENTRIES = int(os.getenv("RESPONSE_CACHE_ENTRIES", "5000"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_RETRY = 60
+RESPONSE_CACHE_WARM = int(os.getenv("RESPONSE_CACHE_WARM", "100"))
+RESPONSE_MAX_AGE = 300  # Cache-Control max-age of cached GET responses
+MAX_TRACKED_SEARCHES = 10000
+
+# Request metrics, served in Prometheus format on /metrics (see metrics.py)
+metrics.describe('http_request_seconds', 'Request latency by endpoint, method and status')
+metrics.describe('request_stage_seconds', 'Time spent in each stage of a request, by endpoint')
+metrics.describe('title_resolutions_total', 'Title lookups by how they were resolved, by endpoint')
+metrics.describe('response_cache_total', 'Response cache lookups by kind and result')
+
+# Poster lookups: memory + on-disk cache, pooled concurrent TMDB fetches (see posters.py)
+poster_resolver = PosterResolver(TMDB_API_KEY)
+poster_cache = poster_resolver.memory
+
+response_cache = TTLCache(RESPONSE_CACHE_ENTRIES, RESPONSE_CACHE_TTL)
+# Matched title -> times recommended (this process), for the cache warm-up
+search_counts = Counter()
+_search_counts_lock = threading.Lock()
+
+# Everything served for the current model version (see catalog.py); None
+# until load_catalog() has run. Replaced as a whole when the catalog is
+# updated; handlers read it once per request.
+catalog = None
+_swap_lock = threading.Lock()
+_load_lock = threading.Lock()
+load_state = {'status': 'loading', 'error': None, 'seconds': None}
+_warmup_thread = None
+_jobs_pid = None  # process that started the catalog jobs
 
 # Serve WordCloud image; generate on-the-fly if file is missing
 @app.route('/chart_wordcloud.png')
@@ -63,6 +120,8 @@ def serve_wordcloud_png():
             return '', 404
 
         # Use movie titles and keywords for the cloud
+        import pandas as pd
+        df = catalog.df
         titles = ' '.join(df['original_title'].astype(str).tolist())
         keywords_col = df.get('keywords', '')
         if isinstance(keywords_col, pd.Series):
@@ -77,55 +136,289 @@ def serve_wordcloud_png():
     except Exception:
         return '', 404
 
-def fetch_poster(movie_id):
-    """Fetch movie poster from TMDB API with basic caching"""
-    if movie_id in poster_cache:
-        return poster_cache[movie_id]
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
 
-    if not TMDB_API_KEY:
+@app.before_request
+def require_catalog():
+    if catalog is not None or request.endpoint in NO_MODEL_ENDPOINTS:
         return None
+    if app.config.get('MODEL_WARMUP') == 'lazy':
+        try:
+            load_catalog()
+            return None
+        except Exception:
+            pass
+    response = jsonify({'error': 'Model is not loaded yet; retry shortly', 'status': load_state['status']})
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
+
+@app.after_request
+def record_request(response):
+    start = g.get('request_start')
+    if start is not None:
+        metrics.observe('http_request_seconds', time.perf_counter() - start,
+                        endpoint=request.endpoint or 'unmatched', method=request.method,
+                        status=response.status_code)
+    metrics.registry.flush()
+    return response
+
+def stage(name):
+    """Time a stage of the current request (or of the cache warm-up) into request_stage_seconds"""
+    endpoint = request.endpoint if has_request_context() else 'cache_warmup'
+    return metrics.timer('request_stage_seconds', endpoint=endpoint, stage=name)
+
+def count_resolution(match_type):
+    metrics.inc('title_resolutions_total', endpoint=request.endpoint, match=match_type or 'not_found')
 
-    try:
-        url = f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={TMDB_API_KEY}&language=en-US"
-        data = requests.get(url, timeout=5).json()
-        poster_path = data.get('poster_path')
-        if poster_path:
-            poster_cache[movie_id] = f"https://image.tmdb.org/t/p/w500{poster_path}"
+def fetch_poster(movie_id):
+    """Fetch movie poster from TMDB API (cached)"""
+    with stage('posters'):
+        return poster_resolver.resolve(movie_id)
+
+def fetch_posters(movie_ids):
+    """Fetch posters for many movies concurrently; returns {movie_id: url or None}"""
+    with stage('posters'):
+        return poster_resolver.resolve_many(movie_ids)
+
+def movie_cards(cat, rows, scores=None, posters=None):
+    """Serialize movies (by row) with their posters fetched in one batch"""
+    store = cat.movies_store
+    if posters is None:
+        posters = fetch_posters(store.ids[rows])
+    if scores is None:
+        scores = [None] * len(rows)
+    with stage('cards'):
+        return [
+            store.card(row, posters[int(store.ids[row])], score)
+            for row, score in zip(rows, scores)
+        ]
+
+def neighbors_for_rows(cat, seed_rows, n):
+    """[(neighbor rows, rounded scores)] for each seed row, excluding the seed itself.
+
+    Served from the precomputed neighbor tables when n fits in them; otherwise
+    all seeds are scored in one blocked sparse product against tfidf_matrix.
+    """
+    with stage('neighbors'):
+        if n < cat.neighbor_ids.shape[1]:
+            ids, scores = cat.neighbor_ids[seed_rows], cat.neighbor_scores[seed_rows]
         else:
-            poster_cache[movie_id] = None
-    except Exception:
-        poster_cache[movie_id] = None
-
-    return poster_cache[movie_id]
-
-def get_recommendations(title, n=5):
-    """Get movie recommendations with similarity score"""
-    if title not in indices:
-        return None
-    
-    idx = indices[title]
-    # Ensure idx is scalar, not array
-    if hasattr(idx, '__len__'):
-        idx = idx.iloc[0] if hasattr(idx, 'iloc') else idx[0]
-    
-    sim_scores = list(enumerate(cosine_sim[int(idx)]))
-    sim_scores = sorted(sim_scores, key=lambda x: float(x[1]), reverse=True)
-    sim_scores = sim_scores[1:n+1]
-    
-    recommendations = []
-    for i, score in sim_scores:
-        movie_data = df.iloc[i]
-        recommendations.append({
-            'title': movie_data['original_title'],
-            'rating': round(float(movie_data['vote_average']), 1) if pd.notna(movie_data['vote_average']) else 'N/A',
-            'poster': fetch_poster(movie_data['id']),
-            'id': int(movie_data['id']),
-            'score': round(float(score), 4),
-            'genres': movie_data.get('genres', ''),
-            'overview': movie_data.get('overview', '')
-        })
-    
-    return recommendations
+            ids, scores = cat.search_neighbors(cat.tfidf_matrix[seed_rows], n + 1)
+
+        results = []
+        for seed, row_ids, row_scores in zip(seed_rows, ids, scores):
+            # Exclude the query movie by id, not by assuming it sits in column 0
+            keep = row_ids != seed
+            results.append((
+                row_ids[keep][:n].tolist(),
+                [round(score, 4) for score in row_scores[keep][:n].tolist()]
+            ))
+        return results
+
+def has_posters(payload):
+    """Whether every movie in a response payload (or list of cards) has its poster"""
+    movies = payload if isinstance(payload, list) else payload.get('movies', [payload])
+    return all(movie.get('poster') is not None for movie in movies)
+
+def cached(cat, key, build, complete=None):
+    """build() for key under cat's model version, from the response cache.
+
+    Values that complete(value) reports as incomplete expire after RESPONSE_CACHE_RETRY.
+    """
+    key = (cat.version,) + key
+    value = response_cache.get(key)
+    metrics.inc('response_cache_total', kind=key[1], result='miss' if value is MISSING else 'hit')
+    if value is MISSING:
+        value = build()
+        retry = complete is not None and not complete(value)
+        response_cache.set(key, value, ttl=RESPONSE_CACHE_RETRY if retry else None)
+    return value
+
+def conditional_json(version, etag_key, build, max_age=3600):
+    """JSON response with an ETag derived from the dataset version and etag_key.
+
+    Answers 304 without calling build() when the client already has it.
+    build() returns the payload, or a Response whose body is already serialized.
+    """
+    etag = version + '-' + hashlib.sha1(etag_key.encode('utf-8')).hexdigest()[:16]
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = build()
+        if not isinstance(response, Response):
+            response = jsonify(response)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response
+
+def cached_json(cat, key, build):
+    """GET response for key served as cached, pre-serialized JSON bytes.
+
+    The ETag hashes the body, so it changes when a missing poster is filled in.
+    """
+    def serialize():
+        payload = build()
+        body = app.json.response(payload).get_data()  # the bytes jsonify() would send
+        return body, hashlib.sha1(body).hexdigest(), has_posters(payload)
+
+    body, digest, _ = cached(cat, key, serialize, complete=lambda value: value[2])
+    return conditional_json(cat.version, digest, lambda: Response(body, mimetype=app.json.mimetype),
+                            max_age=RESPONSE_MAX_AGE)
+
+def recommendation_cards(cat, idx, n=5):
+    """Cards (without posters) for the movie at row idx followed by its n recommendations"""
+    store = cat.movies_store
+    rows, scores = neighbors_for_rows(cat, [cat.indices[store.titles[idx]]], n)[0]
+    exact_movie = store.card(idx, None, 1.0)
+    with stage('cards'):
+        recommendations = [store.card(row, None, score) for row, score in zip(rows, scores)]
+    # Put the matched movie at the top (moving it to the front if already present)
+    return [exact_movie] + [m for m in recommendations if m['title'] != exact_movie['title']]
+
+def with_posters(cards):
+    """Copies of cards with their posters filled in by one batched lookup"""
+    posters = fetch_posters([card['id'] for card in cards])
+    return [dict(card, poster=posters[card['id']]) for card in cards]
+
+def record_search(title):
+    with _search_counts_lock:
+        search_counts[title] += 1
+        if len(search_counts) > MAX_TRACKED_SEARCHES:
+            kept = search_counts.most_common(MAX_TRACKED_SEARCHES // 2)
+            search_counts.clear()
+            search_counts.update(dict(kept))
+
+def warm_response_cache(cat):
+    """Prefill the response cache with recommendations for the most searched titles.
+
+    Only neighbor lists are computed: posters are looked up when a request
+    is served, so the warm-up makes no TMDB calls.
+    """
+    with _search_counts_lock:
+        titles = [title for title, _ in search_counts.most_common(RESPONSE_CACHE_WARM)]
+    rows = list(dict.fromkeys(cat.indices[t] for t in titles if t in cat.indices))
+    # Then the most popular titles, as the title index ranks them
+    for row in cat.title_index.rank_to_row[:RESPONSE_CACHE_WARM].tolist():
+        if len(rows) >= RESPONSE_CACHE_WARM:
+            break
+        if row not in rows:
+            rows.append(row)
+    for row in rows:
+        if cat is not catalog:
+            return  # swapped out meanwhile; the new catalog gets its own warm-up
+        cached(cat, ('recommend', row), lambda: recommendation_cards(cat, row))
+
+def start_cache_warmup():
+    """Warm the response cache for the current catalog in a background thread"""
+    cat = catalog
+    if cat is not None and RESPONSE_CACHE_WARM > 0 and RESPONSE_CACHE_ENTRIES > 0:
+        threading.Thread(target=warm_response_cache, args=(cat,), name='cache-warmup', daemon=True).start()
+
+def swap_catalog(new_model):
+    """Build the lookup structures for new_model, then publish them in one assignment"""
+    global catalog
+    with phase('catalog'):
+        new_catalog = Catalog(new_model)
+    with _swap_lock:
+        # A concurrent reload may already have published something newer
+        if catalog is None or (new_catalog.built_at or 0) >= (catalog.built_at or 0):
+            catalog = new_catalog
+        return catalog
+
+def load_catalog():
+    """Load the model and publish its Catalog, once; returns the catalog being served.
+
+    Loads the prebuilt model artifact (see model_store.py); rebuilds from the
+    CSV only when the artifact is missing or was built from a different CSV /
+    update log. Concurrent callers wait for the first one.
+    """
+    with _load_lock:
+        if catalog is None:
+            start = time.perf_counter()
+            try:
+                swap_catalog(load_or_build(DEFAULT_CSV_PATH, MODEL_DIR, k=TOP_K_NEIGHBORS))
+            except Exception as e:
+                load_state.update(status='failed', error=str(e))
+                raise
+            load_state.update(status='ready', error=None, seconds=round(time.perf_counter() - start, 3))
+            print("✅ Model ready!")
+            report_memory("model loaded")
+            if app.config.get('MODEL_WARMUP') != 'eager':
+                # Loaded in the serving process itself (not a gunicorn master about to fork)
+                start_cache_warmup()
+    return catalog
+
+def _warm_up():
+    try:
+        load_catalog()
+    except Exception as e:
+        print(f"❌ Model load failed: {e}")
+
+def start_warmup():
+    """Load the model in a background thread (no-op once it is loaded or loading)"""
+    global _warmup_thread
+    if catalog is None and (_warmup_thread is None or not _warmup_thread.is_alive()):
+        _warmup_thread = threading.Thread(target=_warm_up, name='model-warmup', daemon=True)
+        _warmup_thread.start()
+
+def configure_app(warmup=None):
+    """Set how the module's app loads the model: now, in the background or on first use (see MODEL_WARMUP).
+
+    Safe to call again: the model is loaded at most once and at most one
+    warm-up thread runs.
+    """
+    warmup = warmup or MODEL_WARMUP
+    if warmup not in WARMUP_MODES:
+        raise ValueError(f"MODEL_WARMUP must be one of: {', '.join(WARMUP_MODES)}")
+    app.config['MODEL_WARMUP'] = warmup
+    if warmup == 'eager':
+        load_catalog()
+    elif warmup == 'background':
+        start_warmup()
+    return app
+
+def reload_catalog():
+    """Swap in the artifact on disk if it is newer than the one being served"""
+    manifest = read_manifest(MODEL_DIR)
+    if catalog is None or manifest is None or manifest.get('built_at') == catalog.built_at:
+        return False
+    new_model = load_model(MODEL_DIR)
+    if new_model is None or new_model['k'] != TOP_K_NEIGHBORS:
+        return False
+    swap_catalog(new_model)
+    print(f"🔄 Catalog {catalog.version} loaded ({len(catalog.df)} movies, pid={os.getpid()})")
+    start_cache_warmup()
+    return True
+
+def _catalog_jobs():
+    while True:
+        time.sleep(CATALOG_POLL_INTERVAL)
+        try:
+            reload_catalog()
+            if CATALOG_REFIT_INTERVAL > 0 and refit_due(read_manifest(MODEL_DIR), CATALOG_REFIT_INTERVAL, time.time()):
+                # Separate process: the refit's memory is returned when it exits.
+                # Concurrent refits from other workers serialize on the artifact
+                # lock and find nothing left to do.
+                subprocess.run([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'catalog_updates.py'),
+                                'refit', '--csv', DEFAULT_CSV_PATH], check=False)
+                reload_catalog()
+        except Exception as e:
+            print(f"⚠️  Catalog refresh failed: {e}")
+
+def start_catalog_jobs():
+    """Start this process's background threads: response cache warm-up, and reloading
+    updated artifacts / running scheduled refits. Once per process."""
+    global _jobs_pid
+    if _jobs_pid == os.getpid():
+        return
+    _jobs_pid = os.getpid()
+    start_cache_warmup()
+    if CATALOG_POLL_INTERVAL > 0:
+        threading.Thread(target=_catalog_jobs, name='catalog-jobs', daemon=True).start()
 
 # ==========================================
 # API ENDPOINTS
@@ -176,132 +469,200 @@ def get_movies():
     limit = max(1, min(limit, 1000))
     offset = max(0, offset)
 
-    movies = df['original_title'].iloc[offset:offset + limit].tolist()
+    store = catalog.movies_store
+    movies = store.titles[offset:offset + limit]
     return jsonify({
         'movies': movies,
         'count': len(movies),
         'limit': limit,
         'offset': offset,
-        'total': len(df)
+        'total': len(store)
     })
 
+@app.route('/api/autocomplete', methods=['GET'])
+def autocomplete():
+    """Popularity-ranked title completions for a typed prefix"""
+    prefix = request.args.get('prefix', '').lstrip()
+    limit = request.args.get('limit', default=10, type=int)
+    limit = max(1, min(limit, 20))
+
+    cat = catalog
+    return conditional_json(
+        cat.version,
+        f'autocomplete:{limit}:{prefix}',
+        lambda: {'prefix': prefix, 'titles': cat.title_index.complete(prefix, limit)}
+    )
+
 @app.route('/api/recommend', methods=['POST'])
 def recommend():
     """Get movie recommendations"""
     data = request.get_json()
     movie_name = data.get('movie', '').strip()
-    matched_title = None
-    match_type = None
     
     if not movie_name:
         return jsonify({'error': 'Movie name is required'}), 400
     
-    # Try exact match first
-    recommendations = get_recommendations(movie_name, n=5)
-    exact_movie = None
-    if movie_name in indices:
-        idx = indices[movie_name]
-        movie_row = df.iloc[idx]
-        exact_movie = {
-            'title': movie_row['original_title'],
-            'rating': round(float(movie_row['vote_average']), 1) if pd.notna(movie_row['vote_average']) else 'N/A',
-            'poster': fetch_poster(movie_row['id']),
-            'id': int(movie_row['id']),
-            'score': 1.0,
-            'genres': movie_row.get('genres', ''),
-            'overview': movie_row.get('overview', '')
-        }
-        matched_title = movie_row['original_title']
-        match_type = 'exact'
+    # Resolve the title: exact, then case/accent-insensitive, then partial,
+    # else "did you mean" suggestions from the trigram index
+    cat = catalog
+    def resolve():
+        idx, match_type = cat.title_index.resolve(movie_name)
+        close = cat.title_index.suggest(movie_name, n=5, cutoff=0.3) if idx is None else None
+        return idx, match_type, close
+
+    with stage('resolve'):
+        idx, match_type, close = cached(cat, ('resolve', movie_name), resolve)
+    if idx is None:
+        count_resolution('fuzzy' if close else None)
+        # fallback: top-rated if still empty
+        if not close:
+            close = [cat.movies_store.titles[row] for row in cat.rankings.top(5)]
+        return jsonify({
+            'error': f'Movie "{movie_name}" not found in database',
+            'suggestions': close,
+            'suggestion': 'Try a suggested title',
+        }), 404
+
+    count_resolution(match_type)
+    idx = int(idx)
+    matched_title = cat.movies_store.titles[idx]
+    record_search(matched_title)
+    # The matched movie, then its recommendations; the same for every query resolving to it
+    recommendations = with_posters(cached(cat, ('recommend', idx), lambda: recommendation_cards(cat, idx)))
+
+    with stage('serialize'):
+        return jsonify({
+            'movie': movie_name,
+            'recommendations': recommendations,
+            'count': len(recommendations),
+            'base_title': matched_title,
+            'match_type': match_type
+        })
+
+@app.route('/api/recommend/batch', methods=['POST'])
+def recommend_batch():
+    """Recommendations for many seed titles in one request"""
+    data = request.get_json(silent=True) or {}
+    seeds = data.get('movies')
+    n = data.get('n', 5)
     
-    # If not found, try case-insensitive search
-    if recommendations is None:
-        matches = df[df['original_title'].str.lower() == movie_name.lower()]
-        if not matches.empty:
-            # Pick the one with highest vote_count to handle duplicates
-            best_match = matches.nlargest(1, 'vote_count').iloc[0]
-            movie_row = best_match
-            recommendations = get_recommendations(movie_row['original_title'], n=5)
-            exact_movie = {
-                'title': movie_row['original_title'],
-                'rating': round(float(movie_row['vote_average']), 1) if pd.notna(movie_row['vote_average']) else 'N/A',
-                'poster': fetch_poster(movie_row['id']),
-                'id': int(movie_row['id']),
-                'score': 1.0,
-                'genres': movie_row.get('genres', ''),
-                'overview': movie_row.get('overview', '')
-            }
-            matched_title = movie_row['original_title']
-            match_type = 'case-insensitive'
+    if not isinstance(seeds, list) or not seeds:
+        return jsonify({'error': '"movies" must be a non-empty list of titles'}), 400
+    if not all(isinstance(seed, str) for seed in seeds):
+        return jsonify({'error': '"movies" must contain only title strings'}), 400
+    if len(seeds) > MAX_BATCH_SEEDS:
+        return jsonify({'error': f'At most {MAX_BATCH_SEEDS} movies per batch'}), 400
+    if isinstance(n, bool) or not isinstance(n, int):
+        return jsonify({'error': '"n" must be an integer'}), 400
+    n = max(1, min(n, MAX_BATCH_N))
     
-    # If still not found, try partial match
-    if recommendations is None:
-        matches = df[df['original_title'].str.contains(movie_name, case=False, na=False)]
-        if not matches.empty:
-            # Pick the most popular match
-            top_match = matches.nlargest(1, 'vote_count').iloc[0]
-            recommendations = get_recommendations(top_match['original_title'], n=5)
-            matched_title = top_match['original_title']
-            match_type = 'partial'
-            
-            # Add the matched movie to results
-            exact_movie = {
-                'title': top_match['original_title'],
-                'rating': round(float(top_match['vote_average']), 1) if pd.notna(top_match['vote_average']) else 'N/A',
-                'poster': fetch_poster(top_match['id']),
-                'id': int(top_match['id']),
-                'score': 1.0,
-                'genres': top_match.get('genres', ''),
-                'overview': top_match.get('overview', '')
-            }
-        else:
-            # fuzzy suggestions using difflib
-            titles = df['original_title'].tolist()
-            close = difflib.get_close_matches(movie_name, titles, n=5, cutoff=0.3)
-            # fallback: top-rated if still empty
-            if not close:
-                close = df.nlargest(5, 'vote_average')['original_title'].tolist()
-            return jsonify({
-                'error': f'Movie "{movie_name}" not found in database',
-                'suggestions': close,
-                'suggestion': 'Try a suggested title',
-            }), 404
+    # Resolve every distinct seed once
+    cat = catalog
+    names = [seed.strip() for seed in seeds]
+    with stage('resolve'):
+        resolved = {name: cat.title_index.resolve(name) for name in dict.fromkeys(names) if name}
+    for _, match_type in resolved.values():
+        count_resolution(match_type)
+    seed_rows = list(dict.fromkeys(idx for idx, _ in resolved.values() if idx is not None))
+    neighbors = dict(zip(seed_rows, neighbors_for_rows(cat, seed_rows, n)))
     
-    if exact_movie:
-        # Put the exact movie at the top if not already present
-        titles = [m['title'] for m in recommendations]
-        if exact_movie['title'] not in titles:
-            recommendations = [exact_movie] + recommendations
-        else:
-            # move it to front
-            recommendations = [exact_movie] + [m for m in recommendations if m['title'] != exact_movie['title']]
+    # One deduplicated poster lookup for the whole batch
+    all_rows = {row for rows, _ in neighbors.values() for row in rows}
+    posters = fetch_posters(cat.movies_store.ids[sorted(all_rows)])
+    
+    results = []
+    for name in names:
+        idx, match_type = resolved.get(name, (None, None))
+        if idx is None:
+            results.append({'movie': name, 'error': f'Movie "{name}" not found in database'})
+            continue
+        rows, scores = neighbors[idx]
+        recommendations = movie_cards(cat, rows, scores, posters)
+        results.append({
+            'movie': name,
+            'base_title': cat.movies_store.titles[idx],
+            'match_type': match_type,
+            'recommendations': recommendations,
+            'count': len(recommendations)
+        })
+    
+    return jsonify({
+        'results': results,
+        'count': len(results),
+        'n': n
+    })
 
+@app.route('/api/recommend/profile', methods=['POST'])
+def recommend_profile():
+    """Recommendations for a set of liked titles ("more like these")"""
+    data = request.get_json(silent=True) or {}
+    seeds = data.get('movies')
+    n = data.get('n', 10)
+    
+    if not isinstance(seeds, list) or not seeds:
+        return jsonify({'error': '"movies" must be a non-empty list'}), 400
+    if len(seeds) > MAX_BATCH_SEEDS:
+        return jsonify({'error': f'At most {MAX_BATCH_SEEDS} movies per profile'}), 400
+    if isinstance(n, bool) or not isinstance(n, int):
+        return jsonify({'error': '"n" must be an integer'}), 400
+    n = max(1, min(n, MAX_BATCH_N))
+    
+    # Each seed is a title or {"title": ..., "weight": ...} (weight defaults to 1)
+    parsed = []
+    for seed in seeds:
+        title, weight = (seed.get('title'), seed.get('weight', 1)) if isinstance(seed, dict) else (seed, 1)
+        if not isinstance(title, str):
+            return jsonify({'error': 'Seed titles must be strings'}), 400
+        if not isinstance(weight, (int, float)) or isinstance(weight, bool) or weight <= 0:
+            return jsonify({'error': 'Seed weights must be positive numbers'}), 400
+        parsed.append((title.strip(), weight))
+    
+    cat = catalog
+    weights = {}
+    seed_info = []
+    for name, weight in parsed:
+        with stage('resolve'):
+            idx, match_type = cat.title_index.resolve(name) if name else (None, None)
+        count_resolution(match_type)
+        seed_info.append({
+            'movie': name,
+            'base_title': cat.movies_store.titles[idx] if idx is not None else None,
+            'match_type': match_type,
+            'weight': weight
+        })
+        if idx is not None:
+            weights[idx] = weights.get(idx, 0) + weight
+    
+    if not weights:
+        return jsonify({'error': 'None of the movies were found in database', 'seeds': seed_info}), 404
+    
+    # Weighted centroid of the seeds' vectors, scored in one blocked product
+    seed_rows = list(weights)
+    with stage('neighbors'):
+        centroid = cat.weighted_centroid(seed_rows, [weights[row] for row in seed_rows])
+        ids, scores = cat.search_neighbors(centroid, n + len(seed_rows))
+    
+    seed_set = set(seed_rows)
+    picked = [(row, round(score, 4)) for row, score in zip(ids[0].tolist(), scores[0].tolist()) if row not in seed_set][:n]
+    recommendations = movie_cards(cat, [row for row, _ in picked], [score for _, score in picked])
+    
     return jsonify({
-        'movie': movie_name,
+        'seeds': seed_info,
         'recommendations': recommendations,
-        'count': len(recommendations),
-        'base_title': matched_title,
-        'match_type': match_type
+        'count': len(recommendations)
     })
 
 @app.route('/api/movie/<int:movie_id>', methods=['GET'])
 def get_movie_details(movie_id):
     """Get movie details by ID"""
-    movie = df[df['id'] == movie_id]
+    cat = catalog
+    store = cat.movies_store
+    row = store.row_for_id(movie_id)
     
-    if movie.empty:
+    if row is None:
         return jsonify({'error': 'Movie not found'}), 404
     
-    movie_data = movie.iloc[0]
-    return jsonify({
-        'id': int(movie_data['id']),
-        'title': movie_data['original_title'],
-        'overview': movie_data['overview'],
-        'genres': movie_data['genres'],
-        'rating': float(movie_data['vote_average']) if pd.notna(movie_data['vote_average']) else None,
-        'vote_count': int(movie_data['vote_count']) if pd.notna(movie_data['vote_count']) else 0,
-        'poster': fetch_poster(movie_data['id'])
-    })
+    return cached_json(cat, ('movie', movie_id), lambda: store.details(row, fetch_poster(movie_id)))
 
 @app.route('/api/random', methods=['GET'])
 def random_movies():
@@ -309,18 +670,11 @@ def random_movies():
     count = request.args.get('count', default=10, type=int)
     count = min(count, 50)  # Max 50 movies
     
-    random_movies = df.sample(n=count)
-    movies = []
-    
-    for _, movie in random_movies.iterrows():
-        movies.append({
-            'id': int(movie['id']),
-            'title': movie['original_title'],
-            'rating': round(float(movie['vote_average']), 1) if pd.notna(movie['vote_average']) else 'N/A',
-            'poster': fetch_poster(movie['id']),
-            'genres': movie.get('genres', ''),
-            'overview': movie.get('overview', '')
-        })
+    cat = catalog
+    total = len(cat.movies_store)
+    # O(count) sample; np.random.choice(replace=False) permutes the whole catalog
+    rows = random.sample(range(total), max(0, min(count, total)))
+    movies = movie_cards(cat, rows)
     
     return jsonify({
         'movies': movies,
@@ -329,149 +683,168 @@ def random_movies():
 
 @app.route('/api/top', methods=['GET'])
 def top_movies():
-    """Get top rated movies"""
+    """Get top rated movies (weighted rating, optionally per genre / with a minimum vote count)"""
     count = request.args.get('count', default=10, type=int)
-    count = min(count, 50)
-    
-    top = df.nlargest(count, 'vote_average')
-    movies = []
-    
-    for _, movie in top.iterrows():
-        movies.append({
-            'id': int(movie['id']),
-            'title': movie['original_title'],
-            'rating': round(float(movie['vote_average']), 1),
-            'poster': fetch_poster(movie['id']),
-            'genres': movie.get('genres', ''),
-            'overview': movie.get('overview', '')
-        })
+    count = max(0, min(count, 50))
+    genre = request.args.get('genre', '').strip()
+    min_votes = request.args.get('min_votes', default=0, type=int)
     
-    return jsonify({
-        'movies': movies,
-        'count': len(movies)
-    })
+    cat = catalog
+    if genre:
+        genre = cat.rankings.genre(genre)
+        if genre is None:
+            return jsonify({'error': f'Unknown genre "{request.args["genre"]}"'}), 400
+    def build():
+        rows = cat.rankings.top(count, genre=genre or None, min_votes=min_votes)
+        movies = movie_cards(cat, rows)
+        return {
+            'movies': movies,
+            'count': len(movies),
+            'genre': genre or None,
+            'min_votes': min_votes
+        }
+
+    return cached_json(cat, ('top', count, genre, min_votes), build)
 
 @app.route('/api/search', methods=['GET'])
 def search_movies():
-    """Search movies by title and/or genre"""
+    """Search movies by title words, genre, rating and release year"""
     query = request.args.get('q', '').strip()
     genre = request.args.get('genre', '').strip()
     limit = request.args.get('limit', default=20, type=int)
     limit = max(1, min(limit, 50))
+    min_rating = request.args.get('min_rating', type=float)
+    max_rating = request.args.get('max_rating', type=float)
+    year_from = request.args.get('year_from', type=int)
+    year_to = request.args.get('year_to', type=int)
+    sort = request.args.get('sort', 'relevance')
+    cursor = request.args.get('cursor', '')
     
-    if not query and not genre:
-        return jsonify({'error': 'Provide at least one of "q" or "genre"'}), 400
-    
-    matches = df
-    if query:
-        matches = matches[matches['original_title'].str.contains(query, case=False, na=False)]
-    if genre:
-        matches = matches[matches['genres'].str.contains(genre, case=False, na=False)]
-    movies = []
-
-    for _, movie in matches.head(limit).iterrows():
-        movies.append({
-            'id': int(movie['id']),
-            'title': movie['original_title'],
-            'rating': round(float(movie['vote_average']), 1) if pd.notna(movie['vote_average']) else 'N/A',
-            'poster': fetch_poster(movie['id']),
-            'genres': movie.get('genres', ''),
-            'overview': movie.get('overview', '')
-        })
+    filters = (min_rating, max_rating, year_from, year_to)
+    if not query and not genre and all(f is None for f in filters):
+        return jsonify({'error': 'Provide at least one of "q", "genre" or a rating/year filter'}), 400
+    if sort not in SORTS:
+        return jsonify({'error': f'"sort" must be one of: {", ".join(SORTS)}'}), 400
+    cat = catalog
+    try:
+        offset = decode_cursor(cursor, cat.version) if cursor else 0
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify({
-        'query': query,
-        'genre': genre,
-        'movies': movies,
-        'count': len(movies),
-        'limit': limit,
-        'total_matches': int(matches.shape[0])
-    })
+    def build():
+        with stage('search'):
+            rows, total = cat.search_index.search(
+                query, genre, min_rating, max_rating, year_from, year_to,
+                sort=sort, offset=offset, limit=limit
+            )
+        movies = movie_cards(cat, rows)
+        next_offset = offset + len(rows)
+        return {
+            'query': query,
+            'genre': genre,
+            'sort': sort,
+            'movies': movies,
+            'count': len(movies),
+            'limit': limit,
+            'total_matches': total,
+            'next_cursor': encode_cursor(next_offset, cat.version) if next_offset < total else None
+        }
+
+    key = ('search', query, genre, limit, min_rating, max_rating, year_from, year_to, sort, offset)
+    return cached_json(cat, key, build)
 
 @app.route('/api/health', methods=['GET'])
 def health():
-    """Basic health/status endpoint"""
-    return jsonify({
+    """Liveness/status endpoint (200 while the process serves, even before the model is loaded)"""
+    cat = catalog
+    status = {
         'status': 'ok',
-        'dataset_count': len(df),
+        'ready': cat is not None,
+        'model': load_state['status'],
         'tmdb_key_present': bool(TMDB_API_KEY),
-        'poster_cache_entries': len(poster_cache)
-    })
+        'poster_cache_entries': len(poster_cache),
+        'poster_cache': poster_cache.stats(),
+        'response_cache': response_cache.stats(),
+        'pid': os.getpid(),
+        'memory': process_memory()
+    }
+    if cat is not None:
+        status.update({
+            'dataset_count': len(cat.df),
+            'dataset_version': cat.version,
+            'pending_updates': cat.pending_updates,
+            'neighbor_mode': 'ann' if cat.ann is not None else 'exact',
+        })
+    return jsonify(status)
+
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """Readiness: 200 once the model is loaded, 503 while loading or after a failed load"""
+    cat = catalog
+    if cat is None:
+        return jsonify({'status': load_state['status'], 'error': load_state['error']}), 503
+    return jsonify({'status': 'ready', 'dataset_version': cat.version, 'load_seconds': load_state['seconds']})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request, stage, poster cache, TMDB and model load metrics (Prometheus text format)"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """Get database statistics"""
-    date_range = {'oldest': '1902', 'newest': '2024'}
-    if 'release_date' in df.columns:
-        oldest = df['release_date'].min()
-        newest = df['release_date'].max()
-        if pd.notna(oldest):
-            date_range['oldest'] = str(oldest)[:4]  # Year only
-        if pd.notna(newest):
-            date_range['newest'] = str(newest)[:4]
-    
-    return jsonify({
-        'total_movies': len(df),
-        'average_rating': round(float(df['vote_average'].mean()), 2),
-        'total_genres': len(df['genres'].unique()),
-        'date_range': date_range
-    })
+    cat = catalog
+    return conditional_json(cat.version, 'stats', lambda: cat.analytics['stats'])
 
 @app.route('/api/genres', methods=['GET'])
 def list_genres():
     """List unique genres extracted from dataset"""
-    tokens = set()
-    for g in df['genres'].fillna(''):
-        s = str(g)
-        s = s.replace('[', ' ').replace(']', ' ').replace('{', ' ').replace('}', ' ')
-        s = s.replace('"', ' ').replace("'", ' ')
-        parts = re.split(r"\s*[\|,;/]+\s*", s)
-        for part in parts:
-            part = part.strip()
-            if part:
-                tokens.add(part)
-    genres = sorted(tokens)
-    return jsonify({'genres': genres, 'count': len(genres)})
+    cat = catalog
+    return conditional_json(cat.version, 'genres', lambda: cat.analytics['genres'])
 
 @app.route('/api/analytics/rating-distribution', methods=['GET'])
 def rating_distribution():
     """Get rating distribution histogram data"""
-    bins = [0, 2, 4, 6, 8, 10]
-    labels = ['0-2', '2-4', '4-6', '6-8', '8-10']
-    counts = []
-    for i in range(len(bins) - 1):
-        count = len(df[(df['vote_average'] >= bins[i]) & (df['vote_average'] < bins[i+1])])
-        counts.append(count)
-    return jsonify({
-        'labels': labels,
-        'counts': counts,
-        'total': len(df)
-    })
+    cat = catalog
+    return conditional_json(cat.version, 'rating-distribution', lambda: cat.analytics['rating_distribution'])
 
 @app.route('/api/analytics/genre-frequency', methods=['GET'])
 def genre_frequency():
     """Get genre frequency (top 15)"""
-    genre_counts = {}
-    for g in df['genres'].fillna(''):
-        s = str(g)
-        s = s.replace('[', ' ').replace(']', ' ').replace('{', ' ').replace('}', ' ')
-        s = s.replace('"', ' ').replace("'", ' ')
-        parts = re.split(r"\s*[\|,;/]+\s*", s)
-        for part in parts:
-            part = part.strip()
-            if part:
-                genre_counts[part] = genre_counts.get(part, 0) + 1
+    cat = catalog
+    return conditional_json(cat.version, 'genre-frequency', lambda: cat.analytics['genre_frequency'])
+
+
+@app.route('/api/admin/movies', methods=['POST'])
+def admin_update_movies():
+    """Add or update movies without a refit or restart (Authorization: Bearer ADMIN_TOKEN)"""
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Admin API disabled (set ADMIN_TOKEN)'}), 403
+    auth = request.headers.get('Authorization', '')
+    token = auth[len('Bearer '):] if auth.startswith('Bearer ') else ''
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        return jsonify({'error': 'Invalid admin token'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    records = data.get('movies')
+    if not isinstance(records, list) or not records:
+        return jsonify({'error': '"movies" must be a non-empty list of movie objects'}), 400
+    if len(records) > MAX_ADMIN_MOVIES:
+        return jsonify({'error': f'At most {MAX_ADMIN_MOVIES} movies per update'}), 400
+    
+    try:
+        new_model = add_movies(records, DEFAULT_CSV_PATH, MODEL_DIR, k=TOP_K_NEIGHBORS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    cat = swap_catalog(new_model)
     
-    # Sort by count descending and get top 15
-    sorted_genres = sorted(genre_counts.items(), key=lambda x: x[1], reverse=True)[:15]
-    labels = [g[0] for g in sorted_genres]
-    counts = [g[1] for g in sorted_genres]
     return jsonify({
-        'labels': labels,
-        'counts': counts
+        'applied': len(records),
+        'dataset_count': len(cat.df),
+        'dataset_version': cat.version,
+        'pending_updates': cat.pending_updates
     })
 
-
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -481,13 +854,20 @@ def not_found(error):
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
+# Load the model now, in the background or on first use (MODEL_WARMUP)
+configure_app()
+
 if __name__ == '__main__':
     print("\n" + "="*60)
     print("🎬 MOVIE RECOMMENDATION API SERVER")
     print("="*60)
-    print("📊 Dataset: {} movies loaded".format(len(df)))
+    if catalog is not None:
+        print("📊 Dataset: {} movies loaded".format(len(catalog.df)))
+    else:
+        print(f"📊 Dataset: loading ({MODEL_WARMUP}); /api/ready reports when it is done")
     print("🚀 Server starting at: http://localhost:5001")
     print("📚 API Documentation: http://localhost:5001/")
     print("="*60 + "\n")
     
+    start_catalog_jobs()
     app.run(debug=True, host='0.0.0.0', port=5001)
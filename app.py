@@ -14,7 +14,7 @@ except Exception:
 
 ROOT = Path(__file__).parent.resolve()
 BACKEND_PORT = int(os.getenv("PORT", "5001"))
-HEALTH_URL = f"http://localhost:{BACKEND_PORT}/api/health"
+HEALTH_URL = f"http://localhost:{BACKEND_PORT}/api/ready"
 
 
 def ensure_env():
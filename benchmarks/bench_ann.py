@@ -0,0 +1,104 @@
+"""Benchmark approximate neighbor search (NEIGHBOR_MODE=ann) against exact.
+
+For each ANN_QUERY_TERMS x ANN_CANDIDATES setting, searches the neighbors of
+random catalog movies and reports:
+  - latency per query (exact vs approximate) and the projected time to build
+    the full neighbor table
+  - recall@K: share of approximate results that are true top-K neighbors
+    (ties at the K-th score count as hits)
+
+    python benchmarks/bench_ann.py [--csv movies_clean.csv] [--scale 300000]
+    python benchmarks/bench_ann.py --terms 4,8,16 --candidates 200,500,1000
+
+--scale pads the catalog with synthetic movies (word samples of real
+overviews / genres / keywords, mixed from two movies) to measure larger
+catalogs.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ann_index import AnnIndex, recall_at_k  # noqa: E402
+from model_store import load_movies  # noqa: E402
+from neighbors import search_neighbors  # noqa: E402
+
+
+def scaled_soups(soups, size, rng):
+    soups = list(soups)
+    words = [soup.split() for soup in soups]
+    base = len(soups)
+    while len(soups) < size:
+        a, b = words[rng.integers(base)], words[rng.integers(base)]
+        mixed = [w for w in a if rng.random() < 0.7] + [w for w in b if rng.random() < 0.2]
+        soups.append(' '.join(mixed))
+    return soups
+
+
+def timed_search(fn, queries, tfidf_matrix, k):
+    """(ids, scores, ms per query), one query at a time as the API issues them"""
+    ids, scores, times = [], [], []
+    for row in range(queries.shape[0]):
+        start = time.perf_counter()
+        i, s = fn(queries[row], tfidf_matrix, k)
+        times.append((time.perf_counter() - start) * 1000)
+        ids.append(i[0])
+        scores.append(s[0])
+    return np.array(ids), np.array(scores), statistics.mean(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default='movies_clean.csv')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--terms', default='4,8,16', help='ANN_QUERY_TERMS values to try')
+    parser.add_argument('--candidates', default='200,500,1000', help='ANN_CANDIDATES values to try')
+    parser.add_argument('--scale', type=int, default=0, help='pad catalog to this many movies')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    soups = load_movies(args.csv)['soup'].tolist()
+    if args.scale > len(soups):
+        soups = scaled_soups(soups, args.scale, rng)
+
+    start = time.perf_counter()
+    tfidf_matrix = TfidfVectorizer(stop_words='english').fit_transform(soups)
+    print(f"Catalog: {tfidf_matrix.shape[0]} movies, {tfidf_matrix.shape[1]} terms, "
+          f"TF-IDF in {time.perf_counter() - start:.1f} s")
+
+    k = args.k + 1  # tables hold the movie itself plus k neighbors
+    rows = rng.choice(tfidf_matrix.shape[0], min(args.queries, tfidf_matrix.shape[0]), replace=False)
+    queries = tfidf_matrix[rows]
+    _, exact_scores, exact_ms = timed_search(search_neighbors, queries, tfidf_matrix, k)
+    n_rows = tfidf_matrix.shape[0]
+    # The table is built in blocks, which amortizes per-query overhead
+    start = time.perf_counter()
+    search_neighbors(queries, tfidf_matrix, k)
+    block_ms = (time.perf_counter() - start) * 1000 / len(rows)
+    print(f"exact              : {exact_ms:7.2f} ms/query  table ~{block_ms * n_rows / 1000:7.0f} s")
+
+    start = time.perf_counter()
+    ann = AnnIndex.build(tfidf_matrix)
+    print(f"postings built in {time.perf_counter() - start:.2f} s")
+
+    for terms in [int(t) for t in args.terms.split(',')]:
+        for candidates in [int(c) for c in args.candidates.split(',')]:
+            ann.query_terms, ann.candidates = terms, candidates
+            _, scores, ms = timed_search(ann.search, queries, tfidf_matrix, k)
+            start = time.perf_counter()
+            ann.search(queries, tfidf_matrix, k)
+            block_ms = (time.perf_counter() - start) * 1000 / len(rows)
+            print(f"terms={terms:<3} cand={candidates:<5}: {ms:7.2f} ms/query  table ~{block_ms * n_rows / 1000:7.0f} s  "
+                  f"speedup {exact_ms / ms:5.1f}x  recall@{args.k} {recall_at_k(scores, exact_scores):.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,449 @@
+"""Load test every API endpoint and compare against a stored baseline.
+
+Drives the app in-process (Flask test client) or under gunicorn
+(gunicorn.conf.py, real HTTP). TMDB is replaced by a local stub server
+(TMDB_API_BASE) that answers after --tmdb-latency ms, so poster lookups run
+without network access. The model artifact, update log and poster cache are
+temporary copies; the working tree is not modified (checked after the run).
+
+Each endpoint gets a seeded query mix built from the catalog:
+  - titles: exact, typo'd, partial (lower-case word prefix) and random words
+  - search: title words with genre / rating / year filters and sorts
+  - batch / profile seeds, movie ids, list offsets, admin edits
+
+For each endpoint it reports p50 / p95 / p99 latency, requests per second,
+error rate (5xx and failed requests) and memory after the run (RSS / PSS of
+this process, or summed over the gunicorn master and workers).
+
+    python benchmarks/bench_api.py [--mode inprocess|gunicorn] [--requests 300] [--concurrency 8]
+    python benchmarks/bench_api.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_api.py --baseline benchmarks/baseline.json --tolerance 0.25
+
+With --baseline, endpoints whose p95 or memory grew, or whose throughput
+fell, by more than the tolerance are listed and the exit status is 1.
+Compare runs from the same machine, mode and settings.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_fuzzy import add_typos  # noqa: E402
+from genre_index import parse_genres  # noqa: E402
+from memstats import process_memory  # noqa: E402
+from search_index import SORTS  # noqa: E402
+
+ADMIN_TOKEN = 'bench'
+WORDS = ['love', 'night', 'space', 'zzqx', 'the', 'dark', 'war', 'blue', 'qwerty', 'king']
+
+# Share of --requests each endpoint gets (admin updates rewrite the artifact)
+ENDPOINT_WEIGHTS = {
+    'recommend': 1.0,
+    'recommend_batch': 0.5,
+    'recommend_profile': 0.5,
+    'search': 1.0,
+    'autocomplete': 1.0,
+    'movie': 1.0,
+    'movies': 0.5,
+    'random': 0.5,
+    'top': 0.5,
+    'stats': 0.5,
+    'genres': 0.5,
+    'rating_distribution': 0.5,
+    'genre_frequency': 0.5,
+    'health': 0.5,
+    'home': 0.2,
+    'admin_movies': 0.02,
+}
+
+
+def tree_state(root=ROOT):
+    """(size, mtime) of every file under root except .git and __pycache__"""
+    state = {}
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if d not in ('.git', '__pycache__')]
+        for name in files:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            state[os.path.relpath(path, root)] = (stat.st_size, stat.st_mtime_ns)
+    return state
+
+
+class StubTmdb(BaseHTTPRequestHandler):
+    """/movie/<id>: a poster path after `latency` seconds (404 for ids ending in 0)"""
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        movie_id = self.path.split('?')[0].rstrip('/').rsplit('/', 1)[-1]
+        if movie_id.endswith('0'):
+            body, status = b'{"status_code": 34}', 404
+        else:
+            body, status = json.dumps({'poster_path': f'/bench{movie_id}.jpg'}).encode(), 200
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(latency):
+    StubTmdb.latency = latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubTmdb)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}/3'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def title_query(title, rng):
+    """An exact, typo'd, partial or random-word title query"""
+    kind = rng.random()
+    if kind < 0.5:
+        return title
+    if kind < 0.7:
+        return add_typos(title, rng, 1 + (len(title) > 12))
+    if kind < 0.9:
+        words = title.lower().split()
+        return ' '.join(words[:max(1, len(words) // 2)])
+    return ' '.join(rng.sample(WORDS, 2))
+
+
+def build_workload(df, n_requests, seed):
+    """endpoint -> list of (method, path, params, json body, headers), seeded"""
+    rng = random.Random(seed)
+    titles = df['original_title'].dropna().astype(str).tolist()
+    ids = df['id'].tolist()
+    genres = sorted({g for value in df['genres'] for g in parse_genres(value)}) or ['Drama']
+    title_words = [w for t in rng.sample(titles, min(len(titles), 2000)) for w in t.split() if len(w) > 2]
+
+    def count(name):
+        return max(3, int(n_requests * ENDPOINT_WEIGHTS[name]))
+
+    def search_params():
+        params = {'q': rng.choice(title_words)} if rng.random() < 0.8 else {}
+        if rng.random() < 0.4:
+            params['genre'] = rng.choice(genres)
+        if rng.random() < 0.3:
+            params['min_rating'] = rng.choice([5, 6, 7])
+        if rng.random() < 0.3:
+            params['year_from'] = rng.randrange(1950, 2010)
+        params['sort'] = rng.choice(SORTS)
+        return params
+
+    def top_params():
+        params = {'count': rng.choice([10, 20, 50])}
+        if rng.random() < 0.4:
+            params['genre'] = rng.choice(genres)
+        if rng.random() < 0.3:
+            params['min_votes'] = rng.choice([100, 1000])
+        return params
+
+    def admin_edit():
+        movie_id = rng.choice(ids)
+        body = {'movies': [{'id': int(movie_id), 'overview': ' '.join(rng.sample(title_words, 12))}]}
+        return ('POST', '/api/admin/movies', None, body, {'Authorization': f'Bearer {ADMIN_TOKEN}'})
+
+    makers = {
+        'recommend': lambda: ('POST', '/api/recommend', None, {'movie': title_query(rng.choice(titles), rng)}, None),
+        'recommend_batch': lambda: ('POST', '/api/recommend/batch', None,
+                                    {'movies': [title_query(rng.choice(titles), rng) for _ in range(5)]}, None),
+        'recommend_profile': lambda: ('POST', '/api/recommend/profile', None, {
+            'movies': [{'title': rng.choice(titles), 'weight': 1 / (i + 1)} for i in range(rng.randint(1, 8))]}, None),
+        'search': lambda: ('GET', '/api/search', search_params(), None, None),
+        'autocomplete': lambda: ('GET', '/api/autocomplete',
+                                 {'prefix': rng.choice(titles)[:rng.randint(1, 6)]}, None, None),
+        'movie': lambda: ('GET', f'/api/movie/{rng.choice(ids)}', None, None, None),
+        'movies': lambda: ('GET', '/api/movies', {'limit': 200, 'offset': rng.randrange(max(1, len(titles)))},
+                           None, None),
+        'random': lambda: ('GET', '/api/random', {'count': 10}, None, None),
+        'top': lambda: ('GET', '/api/top', top_params(), None, None),
+        'stats': lambda: ('GET', '/api/stats', None, None, None),
+        'genres': lambda: ('GET', '/api/genres', None, None, None),
+        'rating_distribution': lambda: ('GET', '/api/analytics/rating-distribution', None, None, None),
+        'genre_frequency': lambda: ('GET', '/api/analytics/genre-frequency', None, None, None),
+        'health': lambda: ('GET', '/api/health', None, None, None),
+        'home': lambda: ('GET', '/', None, None, None),
+        'admin_movies': admin_edit,
+    }
+    return {name: [make() for _ in range(count(name))] for name, make in makers.items()}
+
+
+class InProcessTarget:
+    """The app imported into this process; one Flask test client per thread"""
+
+    def __init__(self):
+        import api
+        self.app = api.app
+        self.local = threading.local()
+
+    def request(self, method, path, params, body, headers):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        return client.open(path, method=method, query_string=params, json=body, headers=headers).status_code
+
+    def memory(self):
+        return process_memory()
+
+    def close(self):
+        pass
+
+
+class GunicornTarget:
+    """gunicorn -c gunicorn.conf.py api:app on a free port, driven over HTTP"""
+
+    def __init__(self, env, workers, timeout=600):
+        self.port = free_port()
+        env = dict(env, PORT=str(self.port), WEB_CONCURRENCY=str(workers))
+        self.proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'api:app'],
+                                     cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.base = f'http://127.0.0.1:{self.port}'
+        self.local = threading.local()
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.proc.poll() is not None:
+                raise SystemExit('gunicorn exited during startup')
+            try:
+                if requests.get(self.base + '/api/ready', timeout=2).ok:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.5)
+        self.close()
+        raise SystemExit('gunicorn did not become ready in time')
+
+    def request(self, method, path, params, body, headers):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        return session.request(method, self.base + path, params=params, json=body, headers=headers,
+                               timeout=30).status_code
+
+    def memory(self):
+        """Memory summed over the master and its workers"""
+        pids = [self.proc.pid] + children(self.proc.pid)
+        totals = {}
+        for pid in pids:
+            for key, value in process_memory(pid).items():
+                totals[key] = round(totals.get(key, 0) + value, 1)
+        return totals
+
+    def close(self):
+        self.proc.send_signal(signal.SIGTERM)
+        try:
+            self.proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+def children(pid):
+    found = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        found.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    return found
+
+
+def run_endpoint(target, calls, concurrency):
+    """Latency per call (ms), wall time and error count for one endpoint's calls"""
+    def timed(call):
+        start = time.perf_counter()
+        try:
+            status = target.request(*call)
+        except Exception:
+            status = None
+        return (time.perf_counter() - start) * 1000, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, calls))
+    wall = time.perf_counter() - start
+    latencies = np.array([ms for ms, _ in results])
+    errors = sum(1 for _, status in results if status is None or status >= 500)
+    return latencies, wall, errors
+
+
+def summarize(latencies, wall, errors, memory):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+        'mean_ms': round(float(statistics.mean(latencies)), 2),
+        'rps': round(len(latencies) / wall, 1),
+        'error_rate': round(errors / len(latencies), 4),
+        'rss_mb': memory.get('rss_mb'),
+        'pss_mb': memory.get('pss_mb'),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regression messages for endpoints present in both runs"""
+    problems = []
+    for name, now in results['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if before is None:
+            continue
+        if now['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            problems.append(f"{name}: p95 {before['p95_ms']} -> {now['p95_ms']} ms")
+        if now['rps'] < before['rps'] / (1 + tolerance):
+            problems.append(f"{name}: throughput {before['rps']} -> {now['rps']} req/s")
+        if now['error_rate'] > before['error_rate']:
+            problems.append(f"{name}: error rate {before['error_rate']} -> {now['error_rate']}")
+        for key in ('pss_mb', 'rss_mb'):
+            if now.get(key) and before.get(key):
+                if now[key] > before[key] * (1 + tolerance):
+                    problems.append(f"{name}: {key[:3]} {before[key]} -> {now[key]} MB")
+                break
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=('inprocess', 'gunicorn'), default='inprocess')
+    parser.add_argument('--csv', help='movie table (default: the one the API serves)')
+    parser.add_argument('--requests', type=int, default=300, help='requests per endpoint (scaled by weight)')
+    parser.add_argument('--warmup', type=int, default=20, help='untimed requests per endpoint first')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers (--mode gunicorn)')
+    parser.add_argument('--tmdb-latency', type=float, default=20, help='stub TMDB response time, ms')
+    parser.add_argument('--endpoints', help='comma-separated subset of: ' + ', '.join(ENDPOINT_WEIGHTS))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--save-baseline', help='write results JSON as the new baseline')
+    parser.add_argument('--baseline', help='compare with this baseline JSON')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative regression')
+    args = parser.parse_args()
+    if args.endpoints:
+        unknown = set(args.endpoints.split(',')) - set(ENDPOINT_WEIGHTS)
+        if unknown:
+            parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    # model_store and api read their paths from the environment at import, so
+    # point them at the temporary copies before importing either
+    stub, stub_url = start_stub(args.tmdb_latency / 1000)
+    tmp = tempfile.mkdtemp(prefix='bench-api-')
+    model_dir = os.path.join(tmp, 'model_artifact')
+    source_dir = os.path.join(ROOT, os.getenv('MODEL_DIR', 'model_artifact'))
+    if os.path.isdir(source_dir):
+        shutil.copytree(source_dir, model_dir)
+    env = {
+        'MODEL_DIR': model_dir,
+        'CATALOG_UPDATES_PATH': os.path.join(tmp, 'catalog_updates.jsonl'),
+        'POSTER_CACHE_PATH': os.path.join(tmp, 'poster_cache.sqlite3'),
+        'TMDB_API_BASE': stub_url,
+        'TMDB_API_KEY': 'bench',
+        'ADMIN_TOKEN': ADMIN_TOKEN,
+        'CATALOG_REFIT_INTERVAL': '0',
+    }
+    source_updates = os.path.join(ROOT, os.getenv('CATALOG_UPDATES_PATH', 'catalog_updates.jsonl'))
+    if os.path.exists(source_updates):
+        shutil.copy(source_updates, env['CATALOG_UPDATES_PATH'])
+    if args.csv:
+        env['MOVIES_PATH'] = os.path.abspath(args.csv)
+    os.environ.update(env)
+
+    from model_store import DEFAULT_CSV_PATH, load_movies
+    env['MOVIES_PATH'] = os.path.abspath(DEFAULT_CSV_PATH)
+    before = tree_state()
+
+    df = load_movies(DEFAULT_CSV_PATH)
+    workload = build_workload(df, args.requests, args.seed)
+    if args.endpoints:
+        workload = {name: calls for name, calls in workload.items() if name in args.endpoints.split(',')}
+
+    print(f"Catalog: {len(df)} movies; mode={args.mode}, concurrency={args.concurrency}, "
+          f"stub TMDB {args.tmdb_latency:.0f} ms")
+    start = time.perf_counter()
+    if args.mode == 'gunicorn':
+        target = GunicornTarget(dict(os.environ, **env), args.workers)
+    else:
+        target = InProcessTarget()
+    print(f"App ready in {time.perf_counter() - start:.1f} s")
+
+    results = {
+        'meta': {
+            'mode': args.mode, 'requests': args.requests, 'concurrency': args.concurrency,
+            'workers': args.workers if args.mode == 'gunicorn' else 1, 'tmdb_latency_ms': args.tmdb_latency,
+            'seed': args.seed, 'movies': len(df), 'cpus': os.cpu_count(),
+            'python': platform.python_version(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'endpoints': {},
+    }
+    print(f"\n{'endpoint':<20} {'reqs':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} "
+          f"{'errors':>7} {'rss MB':>8}")
+    try:
+        for name, calls in workload.items():
+            warm = random.Random(args.seed).sample(calls, min(args.warmup, len(calls)))
+            if name != 'admin_movies':
+                run_endpoint(target, warm, args.concurrency)
+            latencies, wall, errors = run_endpoint(target, calls, args.concurrency)
+            row = results['endpoints'][name] = summarize(latencies, wall, errors, target.memory())
+            print(f"{name:<20} {row['requests']:>5} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+                  f"{row['p99_ms']:>8.1f} {row['rps']:>8.1f} {row['error_rate']:>7.1%} {row['rss_mb'] or 0:>8.1f}")
+    finally:
+        target.close()
+        stub.shutdown()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    after = tree_state()
+    changed = sorted(path for path in set(before) | set(after) if before.get(path) != after.get(path))
+    if changed:
+        sys.exit(f"❌ The run modified the working tree: {', '.join(changed)}")
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('mode') != args.mode:
+            print(f"⚠️  Baseline was recorded in {baseline.get('meta', {}).get('mode')} mode")
+        problems = compare(results, baseline, args.tolerance)
+        if problems:
+            print(f"\n❌ {len(problems)} regression(s) beyond {args.tolerance:.0%}:")
+            for problem in problems:
+                print(f"  - {problem}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%} vs {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
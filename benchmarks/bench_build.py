@@ -0,0 +1,71 @@
+"""Benchmark the model build across BUILD_WORKERS process counts.
+
+For each worker count, times the two stages of model_store.build_model that
+are split across processes, and checks the result is identical to the
+single-process build:
+  - TF-IDF fit (tokenizing the soups, model_store.fit_tfidf)
+  - neighbor tables (block x matrix.T products + top-K, neighbors.build_neighbor_index,
+    or the ANN tables with --ann)
+
+    python benchmarks/bench_build.py [--csv movies_clean.csv] [--workers 1,2,4,8]
+    python benchmarks/bench_build.py --scale 200000 --ann
+
+--scale pads the catalog with synthetic movies (see bench_ann.py).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ann_index import AnnIndex  # noqa: E402
+from bench_ann import scaled_soups  # noqa: E402
+from model_store import DEFAULT_REPRESENTATION, fit_tfidf, load_movies  # noqa: E402
+from neighbors import build_neighbor_index  # noqa: E402
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default='movies_clean.csv')
+    parser.add_argument('--workers', default=f'1,{os.cpu_count() or 1}', help='BUILD_WORKERS values to try')
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--scale', type=int, default=0, help='pad catalog to this many movies')
+    parser.add_argument('--ann', action='store_true', help='time the approximate neighbor tables')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    soups = load_movies(args.csv)['soup'].tolist()
+    if args.scale > len(soups):
+        soups = scaled_soups(soups, args.scale, np.random.default_rng(args.seed))
+    print(f"Catalog: {len(soups)} movies, {os.cpu_count()} CPUs")
+
+    baseline = None
+    for workers in sorted({int(w) for w in args.workers.split(',')}):
+        (tfidf, matrix), fit_s = timed(fit_tfidf, soups, DEFAULT_REPRESENTATION, workers=workers)
+        if args.ann:
+            ann = AnnIndex.build(matrix)
+            (ids, scores), table_s = timed(ann.neighbor_tables, matrix, k=args.k, workers=workers)
+        else:
+            (ids, scores), table_s = timed(build_neighbor_index, matrix, k=args.k, workers=workers)
+
+        if baseline is None:
+            baseline = (fit_s, table_s, matrix, ids, scores)
+        base_fit, base_table, base_matrix, base_ids, base_scores = baseline
+        same = ((matrix != base_matrix).nnz == 0 and np.array_equal(ids, base_ids)
+                and np.array_equal(scores, base_scores))
+        print(f"workers={workers:<3}: TF-IDF {fit_s:7.2f} s ({base_fit / fit_s:4.1f}x)  "
+              f"tables {table_s:7.2f} s ({base_table / table_s:4.1f}x)  "
+              f"total {fit_s + table_s:7.2f} s  {'identical' if same else 'DIFFERS'}")
+
+
+if __name__ == '__main__':
+    main()
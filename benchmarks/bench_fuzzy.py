@@ -0,0 +1,113 @@
+"""Benchmark "did you mean" suggestions: TitleIndex.suggest vs difflib.
+
+Queries are real titles with random typos (insert / delete / substitute /
+swap). Reports latency per query and quality:
+  - hit@5: the title the typo came from is among the 5 suggestions
+  - overlap@5: share of difflib's suggestions also returned by the index
+
+    python benchmarks/bench_fuzzy.py [--csv movies_clean.csv] [--scale 100000]
+
+--scale pads the catalog with synthetic variants of real titles to measure
+latency at larger catalog sizes (difflib is only timed on a sample there).
+"""
+import argparse
+import difflib
+import os
+import random
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from title_index import TitleIndex  # noqa: E402
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def add_typos(title, rng, count):
+    chars = list(title)
+    for _ in range(count):
+        if len(chars) < 2:
+            break
+        pos = rng.randrange(len(chars))
+        op = rng.choice(('insert', 'delete', 'substitute', 'swap'))
+        if op == 'insert':
+            chars.insert(pos, rng.choice(LETTERS))
+        elif op == 'delete':
+            del chars[pos]
+        elif op == 'substitute':
+            chars[pos] = rng.choice(LETTERS)
+        elif pos + 1 < len(chars):
+            chars[pos], chars[pos + 1] = chars[pos + 1], chars[pos]
+    return ''.join(chars)
+
+
+def scaled_catalog(titles, popularity, size, rng):
+    titles, popularity = list(titles), list(popularity)
+    base = len(titles)
+    while len(titles) < size:
+        i = rng.randrange(base)
+        titles.append(f"{titles[i]} {rng.choice(['II', 'Returns', 'Reloaded', 'Origins'])} {len(titles)}")
+        popularity.append(rng.randrange(100))
+    return titles, popularity
+
+
+def timed(fn, queries):
+    results, times = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(fn(q))
+        times.append((time.perf_counter() - start) * 1000)
+    return results, times
+
+
+def describe(times):
+    times = sorted(times)
+    p95 = times[int(0.95 * (len(times) - 1))]
+    return f"mean {statistics.mean(times):7.2f} ms  p50 {statistics.median(times):7.2f} ms  p95 {p95:7.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default='movies_clean.csv')
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--typos', type=int, default=2)
+    parser.add_argument('--scale', type=int, default=0, help='pad catalog to this many titles')
+    parser.add_argument('--difflib-sample', type=int, default=50, help='queries timed with difflib when scaled')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    df = pd.read_csv(args.csv, usecols=['original_title', 'vote_count'])
+    titles = df['original_title'].fillna('').astype(str).tolist()
+    popularity = df['vote_count'].tolist()
+    sources = rng.sample([t for t in titles if len(t) >= 4], args.queries)
+    queries = [add_typos(t, rng, args.typos) for t in sources]
+
+    if args.scale > len(titles):
+        titles, popularity = scaled_catalog(titles, popularity, args.scale, rng)
+
+    start = time.perf_counter()
+    index = TitleIndex(titles, popularity)
+    print(f"Catalog: {len(titles)} titles, index built in {time.perf_counter() - start:.2f} s")
+
+    ours, our_times = timed(lambda q: index.suggest(q, n=5, cutoff=0.3), queries)
+    sample = queries if args.scale <= 0 else queries[:args.difflib_sample]
+    theirs, their_times = timed(lambda q: difflib.get_close_matches(q, titles, n=5, cutoff=0.3), sample)
+
+    print(f"TitleIndex.suggest: {describe(our_times)}")
+    print(f"difflib           : {describe(their_times)}  ({len(sample)} queries)")
+
+    our_hits = sum(src in res for src, res in zip(sources, ours)) / len(queries)
+    their_hits = sum(src in res for src, res in zip(sources, theirs)) / len(sample)
+    overlaps = [len(set(a) & set(b)) / len(b) for a, b in zip(ours, theirs) if b]
+    print(f"hit@5      : index {our_hits:.3f}  difflib {their_hits:.3f}")
+    if overlaps:
+        print(f"overlap@5  : {statistics.mean(overlaps):.3f} of difflib's suggestions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Compare model representations with the full-precision baseline.
+
+Builds the baseline model (float64 TF-IDF over the full vocabulary, exact
+neighbors) and one model per configuration, then reports for each:
+  - memory of the similarity vectors and of the neighbor tables (what each
+    API worker maps) and the reduction vs the baseline
+  - overlap@N: share of a movie's top-N recommendations that the baseline
+    also recommends, averaged over all movies
+  - max score error vs the baseline on the recommendations they share
+
+    python benchmarks/bench_representation.py [--csv movies_clean.csv]
+    python benchmarks/bench_representation.py vector_dtype=float32,score_dtype=float16 lsa_components=256
+
+A configuration is a comma-separated list of representation keys (see
+model_store.BASELINE_REPRESENTATION); the same keys are set in production via
+VECTOR_DTYPE, SCORE_DTYPE, TFIDF_MAX_FEATURES, TFIDF_MIN_DF and LSA_COMPONENTS.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_store import BASELINE_REPRESENTATION, build_model, model_nbytes  # noqa: E402
+
+DEFAULT_CONFIGS = [
+    'vector_dtype=float32',
+    'vector_dtype=float32,score_dtype=float16',
+    'vector_dtype=float32,score_dtype=float16,min_df=2',
+    'vector_dtype=float32,score_dtype=float16,max_features=10000',
+    'vector_dtype=float32,score_dtype=float16,lsa_components=256',
+    'vector_dtype=float32,score_dtype=float16,lsa_components=128',
+]
+
+
+def parse_config(text):
+    representation = dict(BASELINE_REPRESENTATION)
+    for item in filter(None, text.split(',')):
+        key, _, value = item.partition('=')
+        if key not in representation:
+            raise SystemExit(f"Unknown representation key: {key}")
+        representation[key] = value if key.endswith('dtype') else (int(value) or None)
+    representation['lsa_components'] = representation['lsa_components'] or 0
+    representation['min_df'] = representation['min_df'] or 1
+    return representation
+
+
+def recommendations(model, n):
+    """(N x n) recommended rows per movie, excluding the movie itself, and their scores"""
+    ids = np.asarray(model['neighbor_ids'])
+    scores = np.asarray(model['neighbor_scores'], dtype=np.float64)
+    own = ids == np.arange(len(ids))[:, None]
+    keep = np.argsort(own, axis=1, kind='stable')[:, :n]
+    return np.take_along_axis(ids, keep, axis=1), np.take_along_axis(scores, keep, axis=1)
+
+
+def overlap(ids, baseline_ids):
+    return float(np.mean([len(np.intersect1d(a, b)) / len(b) for a, b in zip(ids, baseline_ids)]))
+
+
+def score_error(ids, scores, baseline_ids, baseline_scores):
+    worst = 0.0
+    for a, sa, b, sb in zip(ids, scores, baseline_ids, baseline_scores):
+        _, ia, ib = np.intersect1d(a, b, return_indices=True)
+        if len(ia):
+            worst = max(worst, float(np.abs(sa[ia] - sb[ib]).max()))
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('configs', nargs='*', default=DEFAULT_CONFIGS)
+    parser.add_argument('--csv', default='movies_clean.csv')
+    parser.add_argument('--k', type=int, default=50)
+    args = parser.parse_args()
+
+    def build(representation):
+        start = time.perf_counter()
+        model = build_model(args.csv, k=args.k, representation=representation)
+        return model, time.perf_counter() - start
+
+    baseline, seconds = build(BASELINE_REPRESENTATION)
+    base_bytes = model_nbytes(baseline)
+    base_total = sum(base_bytes.values())
+    base_recs = {n: recommendations(baseline, n) for n in (5, 10, args.k)}
+
+    rows = [('baseline (float64, full vocabulary)', base_bytes, base_total, seconds, 1.0, 1.0, 1.0, 0.0)]
+    for text in args.configs:
+        model, seconds = build(parse_config(text))
+        nbytes = model_nbytes(model)
+        overlaps = []
+        for n, (base_ids, base_scores) in base_recs.items():
+            ids, scores = recommendations(model, n)
+            overlaps.append(overlap(ids, base_ids))
+        ids, scores = recommendations(model, args.k)
+        error = score_error(ids, scores, *base_recs[args.k])
+        rows.append((text, nbytes, sum(nbytes.values()), seconds, *overlaps, error))
+
+    print()
+    print(f"{'representation':<62} {'vectors':>9} {'tables':>9} {'total':>9} {'vs base':>7} "
+          f"{'build':>7} {'ov@5':>6} {'ov@10':>6} {f'ov@{args.k}':>6} {'max err':>8}")
+    for name, nbytes, total, seconds, ov5, ov10, ovk, error in rows:
+        print(f"{name:<62} {nbytes['vectors'] / 2**20:7.1f}MB {nbytes['neighbors'] / 2**20:7.1f}MB "
+              f"{total / 2**20:7.1f}MB {base_total / total:6.1f}x {seconds:6.1f}s "
+              f"{ov5:6.3f} {ov10:6.3f} {ovk:6.3f} {error:8.5f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Profile API startup: time and memory of every phase, and the heaviest imports.
+
+Imports api in a fresh interpreter with STARTUP_PROFILE=1 and reports:
+  - each startup phase (see model_store.phase): imports, movie table read,
+    soup, TF-IDF fit, neighbor index, artifact load / save, catalog indexes
+  - time until the app object exists (the server could accept connections)
+    and until the model is ready, per MODEL_WARMUP mode
+  - the modules with the largest cumulative import time (python -X importtime)
+
+    python benchmarks/bench_startup.py [--csv movies_clean.csv] [--warmup eager,background]
+    python benchmarks/bench_startup.py --rebuild      # profile the build from the CSV
+
+--rebuild points MODEL_DIR into an empty directory so the model is built
+instead of loaded from model_artifact/.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from model_store import DEFAULT_CSV_PATH  # noqa: E402
+
+# Run in the child: time `import api` and, for background / lazy warm-up, the model load
+CHILD = """
+import json, time
+start = time.perf_counter()
+import api
+app_ready = time.perf_counter() - start
+if api.catalog is None and api.app.config['MODEL_WARMUP'] == 'lazy':
+    api.load_catalog()
+while api.catalog is None and api.load_state['status'] == 'loading':
+    time.sleep(0.01)
+print('RESULT ' + json.dumps({'app': app_ready, 'model': time.perf_counter() - start,
+                              'status': api.load_state['status']}))
+"""
+
+PHASE_LINE = re.compile(r'^\[startup\] (\S+)\s+([\d.]+) s\s+rss\s+([\d.]+) MB(?: \(([-+\d.]+) MB\))?')
+
+
+def run_child(warmup, env):
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD], cwd=ROOT, capture_output=True,
+                          text=True, env=dict(env, MODEL_WARMUP=warmup))
+    phases, result = [], None
+    for line in proc.stdout.splitlines():
+        match = PHASE_LINE.match(line)
+        if match:
+            phases.append((match[1], float(match[2]), float(match[3]), match[4]))
+        elif line.startswith('RESULT '):
+            result = json.loads(line[len('RESULT '):])
+    if result is None:
+        sys.exit(f"❌ import api failed ({warmup}):\n{proc.stderr[-2000:]}")
+    return phases, result, import_times(proc.stderr)
+
+
+def import_times(stderr):
+    """(cumulative seconds, package) for each top-level package imported, from -X importtime output"""
+    times = {}
+    for line in stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            name = name.strip()
+            if cumulative.strip().isdigit() and '.' not in name and name != 'api':
+                # Nested imports are listed first; the outermost import of a package is the last
+                times[name] = int(cumulative) / 1e6
+    return sorted(((seconds, name) for name, seconds in times.items()), reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=DEFAULT_CSV_PATH)
+    parser.add_argument('--warmup', default='eager,background', help='MODEL_WARMUP modes to profile')
+    parser.add_argument('--rebuild', action='store_true', help='build the model instead of loading the artifact')
+    parser.add_argument('--imports', type=int, default=10, help='heaviest imports to list')
+    args = parser.parse_args()
+
+    env = dict(os.environ, STARTUP_PROFILE='1', CATALOG_POLL_INTERVAL='0', MOVIES_PATH=os.path.abspath(args.csv))
+    modes = args.warmup.split(',')
+    for warmup in modes:
+        if args.rebuild:
+            tmp = tempfile.mkdtemp(prefix='bench-startup-')
+            env['MODEL_DIR'] = os.path.join(tmp, 'model_artifact')
+        try:
+            phases, result, imports = run_child(warmup, env)
+        finally:
+            if args.rebuild:
+                shutil.rmtree(tmp, ignore_errors=True)
+        print(f"\nMODEL_WARMUP={warmup}: app importable in {result['app']:.2f} s, "
+              f"model {result['status']} after {result['model']:.2f} s")
+        print(f"  {'phase':<16} {'seconds':>8} {'rss MB':>9} {'growth':>9}")
+        for name, seconds, rss, growth in phases:
+            print(f"  {name:<16} {seconds:8.3f} {rss:9.1f} {growth or '':>9}")
+        if warmup == modes[0] and args.imports:
+            print("\n  Heaviest imports (cumulative):")
+            for seconds, module in imports[:args.imports]:
+                print(f"  {module:<32} {seconds:8.3f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from genre_index import GenreIndex
+from movie_store import MovieStore
+from neighbors import search_neighbors
+from ranking import Rankings
+from search_index import SearchIndex
+from title_index import TitleIndex
+
+
+class Catalog:
+    """One model version plus every lookup structure the API derives from it.
+
+    Built in full before it is published, so swapping the API's reference to
+    a new Catalog switches all of them at once; a request keeps using the
+    Catalog it started with.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.fingerprint = model['fingerprint']
+        # Changes whenever the CSV / update log (or the model recipe) changes; used in ETags
+        self.version = self.fingerprint[:12]
+        self.built_at = model.get('built_at')
+        self.pending_updates = model.get('pending_updates', 0)
+
+        df = self.df = model['df']
+        self.tfidf = model['tfidf']
+        self.tfidf_matrix = model['tfidf_matrix']
+        self.neighbor_ids = model['neighbor_ids']
+        self.neighbor_scores = model['neighbor_scores']
+        # Inverted-index candidate search when built with NEIGHBOR_MODE=ann
+        self.ann = model.get('ann')
+
+        # Title -> row index (first occurrence of duplicated titles)
+        self.indices = model['indices']
+
+        # Columnar movie records + TMDB id -> row map used to build every response
+        self.movies_store = MovieStore(df)
+
+        # Exact / case-insensitive / partial title resolution for /api/recommend
+        self.title_index = TitleIndex(df['original_title'], df['vote_count'])
+
+        # Genre vocabulary + genre -> rows postings, parsed once
+        self.genre_index = GenreIndex(df['genres'])
+
+        # Weighted-rating order, overall and per genre, for /api/top
+        self.rankings = Rankings(self.movies_store.ratings, self.movies_store.vote_counts, self.genre_index)
+
+        self.analytics = self.build_analytics()
+
+        # Title words x genre x rating x year search for /api/search
+        self.search_index = SearchIndex(
+            self.movies_store.titles,
+            self.movies_store.ratings,
+            df['release_date'] if 'release_date' in df.columns else [None] * len(df),
+            self.genre_index,
+            self.title_index,
+        )
+
+    def search_neighbors(self, queries, k):
+        """Top-k rows by cosine similarity for each query row (see neighbors.search_neighbors)"""
+        if self.ann is not None:
+            return self.ann.search(queries, self.tfidf_matrix, k)
+        return search_neighbors(queries, self.tfidf_matrix, k)
+
+    def weighted_centroid(self, rows, weights):
+        """Unit-norm weighted mean of the vectors of rows, as a (1 x dim) matrix"""
+        weights = np.asarray(weights, dtype=np.float64)
+        centroid = sparse.csr_matrix(weights / weights.sum()) @ self.tfidf_matrix[rows]
+        # Frobenius norm as scipy.sparse.linalg.norm computes it (that module costs ~70 ms to import)
+        norm = np.linalg.norm(centroid.data if sparse.issparse(centroid) else centroid)
+        return centroid / norm if norm > 0 else centroid
+
+    def build_analytics(self):
+        """Precompute the /api/stats, /api/genres and /api/analytics/* payloads"""
+        df = self.df
+        date_range = {'oldest': '1902', 'newest': '2024'}
+        if 'release_date' in df.columns:
+            oldest = df['release_date'].min()
+            newest = df['release_date'].max()
+            if pd.notna(oldest):
+                date_range['oldest'] = str(oldest)[:4]  # Year only
+            if pd.notna(newest):
+                date_range['newest'] = str(newest)[:4]
+
+        # Same bins as before: [lo, hi) each, so a 10.0 rating is not counted
+        ratings = self.movies_store.ratings
+        ratings = ratings[(ratings >= 0) & (ratings < 10)]
+        rating_counts, _ = np.histogram(ratings, bins=[0, 2, 4, 6, 8, 10])
+
+        top_genres = self.genre_index.most_common(15)
+        genres = self.genre_index.vocabulary()
+        return {
+            'version': self.version,
+            'stats': {
+                'total_movies': len(df),
+                'average_rating': round(float(df['vote_average'].mean()), 2),
+                'total_genres': len(df['genres'].unique()),
+                'date_range': date_range
+            },
+            'genres': {'genres': genres, 'count': len(genres)},
+            'rating_distribution': {
+                'labels': ['0-2', '2-4', '4-6', '6-8', '8-10'],
+                'counts': rating_counts.tolist(),
+                'total': len(df)
+            },
+            'genre_frequency': {
+                'labels': [g for g, _ in top_genres],
+                'counts': [c for _, c in top_genres]
+            },
+        }
@@ -0,0 +1,188 @@
+"""Add or edit movies without refitting TF-IDF or restarting the API.
+
+New text is transformed with the fitted vocabulary and idf, and only the
+affected neighbor lists are recomputed:
+
+- added / edited movies get fresh top-K lists against the whole catalog;
+- movies whose list contained an edited movie are recomputed (their scores
+  for it are stale);
+- every other movie merges the added / edited movies into its existing list,
+  which is exact because none of its other scores changed.
+
+Records are appended to the update log (model_store.DEFAULT_UPDATES_PATH) and
+the patched model is saved over the artifact; running API workers notice the
+new manifest and swap it in. Words that are not in the fitted vocabulary are
+ignored until the next full refit, which `refit` performs (the API schedules
+it, see CATALOG_REFIT_INTERVAL in api.py).
+
+    python catalog_updates.py add new_movies.json     # list of records or JSONL
+    python catalog_updates.py refit [--force]
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+from scipy import sparse
+
+from ann_index import AnnIndex
+from model_store import (DEFAULT_ARTIFACT_DIR, DEFAULT_CSV_PATH, DEFAULT_UPDATES_PATH, apply_records,
+                         artifact_lock, build_model, build_title_index, csv_fingerprint, load_model,
+                         read_manifest, save_model, transform_text)
+from neighbors import build_neighbor_index, search_neighbors
+
+def _merge_candidates(neighbor_ids, neighbor_scores, rows, sims, candidates):
+    """Merge candidate rows into the neighbor lists of `rows` where they rank high enough.
+
+    sims is a sparse (len(rows) x len(candidates)) similarity matrix.
+    """
+    sims = sparse.csr_matrix(sims)
+    sims.data = sims.data.astype(np.float32)
+    kth = neighbor_scores[rows, -1]
+    best = sims.max(axis=1).toarray().ravel()
+    for i in np.flatnonzero(best >= kth).tolist():
+        row = rows[i]
+        start, stop = sims.indptr[i], sims.indptr[i + 1]
+        ids = np.concatenate([neighbor_ids[row], candidates[sims.indices[start:stop]]])
+        scores = np.concatenate([neighbor_scores[row], sims.data[start:stop]])
+        # Descending score, ties by lower row id (same order as the full build)
+        order = np.lexsort((ids, -scores))[:neighbor_ids.shape[1]]
+        neighbor_ids[row], neighbor_scores[row] = ids[order], scores[order]
+
+
+def update_model(model, records):
+    """New model with records applied, reusing the fitted TF-IDF vocabulary and idf"""
+    old_df = model['df']
+    n_old = len(old_df)
+    df, touched = apply_records(old_df, records)
+    touched = np.asarray(touched, dtype=np.int32)
+    edited = touched[touched < n_old]
+
+    # Old rows, with touched rows replaced by their newly transformed text
+    fresh = transform_text(model, df['soup'].iloc[touched])
+    if sparse.issparse(fresh):
+        stacked = sparse.vstack([model['tfidf_matrix'], fresh], format='csr')
+    else:
+        stacked = np.vstack([model['tfidf_matrix'], fresh]).astype(model['tfidf_matrix'].dtype, copy=False)
+    source = np.arange(len(df))
+    source[touched] = n_old + np.arange(len(touched))
+    tfidf_matrix = stacked[source]
+
+    # ANN models: postings are rebuilt for the new matrix (a transpose, no refit)
+    ann = AnnIndex.build(tfidf_matrix) if model.get('ann') is not None else None
+    search = ann.search if ann is not None else search_neighbors
+
+    k = model['k']
+    width = model['neighbor_ids'].shape[1]
+    score_dtype = model['neighbor_scores'].dtype
+    if width < min(k + 1, len(df)):
+        # Catalog was smaller than k: the tables grow, so rebuild them
+        if ann is not None:
+            neighbor_ids, neighbor_scores = ann.neighbor_tables(tfidf_matrix, k=k)
+        else:
+            neighbor_ids, neighbor_scores = build_neighbor_index(tfidf_matrix, k=k)
+        neighbor_scores = neighbor_scores.astype(score_dtype, copy=False)
+    else:
+        neighbor_ids = np.empty((len(df), width), dtype=np.int32)
+        neighbor_scores = np.empty((len(df), width), dtype=score_dtype)
+        neighbor_ids[:n_old] = model['neighbor_ids']
+        neighbor_scores[:n_old] = model['neighbor_scores']
+
+        stale = np.flatnonzero(np.isin(neighbor_ids[:n_old], edited).any(axis=1)) if len(edited) else []
+        redo = np.union1d(touched, stale).astype(np.int32)
+        neighbor_ids[redo], neighbor_scores[redo] = search(tfidf_matrix[redo], tfidf_matrix, width)
+
+        rest = np.setdiff1d(np.arange(n_old, dtype=np.int32), redo, assume_unique=True)
+        _merge_candidates(neighbor_ids, neighbor_scores, rest, tfidf_matrix[rest] @ fresh.T, touched)
+
+    return dict(
+        model,
+        df=df,
+        tfidf_matrix=tfidf_matrix,
+        neighbor_ids=neighbor_ids,
+        neighbor_scores=neighbor_scores,
+        indices=build_title_index(df['original_title']),
+        ann=ann,
+        pending_updates=model.get('pending_updates', 0) + len(records),
+    )
+
+
+def add_movies(records, csv_path=DEFAULT_CSV_PATH, artifact_dir=DEFAULT_ARTIFACT_DIR,
+               updates_path=DEFAULT_UPDATES_PATH, k=50):
+    """Apply records to the saved model, log them and save the result.
+
+    Returns the new model, memory-mapped from the artifact. Raises ValueError
+    for invalid records (nothing is written then).
+    """
+    with artifact_lock(artifact_dir):
+        model = load_model(artifact_dir, fingerprint=csv_fingerprint(csv_path, k, updates_path))
+        if model is None or model['k'] != k:
+            print("Model artifact missing or stale; rebuilding before the update...")
+            model = build_model(csv_path, k=k, updates_path=updates_path)
+
+        model = update_model(model, records)
+        with open(updates_path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        model['fingerprint'] = csv_fingerprint(csv_path, k, updates_path)
+        save_model(model, artifact_dir)
+        return load_model(artifact_dir) or model
+
+
+def refit_due(manifest, interval, now):
+    """Whether patched-in updates are older than `interval` seconds past the last fit"""
+    if manifest is None or not manifest.get('pending_updates'):
+        return False
+    return now - (manifest.get('fitted_at') or 0) >= interval
+
+
+def refit(csv_path=DEFAULT_CSV_PATH, artifact_dir=DEFAULT_ARTIFACT_DIR, updates_path=DEFAULT_UPDATES_PATH,
+          k=50, force=False):
+    """Full refit from the CSV and update log; skipped unless updates are pending (or force)"""
+    with artifact_lock(artifact_dir):
+        manifest = read_manifest(artifact_dir)
+        if not force and manifest is not None and not manifest.get('pending_updates'):
+            return False
+        model = build_model(csv_path, k=k, updates_path=updates_path)
+        save_model(model, artifact_dir)
+        return True
+
+
+def read_records(path):
+    """Records from a JSON list / object file or a JSONL file"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    return data if isinstance(data, list) else [data]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=('add', 'refit'))
+    parser.add_argument('path', nargs='?', help='movie records to add (add only)')
+    parser.add_argument('--csv', default=DEFAULT_CSV_PATH)
+    parser.add_argument('--force', action='store_true', help='refit even without pending updates')
+    args = parser.parse_args()
+    k = int(os.getenv("TOP_K_NEIGHBORS", "50"))
+
+    if args.command == 'add':
+        if not args.path:
+            parser.error('add needs a file of movie records')
+        try:
+            model = add_movies(read_records(args.path), args.csv, k=k)
+        except ValueError as e:
+            sys.exit(f"❌ {e}")
+        print(f"✅ Catalog updated: {len(model['df'])} movies, "
+              f"{model['pending_updates']} updates since the last full fit")
+    elif refit(args.csv, k=k, force=args.force):
+        print(f"✅ Model refitted and written to {DEFAULT_ARTIFACT_DIR}")
+    else:
+        print("No pending updates; nothing to refit")
+
+
+if __name__ == '__main__':
+    main()
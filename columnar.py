@@ -0,0 +1,122 @@
+"""Typed columnar movie table: a directory with one .npy file per column.
+
+Numeric columns are plain arrays. Text columns are their UTF-8 bytes
+concatenated (<name>.npy, uint8) plus row boundaries (<name>.offsets.npy,
+int64, rows + 1 entries), so nothing is pickled and every file can be
+memory-mapped. manifest.json lists the columns, their types and the row count.
+
+Written chunk by chunk by prepare_data.py (ColumnWriter) and read back as a
+DataFrame by model_store.load_movies (read_table).
+"""
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+MANIFEST = 'manifest.json'
+
+
+def is_table(path):
+    """Whether path is a columnar table directory (rather than a CSV file)"""
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def _write_npy(path, part_path, dtype, length):
+    """Wrap the raw values in part_path into a .npy file at path"""
+    header = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': (length,)}
+    with open(path, 'wb') as out, open(part_path, 'rb') as part:
+        np.lib.format.write_array_header_1_0(out, header)
+        shutil.copyfileobj(part, out, 1 << 20)
+    os.remove(part_path)
+
+
+class ColumnWriter:
+    """Append DataFrame chunks to a columnar table; close() publishes it.
+
+    schema maps each column to a numpy dtype name, or 'str' for text. Values
+    stream to raw files in a temporary directory next to path, so memory use
+    is bounded by the chunk size; close() replaces path atomically.
+    """
+
+    def __init__(self, path, schema):
+        self.path = os.path.abspath(path)
+        self.schema = dict(schema)
+        self.rows = 0
+        parent = os.path.dirname(self.path)
+        os.makedirs(parent, exist_ok=True)
+        self.tmp_dir = tempfile.mkdtemp(prefix='.table-', dir=parent)
+        self.files = {}
+        self.text_bytes = {}
+        for name, kind in self.schema.items():
+            self.files[name] = open(os.path.join(self.tmp_dir, name + '.part'), 'wb')
+            if kind == 'str':
+                self.files[name + '.offsets'] = f = open(os.path.join(self.tmp_dir, name + '.offsets.part'), 'wb')
+                f.write(np.zeros(1, dtype=np.int64).tobytes())
+                self.text_bytes[name] = 0
+
+    def append(self, df):
+        for name, kind in self.schema.items():
+            values = df[name]
+            if kind == 'str':
+                encoded = [v.encode('utf-8') if isinstance(v, str) else b'' for v in values]
+                ends = self.text_bytes[name] + np.cumsum([len(v) for v in encoded], dtype=np.int64)
+                if len(ends):
+                    self.text_bytes[name] = int(ends[-1])
+                self.files[name].write(b''.join(encoded))
+                self.files[name + '.offsets'].write(ends.tobytes())
+            else:
+                self.files[name].write(values.to_numpy(dtype=kind).tobytes())
+        self.rows += len(df)
+
+    def close(self):
+        """Finish the .npy files, write the manifest and move the table into place"""
+        try:
+            for f in self.files.values():
+                f.close()
+            for name, kind in self.schema.items():
+                part = os.path.join(self.tmp_dir, name + '.part')
+                if kind == 'str':
+                    _write_npy(os.path.join(self.tmp_dir, name + '.npy'), part, np.uint8, self.text_bytes[name])
+                    _write_npy(os.path.join(self.tmp_dir, name + '.offsets.npy'),
+                               os.path.join(self.tmp_dir, name + '.offsets.part'), np.int64, self.rows + 1)
+                else:
+                    _write_npy(os.path.join(self.tmp_dir, name + '.npy'), part, kind, self.rows)
+            with open(os.path.join(self.tmp_dir, MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump({'rows': self.rows, 'columns': self.schema}, f, indent=2)
+
+            if os.path.exists(self.path):
+                shutil.rmtree(self.path)
+            os.replace(self.tmp_dir, self.path)
+        except Exception:
+            self.abort()
+            raise
+        return self.path
+
+    def abort(self):
+        for f in self.files.values():
+            f.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+def read_column(path, name, kind):
+    """One column as a numpy array; text columns as objects, '' read back as None (like read_csv)"""
+    if kind != 'str':
+        return np.load(os.path.join(path, name + '.npy'))
+    data = np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+    offsets = np.load(os.path.join(path, name + '.offsets.npy')).tolist()
+    buf = data.tobytes() if len(data) else b''
+    values = np.empty(len(offsets) - 1, dtype=object)
+    values[:] = [buf[start:stop].decode('utf-8') if stop > start else None
+                 for start, stop in zip(offsets[:-1], offsets[1:])]
+    return values
+
+
+def read_table(path, columns=None):
+    """The table at path as a DataFrame (all columns, or the given ones)"""
+    with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+        schema = json.load(f)['columns']
+    names = columns or list(schema)
+    return pd.DataFrame({name: read_column(path, name, schema[name]) for name in names})
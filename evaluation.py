@@ -1,241 +1,211 @@
-import pandas as pd
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import linear_kernel
-from sklearn.metrics import mean_squared_error, mean_absolute_error
-import math
+"""Đánh giá offline hệ thống gợi ý (Content-Based, TF-IDF).
 
-print("=== ĐÁNH GIÁ HỆ THỐNG GỢI Ý PHIM ===\n")
-
-# 1. Load dữ liệu
-df = pd.read_csv('movies_clean.csv')
-df['overview'] = df['overview'].fillna('')
-df['genres'] = df['genres'].fillna('')
-df['keywords'] = df['keywords'].fillna('')
-
-print(f"📊 Tổng số phim: {len(df)}")
-print(f"📊 Số features: {len(df.columns)}")
-print(f"📊 Điểm đánh giá trung bình: {df['vote_average'].mean():.2f}")
-print(f"📊 Điểm đánh giá min-max: {df['vote_average'].min():.2f} - {df['vote_average'].max():.2f}\n")
-
-# ======================================================
-# 2. XÂY DỰNG MỐI QUAN HỆ COSINE SIMILARITY
-# ======================================================
-print("⏳ Đang xây dựng mô hình TF-IDF + Cosine Similarity...")
-
-df['soup'] = df['overview'] + ' ' + df['genres'] + ' ' + df['keywords']
-tfidf = TfidfVectorizer(stop_words='english')
-tfidf_matrix = tfidf.fit_transform(df['soup'])
-cosine_sim = linear_kernel(tfidf_matrix, tfidf_matrix)
-
-print(f"✅ Ma trận Cosine Similarity: {cosine_sim.shape}\n")
-
-# ======================================================
-# 3. HÀM GỢI Ý VÀ ĐÁNH GIÁ
-# ======================================================
-
-def get_recommendations(title, k=10):
-    """Trả về k phim gợi ý cho một phim chỉ định"""
-    indices = pd.Series(df.index, index=df['original_title']).drop_duplicates()
-    
-    if title not in indices:
-        return None
-    
-    idx = indices[title]
-    sim_scores = list(enumerate(cosine_sim[idx]))
-    sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-    sim_scores = sim_scores[1:k+1]  # Bỏ chính phim đó
-    
-    movie_indices = [i[0] for i in sim_scores]
-    scores = [i[1] for i in sim_scores]
-    
-    return df['original_title'].iloc[movie_indices].values, scores
-
-# ======================================================
-# 4. METRIC: PRECISION@K & RECALL@K
-# ======================================================
-print("=== METRIC 1: PRECISION@K & RECALL@K ===\n")
-
-def calculate_precision_recall(title, k=5):
-    """
-    Tính Precision@K và Recall@K
-    - Giả định: Phim cùng thể loại là "relevant"
-    """
-    indices = pd.Series(df.index, index=df['original_title']).drop_duplicates()
-    
-    if title not in indices:
-        return 0, 0
-    
-    idx = indices[title]
-    query_genres_raw = df.iloc[idx]['genres']
-    
-    # Parse genres từ string sang set
-    import ast
-    try:
-        query_genres = set([g.lower() for g in ast.literal_eval(query_genres_raw)])
-    except:
-        query_genres = set()
-    
-    if not query_genres:
-        return 0, 0
-    
-    # Lấy k phim gợi ý
-    recommendations, _ = get_recommendations(title, k=k)
-    
-    if recommendations is None:
-        return 0, 0
-    
-    # Đếm số phim gợi ý có cùng thể loại (relevant)
-    relevant = 0
-    total_relevant = 0
-    
-    for rec_title in recommendations:
-        rec_genres_raw = df[df['original_title'] == rec_title]['genres'].values[0]
-        try:
-            rec_genres = set([g.lower() for g in ast.literal_eval(rec_genres_raw)])
-        except:
-            rec_genres = set()
-        
-        # Kiểm tra có giao tập genre không
-        if query_genres & rec_genres:
-            relevant += 1
-    
-    # Tổng số phim cùng thể loại trong dataset
-    for _, row in df.iterrows():
-        try:
-            row_genres = set([g.lower() for g in ast.literal_eval(row['genres'])])
-        except:
-            row_genres = set()
-        
-        if (query_genres & row_genres) and row['original_title'] != title:
-            total_relevant += 1
-    
-    precision = relevant / k if k > 0 else 0
-    recall = relevant / total_relevant if total_relevant > 0 else 0
-    
-    return precision, recall
-
-# Test trên một số phim
-test_movies = ['Avatar', 'Frozen', 'The Dark Knight']
-precisions = []
-recalls = []
-
-for movie in test_movies:
-    prec, rec = calculate_precision_recall(movie, k=5)
-    precisions.append(prec)
-    recalls.append(rec)
-    print(f"🎬 '{movie}':")
-    print(f"   Precision@5: {prec:.4f}")
-    print(f"   Recall@5: {rec:.4f}")
-    print()
-
-avg_precision = np.mean(precisions) if precisions else 0
-avg_recall = np.mean(recalls) if recalls else 0
-print(f"📊 Average Precision@5: {avg_precision:.4f}")
-print(f"📊 Average Recall@5: {avg_recall:.4f}\n")
-
-# ======================================================
-# 5. METRIC: RMSE & MAE (dựa trên độ tương đồng)
-# ======================================================
-print("=== METRIC 2: RMSE & MAE ===\n")
-
-def calculate_rmse_mae(sample_size=100):
-    """
-    RMSE & MAE dựa trên độ tương đồng của các gợi ý
-    So sánh độ tương đồng giữa phim gốc và gợi ý
-    """
-    indices = pd.Series(df.index, index=df['original_title']).drop_duplicates()
-    
-    sample_movies = np.random.choice(list(indices.index), size=min(sample_size, len(indices)), replace=False)
-    
-    true_values = []
-    pred_values = []
-    
-    for movie in sample_movies:
-        recommendations, scores = get_recommendations(movie, k=5)
-        if recommendations is not None:
-            # "True value": Giả định là 1.0 nếu gợi ý đó là phim tốt
-            # "Predicted value": Độ tương đồng cosine
-            true_values.extend([1.0] * len(scores))
-            pred_values.extend(scores)
-    
-    if len(true_values) == 0:
-        return 0, 0
-    
-    mse = mean_squared_error(true_values, pred_values)
-    rmse = math.sqrt(mse)
-    mae = mean_absolute_error(true_values, pred_values)
-    
-    return rmse, mae
-
-rmse, mae = calculate_rmse_mae(sample_size=100)
-print(f"📊 RMSE (Root Mean Square Error): {rmse:.4f}")
-print(f"📊 MAE (Mean Absolute Error): {mae:.4f}\n")
-
-# ======================================================
-# 6. BENCHMARK: So sánh với Random Recommendation
-# ======================================================
-print("=== METRIC 3: Baseline Comparison (vs Random) ===\n")
-
-def evaluate_random_baseline(sample_size=50):
-    """So sánh với gợi ý ngẫu nhiên"""
-    indices = pd.Series(df.index, index=df['original_title']).drop_duplicates()
-    sample_movies = np.random.choice(list(indices.index), size=min(sample_size, len(indices)), replace=False)
-    
-    baseline_precisions = []
-    our_precisions = []
-    
-    for movie in sample_movies:
-        # Our model
-        our_prec, _ = calculate_precision_recall(movie, k=5)
-        our_precisions.append(our_prec)
-        
-        # Random baseline (giả định random precision ~= 20% trong một dataset cân bằng)
-        baseline_prec = np.random.uniform(0.1, 0.3)
-        baseline_precisions.append(baseline_prec)
-    
-    our_avg = np.mean(our_precisions)
-    baseline_avg = np.mean(baseline_precisions)
-    improvement = ((our_avg - baseline_avg) / baseline_avg * 100) if baseline_avg > 0 else 0
-    
-    return our_avg, baseline_avg, improvement
-
-our_score, baseline_score, improvement = evaluate_random_baseline(sample_size=50)
-print(f"📊 Our Model Precision@5:    {our_score:.4f}")
-print(f"📊 Random Baseline:          {baseline_score:.4f}")
-print(f"📊 Improvement vs Baseline:  {improvement:.1f}%\n")
-
-# ======================================================
-# 7. XUẤT BÁO CÁO
-# ======================================================
-print("=" * 60)
-print("TÓSUM KẾT ĐÁNH GIÁ")
-print("=" * 60)
-
-evaluation_report = f"""
-MODEL: Content-Based Filtering (TF-IDF + Cosine Similarity)
-
-PERFORMANCE METRICS:
-- Average Precision@5:  {avg_precision:.4f}
-- Average Recall@5:     {avg_recall:.4f}
-- RMSE:                 {rmse:.4f}
-- MAE:                  {mae:.4f}
-
-BASELINE COMPARISON:
-- Our Model vs Random:  +{improvement:.1f}% improvement
-- Model Precision:      {our_score:.4f}
-- Baseline Precision:   {baseline_score:.4f}
-
-DATASET INFO:
-- Total Items:          {len(df)}
-- Feature Dimensions:   {tfidf_matrix.shape[1]}
-- Average Rating:       {df['vote_average'].mean():.2f}/10
+Mọi chỉ số được tính cho tất cả phim cùng lúc bằng phép toán ma trận:
+- thể loại được parse một lần thành ma trận thưa phim x thể loại;
+- gợi ý lấy từ bảng top-K láng giềng của model (model_store), đúng như API phục vụ;
+- một phim gợi ý là "relevant" nếu có chung ít nhất một thể loại với phim gốc
+  (không phân biệt hoa thường).
+
+Chỉ số: Precision@K, Recall@K, nDCG@K, Coverage (tỉ lệ phim trong catalog được
+gợi ý ít nhất một lần), RMSE / MAE của độ tương đồng; so sánh với gợi ý ngẫu
+nhiên (RNG có seed). Kết quả ghi ra evaluation_report.json (cho máy đọc) và
+evaluation_report.txt.
+
+    python evaluation.py [--k 5,10,20] [--sample 0] [--seed 42] [--csv movies_clean.csv]
 """
+import argparse
+import datetime
+import json
+import math
+import os
+import time
+
+import numpy as np
+from scipy import sparse
+
+from genre_index import GenreIndex
+from model_store import DEFAULT_ARTIFACT_DIR, DEFAULT_CSV_PATH, load_or_build
+from neighbors import build_neighbor_index
 
-print(evaluation_report)
 
-# Lưu báo cáo
-with open('evaluation_report.txt', 'w', encoding='utf-8') as f:
-    f.write(evaluation_report)
+def recommendation_table(model, k):
+    """(N x k) phim gợi ý cho mỗi phim (bỏ chính nó) và điểm, tốt nhất trước"""
+    ids = np.asarray(model['neighbor_ids'])
+    scores = np.asarray(model['neighbor_scores'], dtype=np.float64)
+    k = min(k, len(ids) - 1)
+    if ids.shape[1] < k + 1:
+        # Bảng của model ngắn hơn K: tính lại bảng top-K (chính xác)
+        ids, scores = build_neighbor_index(model['tfidf_matrix'], k=k)
+        scores = scores.astype(np.float64)
+    own = ids == np.arange(len(ids))[:, None]
+    keep = np.argsort(own, axis=1, kind='stable')[:, :k]
+    return np.take_along_axis(ids, keep, axis=1), np.take_along_axis(scores, keep, axis=1)
 
-print("✅ Đã lưu báo cáo đánh giá vào 'evaluation_report.txt'")
+
+def genre_groups(genre_matrix):
+    """Nhóm các phim có cùng tập thể loại.
+
+    Trả về (nhóm của mỗi phim, ma trận nhóm x nhóm "có chung thể loại", số phim
+    mỗi nhóm, nhóm có thể loại hay không). Số nhóm nhỏ hơn rất nhiều so với số
+    phim, nên quan hệ relevant giữa mọi cặp phim chỉ là một bảng tra nhỏ.
+    """
+    genre_matrix = sparse.csr_matrix(genre_matrix > 0, dtype=np.int64)
+    if genre_matrix.shape[1] < 63:
+        # Tập thể loại -> một số nguyên (bitmask), gom nhóm bằng unique 1 chiều
+        codes, group, sizes = np.unique(genre_matrix @ (1 << np.arange(genre_matrix.shape[1], dtype=np.int64)),
+                                        return_inverse=True, return_counts=True)
+        signatures = (codes[:, None] >> np.arange(genre_matrix.shape[1])) & 1
+    else:
+        signatures, group, sizes = np.unique(genre_matrix.toarray(), axis=0, return_inverse=True,
+                                             return_counts=True)
+    signatures = sparse.csr_matrix(signatures.astype(np.int32))
+    overlap = (signatures @ signatures.T).toarray() > 0
+    return group.ravel(), overlap, sizes, np.asarray(signatures.sum(axis=1)).ravel() > 0
+
+
+def random_recommendations(rng, n_items, queries, k):
+    """k phim ngẫu nhiên khác nhau cho mỗi phim gốc (không gồm chính nó)"""
+    recs = rng.integers(0, n_items - 1, size=(len(queries), k))
+    recs += recs >= queries[:, None]
+    while True:
+        ordered = np.sort(recs, axis=1)
+        dup = np.flatnonzero((ordered[:, 1:] == ordered[:, :-1]).any(axis=1))
+        if not len(dup):
+            return recs
+        redo = rng.integers(0, n_items - 1, size=(len(dup), k))
+        recs[dup] = redo + (redo >= queries[dup, None])
+
+
+def ranking_metrics(recs, queries, groups, k):
+    """Precision@K, Recall@K, nDCG@K (trung bình trên các phim gốc) và Coverage"""
+    group, overlap, sizes, _ = groups
+    recs = recs[:, :k]
+    hits = overlap[group[queries][:, None], group[recs]]
+    n_hits = hits.sum(axis=1)
+
+    # Số phim relevant trong catalog (trừ chính phim gốc)
+    pool = (overlap @ sizes)[group[queries]] - 1
+
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = hits @ discounts
+    ideal = np.concatenate([[0.0], np.cumsum(discounts)])[np.minimum(pool, k)]
+    return {
+        'precision': float(np.mean(n_hits / k)),
+        'recall': float(np.mean(np.divide(n_hits, pool, out=np.zeros(len(pool)), where=pool > 0))),
+        'ndcg': float(np.mean(np.divide(dcg, ideal, out=np.zeros(len(dcg)), where=ideal > 0))),
+        'coverage': float(np.count_nonzero(np.bincount(recs.ravel(), minlength=len(group))) / len(group)),
+    }
+
+
+def similarity_errors(scores):
+    """RMSE / MAE giữa độ tương đồng của gợi ý và giá trị "đúng" 1.0"""
+    errors = 1.0 - scores.ravel()
+    return {'rmse': math.sqrt(float(np.mean(errors ** 2))), 'mae': float(np.mean(np.abs(errors)))}
+
+
+def evaluate(model, ks, seed=42, sample=0):
+    """Mọi chỉ số cho từng K, cho model và cho gợi ý ngẫu nhiên; trả về dict báo cáo"""
+    rng = np.random.default_rng(seed)
+    df = model['df']
+    # So sánh thể loại không phân biệt hoa thường ("Drama" = "drama"), như bản đánh giá cũ
+    genres = df['genres'].map(lambda value: value.lower() if isinstance(value, str) else value)
+    groups = genre_groups(GenreIndex(genres).matrix())
+    group, _, _, has_genres = groups
+
+    # Phim gốc: mọi phim có thể loại (hoặc một mẫu ngẫu nhiên)
+    queries = np.flatnonzero(has_genres[group])
+    if sample and sample < len(queries):
+        queries = np.sort(rng.choice(queries, sample, replace=False))
+
+    k_max = max(ks)
+    recs, scores = recommendation_table(model, k_max)
+    baseline = random_recommendations(rng, len(df), queries, recs.shape[1])
+
+    metrics = {}
+    for k in ks:
+        k = min(k, recs.shape[1])
+        metrics[str(k)] = {
+            'model': ranking_metrics(recs[queries], queries, groups, k),
+            'random': ranking_metrics(baseline, queries, groups, k),
+        }
+    k_min = min(min(ks), recs.shape[1])
+    return {
+        'generated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'seed': seed,
+        'relevance': 'recommended movie shares at least one genre with the query movie',
+        'model': {
+            'version': model['fingerprint'][:12],
+            'neighbor_mode': 'ann' if model.get('ann') is not None else 'exact',
+            'representation': model.get('representation'),
+            'movies': len(df),
+            'features': int(model['tfidf_matrix'].shape[1]),
+            'average_rating': round(float(df['vote_average'].mean()), 2),
+        },
+        'queries': len(queries),
+        'metrics': metrics,
+        'similarity': dict(k=k_min, **similarity_errors(scores[queries, :k_min])),
+    }
+
+
+def text_report(report):
+    lines = ["", "MODEL: Content-Based Filtering (TF-IDF + Cosine Similarity)",
+             f"Version: {report['model']['version']} ({report['model']['neighbor_mode']} neighbors)", ""]
+    for k, result in report['metrics'].items():
+        ours, rand = result['model'], result['random']
+        gain = (ours['precision'] - rand['precision']) / rand['precision'] * 100 if rand['precision'] else 0
+        lines += [
+            f"PERFORMANCE @{k} ({report['queries']} query movies):      model    random",
+            f"- Precision@{k:<3}                          {ours['precision']:.4f}    {rand['precision']:.4f}",
+            f"- Recall@{k:<3}                             {ours['recall']:.4f}    {rand['recall']:.4f}",
+            f"- nDCG@{k:<3}                               {ours['ndcg']:.4f}    {rand['ndcg']:.4f}",
+            f"- Coverage                               {ours['coverage']:.4f}    {rand['coverage']:.4f}",
+            f"- Precision vs random:                    {gain:+.1f}%",
+            "",
+        ]
+    sim = report['similarity']
+    lines += [
+        f"SIMILARITY (top-{sim['k']} vs 1.0):",
+        f"- RMSE:                 {sim['rmse']:.4f}",
+        f"- MAE:                  {sim['mae']:.4f}",
+        "",
+        "DATASET INFO:",
+        f"- Total Items:          {report['model']['movies']}",
+        f"- Feature Dimensions:   {report['model']['features']}",
+        f"- Average Rating:       {report['model']['average_rating']:.2f}/10",
+        f"- Seed:                 {report['seed']}",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--k', default='5,10', help='danh sách K, ví dụ 5,10,20')
+    parser.add_argument('--sample', type=int, default=0, help='số phim gốc ngẫu nhiên (0 = tất cả)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--csv', default=DEFAULT_CSV_PATH)
+    parser.add_argument('--report', default='evaluation_report.json')
+    args = parser.parse_args()
+    ks = sorted({int(k) for k in args.k.split(',')})
+
+    print("=== ĐÁNH GIÁ HỆ THỐNG GỢI Ý PHIM ===\n")
+    start = time.perf_counter()
+    model = load_or_build(args.csv, DEFAULT_ARTIFACT_DIR, k=int(os.getenv("TOP_K_NEIGHBORS", "50")))
+    loaded = time.perf_counter()
+    print(f"⏱️  Nạp model: {loaded - start:.2f} s")
+
+    report = evaluate(model, ks, seed=args.seed, sample=args.sample)
+    report['seconds'] = round(time.perf_counter() - loaded, 3)
+    print(f"⏱️  Đánh giá {report['queries']} phim: {report['seconds']:.2f} s")
+
+    text = text_report(report)
+    print(text)
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    with open(os.path.splitext(args.report)[0] + '.txt', 'w', encoding='utf-8') as f:
+        f.write(text)
+    print(f"✅ Đã lưu báo cáo đánh giá vào '{args.report}' và '{os.path.splitext(args.report)[0]}.txt'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import re
+
+import numpy as np
+from scipy import sparse
+
+_STRIP = str.maketrans({c: ' ' for c in '[]{}"\''})
+_SPLIT = re.compile(r"\s*[\|,;/]+\s*")
+
+
+def parse_genres(value):
+    """Genre names from a raw genres cell ("['Action', 'Drama']", "Action|Drama", ...)"""
+    if value is None or value != value:
+        return []
+    parts = _SPLIT.split(str(value).translate(_STRIP))
+    return [part.strip() for part in parts if part.strip()]
+
+
+class GenreIndex:
+    """Genre vocabulary and genre -> movie rows postings, parsed once.
+
+    `genres` keeps first-seen order (used to break frequency ties the way the
+    per-request loop did); `postings[genre]` is a sorted int32 array of rows.
+    """
+
+    def __init__(self, genre_column):
+        rows_by_genre = {}
+        self.n_rows = 0
+        for row, value in enumerate(genre_column):
+            for genre in dict.fromkeys(parse_genres(value)):
+                rows_by_genre.setdefault(genre, []).append(row)
+            self.n_rows = row + 1
+        self.genres = list(rows_by_genre)
+        self.postings = {g: np.array(rows, dtype=np.int32) for g, rows in rows_by_genre.items()}
+        self.counts = {g: len(rows) for g, rows in rows_by_genre.items()}
+
+    def vocabulary(self):
+        return sorted(self.genres)
+
+    def most_common(self, n):
+        """[(genre, count)] by descending count, ties in first-seen order"""
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def matrix(self):
+        """Binary (movies x genres) CSR matrix, columns in self.genres order"""
+        rows = np.concatenate([self.postings[g] for g in self.genres]) if self.genres else np.empty(0, dtype=np.int32)
+        cols = np.repeat(np.arange(len(self.genres)), [self.counts[g] for g in self.genres])
+        return sparse.csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)),
+                                 shape=(self.n_rows, len(self.genres)))
+
+    def rows_matching(self, text):
+        """Sorted rows of movies with a genre containing text (case-insensitive)"""
+        text = text.casefold()
+        lists = [rows for genre, rows in self.postings.items() if text in genre.casefold()]
+        if not lists:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(lists)) if len(lists) > 1 else lists[0]
@@ -0,0 +1,48 @@
+"""Gunicorn settings for multi-worker deployments.
+
+The app is preloaded in the master before forking, so every worker shares
+the model copy-on-write; the numeric arrays are memory-mapped from the model
+artifact (see model_store.py) and live in the shared page cache. Scale
+workers with cores via WEB_CONCURRENCY instead of being capped by RAM.
+
+    gunicorn -c gunicorn.conf.py api:app
+"""
+import gc
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from memstats import report
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Eager model loading (MODEL_WARMUP, see api.py) happens once in the master;
+# with background / lazy loading each worker loads it and boots immediately
+preload_app = os.getenv("MODEL_WARMUP", "eager") == "eager"
+
+# Each worker writes its metrics snapshot here; /metrics merges them (see
+# metrics.py). Set before the app is imported; a private one is removed on exit.
+_own_metrics_dir = not os.getenv("METRICS_DIR")
+if _own_metrics_dir:
+    os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="movie-metrics-")
+
+
+def when_ready(server):
+    # Model is loaded (preload_app); move it out of the GC's reach so
+    # collections in workers don't write to, and thereby un-share, its pages
+    gc.freeze()
+    report("master")
+
+
+def post_worker_init(worker):
+    report("worker")
+    # Threads don't survive the fork, so each worker starts its own watcher
+    # for catalog updates (see api.start_catalog_jobs)
+    from api import start_catalog_jobs
+    start_catalog_jobs()
+
+
+def on_exit(server):
+    if _own_metrics_dir:
+        shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
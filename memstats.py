@@ -0,0 +1,51 @@
+import os
+import resource
+import sys
+
+
+def process_memory(pid='self'):
+    """Memory of a process (default: the current one) in MB.
+
+    rss: resident set size. On Linux also pss (proportional share, pages shared
+    with other workers are split between them) and shared/private sizes, which
+    show how much of the model is actually shared across gunicorn workers.
+    """
+    stats = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[2] == 'kB':
+                    stats[parts[0].rstrip(':')] = int(parts[1])
+    except OSError:
+        pass
+
+    if stats:
+        shared = stats.get('Shared_Clean', 0) + stats.get('Shared_Dirty', 0)
+        private = stats.get('Private_Clean', 0) + stats.get('Private_Dirty', 0)
+        return {
+            'rss_mb': round(stats.get('Rss', 0) / 1024, 1),
+            'pss_mb': round(stats.get('Pss', 0) / 1024, 1),
+            'shared_mb': round(shared / 1024, 1),
+            'private_mb': round(private / 1024, 1),
+        }
+
+    # Fallback (macOS, etc.): peak RSS only, and only for this process
+    return {'rss_mb': peak_memory_mb()} if pid == 'self' else {}
+
+
+def peak_memory_mb():
+    """Peak resident set size of the current process in MB"""
+    # ru_maxrss is bytes on macOS, kB on Linux
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(maxrss / scale, 1)
+
+
+def format_memory(stats=None):
+    stats = stats or process_memory()
+    return ', '.join(f"{k[:-3]}={v} MB" for k, v in stats.items())
+
+
+def report(label):
+    print(f"[{label} pid={os.getpid()}] memory: {format_memory()}")
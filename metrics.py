@@ -0,0 +1,321 @@
+"""In-process metrics registry rendered in the Prometheus text format.
+
+Counters, gauges and fixed-bucket latency histograms live in plain dicts
+behind one lock, so recording a value costs a dict update. Under gunicorn
+every worker has its own registry: with METRICS_DIR set (gunicorn.conf.py
+sets it), each worker writes a JSON snapshot there at most every
+METRICS_FLUSH_INTERVAL seconds, and /metrics merges the snapshots of all
+workers: counters and histograms are summed, gauges take the maximum.
+
+When a worker exits (gunicorn recycles them, e.g. after max_requests), the
+next /metrics folds its counters and histograms into metrics-retired.json
+and removes its snapshot, so totals never go backwards while the gauges of
+workers that are gone stop being reported.
+
+A forked child starts with empty counters and histograms (the master's
+would otherwise be counted once per worker) but keeps the gauges, such as
+the model load phases timed before the fork.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no dead-worker pruning (single process)
+    fcntl = None
+
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Cumulative counters and histograms of workers that have exited
+RETIRED_FILE = 'metrics-retired.json'
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _snapshot_pid(entry):
+    """pid of a metrics-<pid>.json snapshot file, else None"""
+    if entry.startswith('metrics-') and entry.endswith('.json'):
+        pid = entry[len('metrics-'):-len('.json')]
+        if pid.isdigit():
+            return int(pid)
+    return None
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # exists, owned by another user
+        pass
+    return True
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path, snapshot):
+    """Replace path atomically, so readers never see a partial file"""
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+@contextmanager
+def _directory_lock(directory, exclusive):
+    """flock on directory/metrics.lock (a no-op where unavailable)"""
+    try:
+        f = open(os.path.join(directory, 'metrics.lock'), 'a')
+    except OSError:
+        f = None
+    try:
+        if f is not None and fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+    finally:
+        if f is not None:
+            f.close()
+
+
+def merge(snapshots, buckets=LATENCY_BUCKETS):
+    """(buckets, counters, gauges, histograms) of the snapshots combined:
+    counters and histograms summed, gauges the maximum"""
+    counters, gauges, histograms = {}, {}, {}
+    for snapshot in snapshots:
+        buckets = tuple(snapshot['buckets'])
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, value in snapshot['gauges']:
+            key = (name, tuple(map(tuple, labels)))
+            gauges[key] = max(gauges.get(key, value), value)
+        for name, labels, counts, total in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [[0] * len(counts), 0.0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += total
+    return buckets, counters, gauges, histograms
+
+
+class Registry:
+    """Counters, gauges and histograms keyed by (name, sorted label pairs)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.help = {}
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._last_flush = 0.0
+        self._flush_timer = None
+        self._flushed = False
+
+    def describe(self, name, text):
+        """HELP text shown for metric name"""
+        self.help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        # Index of the first bucket the value fits in (len(buckets) = +Inf)
+        slot = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][slot] += 1
+            entry[1] += seconds
+
+    @contextmanager
+    def timer(self, name, gauge=False, **labels):
+        """Time the block into histogram name (or set gauge name to its duration)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if gauge:
+                self.set(name, elapsed, **labels)
+            else:
+                self.observe(name, elapsed, **labels)
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._last_flush = 0.0
+        self._flush_timer = None
+        self._flushed = False
+
+    def snapshot(self):
+        """JSON-serializable copy of every value"""
+        with self._lock:
+            return {
+                'buckets': list(self.buckets),
+                'counters': [[name, labels, value] for (name, labels), value in self._counters.items()],
+                'gauges': [[name, labels, value] for (name, labels), value in self._gauges.items()],
+                'histograms': [[name, labels, list(counts), total]
+                               for (name, labels), (counts, total) in self._histograms.items()],
+            }
+
+    def flush(self, directory=METRICS_DIR, force=False):
+        """Write this process's snapshot to directory (throttled unless force).
+
+        A throttled call schedules one deferred flush, so the last values of a
+        burst reach the directory even if the worker then goes idle.
+        """
+        if not directory:
+            return
+        now = time.monotonic()
+        with self._lock:
+            wait = METRICS_FLUSH_INTERVAL - (now - self._last_flush)
+            if not force and wait > 0:
+                if self._flush_timer is None:
+                    self._flush_timer = threading.Timer(wait, self._deferred_flush, (directory,))
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
+                return
+            self._last_flush = now
+            first, self._flushed = not self._flushed, True
+        path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+        if first and os.path.exists(path):
+            # Left by an exited process that had the same pid
+            self.retire(directory, [path])
+        _write(path, self.snapshot())
+
+    def _deferred_flush(self, directory):
+        with self._lock:
+            self._flush_timer = None
+        self.flush(directory, force=True)
+
+    def collect(self, directory=METRICS_DIR):
+        """Snapshots of every live worker in directory, plus the retired
+        totals (this process's snapshot is always current)"""
+        if not directory:
+            return [self.snapshot()]
+        self.flush(directory, force=True)
+        if fcntl is not None:
+            pids = {entry: _snapshot_pid(entry) for entry in os.listdir(directory)}
+            dead = [os.path.join(directory, entry) for entry, pid in pids.items()
+                    if pid is not None and not _alive(pid)]
+            if dead:
+                self.retire(directory, dead)
+        snapshots = []
+        # Shared lock: never read a retired snapshot both on its own and in the totals
+        with _directory_lock(directory, exclusive=False):
+            for entry in os.listdir(directory):
+                if entry.startswith('metrics-') and entry.endswith('.json'):
+                    snapshot = _read(os.path.join(directory, entry))
+                    if snapshot is not None:
+                        snapshots.append(snapshot)
+        return snapshots
+
+    def retire(self, directory, paths):
+        """Fold the counters and histograms of exited workers' snapshots into
+        the retired totals and remove the snapshots; their gauges are dropped"""
+        with _directory_lock(directory, exclusive=True):
+            # Read under the lock: another worker may have retired them already
+            found = {}
+            for path in paths:
+                snapshot = _read(path)
+                if snapshot is not None:
+                    found[path] = snapshot
+            if not found:
+                return
+            retired_path = os.path.join(directory, RETIRED_FILE)
+            retired = _read(retired_path)
+            snapshots = list(found.values()) + ([retired] if retired is not None else [])
+            buckets, counters, _, histograms = merge(snapshots, self.buckets)
+            _write(retired_path, {
+                'buckets': list(buckets),
+                'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+                'gauges': [],
+                'histograms': [[name, labels, counts, total]
+                               for (name, labels), (counts, total) in histograms.items()],
+            })
+            for path in found:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def render(self, snapshots=None):
+        """Prometheus text exposition of the merged snapshots"""
+        buckets, counters, gauges, histograms = merge(
+            self.collect() if snapshots is None else snapshots, self.buckets)
+
+        lines = []
+        for kind, values in (('counter', counters), ('gauge', gauges), ('histogram', histograms)):
+            for name in sorted({name for name, _ in values}):
+                if name in self.help:
+                    lines.append(f'# HELP {name} {self.help[name]}')
+                lines.append(f'# TYPE {name} {kind}')
+                for (metric, labels), value in sorted(values.items()):
+                    if metric != name:
+                        continue
+                    if kind != 'histogram':
+                        lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                        continue
+                    counts, total = value
+                    cumulative = 0
+                    for bound, count in zip(list(buckets) + ['+Inf'], counts):
+                        cumulative += count
+                        le = bound if bound == '+Inf' else _format_value(float(bound))
+                        lines.append(f'{name}_bucket{_format_labels(labels, [("le", le)])} {cumulative}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(total)}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+# The process-wide registry used by the API, poster resolver and model loader
+registry = Registry()
+describe = registry.describe
+inc = registry.inc
+observe = registry.observe
+timer = registry.timer
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registry.reset_after_fork)
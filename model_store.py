@@ -0,0 +1,678 @@
+"""Build, persist and load the recommendation model.
+
+The model (TF-IDF CSR matrix, vocabulary, top-K neighbor tables, title index
+and the movie table) is written once to an artifact directory so API workers
+can load or memory-map it at startup instead of refitting TF-IDF.
+
+The similarity vectors are the TF-IDF rows, or with LSA_COMPONENTS set their
+unit-norm LSA projection (a dense array stored in the same 'tfidf_matrix'
+slot); VECTOR_DTYPE / SCORE_DTYPE and the TF-IDF vocabulary cap trade memory
+for fidelity (see benchmarks/bench_representation.py).
+
+Movies added or edited after the CSV was produced live in an append-only
+JSONL update log (see catalog_updates.py); every full build applies it on top
+of the CSV, and the fingerprint covers both.
+
+Offline build:
+    python model_store.py [movies_clean.csv | movies_clean/] [artifact_dir]
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import metrics
+from ann_index import ANN_CANDIDATES, ANN_QUERY_TERMS, AnnIndex, sample_recall
+from columnar import is_table, read_table
+from memstats import process_memory
+from neighbors import BUILD_WORKERS, PARALLEL_MIN_ROWS, build_neighbor_index, process_pool
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+# Bump whenever the on-disk layout or the model recipe changes
+ARTIFACT_VERSION = 1
+
+# The cleaned movies: the columnar table written by prepare_data.py when it
+# exists, else step 2's CSV
+DEFAULT_CSV_PATH = os.getenv("MOVIES_PATH") or ('movies_clean' if is_table('movies_clean') else 'movies_clean.csv')
+DEFAULT_ARTIFACT_DIR = os.getenv("MODEL_DIR", "model_artifact")
+DEFAULT_UPDATES_PATH = os.getenv("CATALOG_UPDATES_PATH", "catalog_updates.jsonl")
+
+# 'exact' neighbor tables, or 'ann' for large catalogs (see ann_index.py)
+NEIGHBOR_MODE = os.getenv("NEIGHBOR_MODE", "exact")
+
+# Model representation. The baseline is the original full-precision model;
+# the environment can opt into smaller ones (validated in build_model)
+BASELINE_REPRESENTATION = {
+    'vector_dtype': 'float64',  # TF-IDF / LSA values: float64 | float32
+    'score_dtype': 'float32',   # stored neighbor scores: float32 | float16
+    'max_features': None,       # TF-IDF vocabulary cap (most frequent terms)
+    'min_df': 1,                # drop terms found in fewer movies
+    'lsa_components': 0,        # > 0: replace TF-IDF rows by an LSA embedding
+}
+DEFAULT_REPRESENTATION = {
+    'vector_dtype': os.getenv("VECTOR_DTYPE", "float64"),
+    'score_dtype': os.getenv("SCORE_DTYPE", "float32"),
+    'max_features': int(os.getenv("TFIDF_MAX_FEATURES", "0")) or None,
+    'min_df': int(os.getenv("TFIDF_MIN_DF", "1")),
+    'lsa_components': int(os.getenv("LSA_COMPONENTS", "0")),
+}
+
+TEXT_COLUMNS = ('overview', 'genres', 'keywords')
+
+# Arrays that are stored as raw .npy files and can be memory-mapped
+ARRAY_FILES = ('tfidf_data', 'tfidf_indices', 'tfidf_indptr', 'idf', 'neighbor_ids', 'neighbor_scores')
+ANN_ARRAY_FILES = ('postings_data', 'postings_indices', 'postings_indptr')
+LSA_ARRAY_FILES = ('vectors', 'lsa_components', 'idf', 'neighbor_ids', 'neighbor_scores')
+
+# Print the time and memory of every startup / model load phase
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "") not in ("", "0")
+
+metrics.describe('model_phase_seconds', 'Duration of the last run of each startup / model load phase')
+
+
+@contextmanager
+def phase(name):
+    """Time a startup / model load phase into the model_phase_seconds gauge.
+
+    With STARTUP_PROFILE set, also prints its duration and resident memory.
+    """
+    rss_before = process_memory().get('rss_mb', 0) if STARTUP_PROFILE else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - start, rss_before)
+
+
+def record_phase(name, seconds, rss_before=None):
+    metrics.registry.set('model_phase_seconds', seconds, phase=name)
+    if STARTUP_PROFILE:
+        rss = process_memory().get('rss_mb', 0)
+        growth = '' if rss_before is None else f" ({rss - rss_before:+.1f} MB)"
+        print(f"[startup] {name:<16} {seconds:8.3f} s   rss {rss:8.1f} MB{growth}")
+
+
+def load_movies(csv_path=DEFAULT_CSV_PATH, updates_path=None):
+    """Read the cleaned movies (plus the update log, if any) and build the text 'soup' used for TF-IDF.
+
+    csv_path is a CSV file or a columnar table directory (prepare_data.py).
+    """
+    print("Loading movie data...")
+    with phase('read_movies'):
+        df = read_table(csv_path) if is_table(csv_path) else pd.read_csv(csv_path)
+    with phase('soup'):
+        for col in TEXT_COLUMNS:
+            df[col] = df[col].fillna('')
+
+        # Create soup
+        df['soup'] = df['overview'] + ' ' + df['genres'] + ' ' + df['keywords']
+
+    records = read_updates(updates_path) if updates_path else []
+    if records:
+        print(f"Applying {len(records)} catalog updates from {updates_path}...")
+        df, _ = apply_records(df, records)
+    return df
+
+
+def read_updates(updates_path):
+    """Movie records from the JSONL update log, oldest first ([] if there is none)"""
+    if not os.path.exists(updates_path):
+        return []
+    with open(updates_path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def apply_records(df, records):
+    """Apply movie records on top of df and return (new df, touched rows).
+
+    Each record is a dict with an integer 'id' plus any movie columns. A
+    record for an id already in df overwrites those fields of its first row;
+    a new id is appended (and needs an 'original_title'). Raises ValueError
+    for malformed records before anything is changed.
+    """
+    columns = [c for c in df.columns if c != 'soup']
+    row_for_id = {}
+    for row, movie_id in enumerate(df['id'].tolist()):
+        row_for_id.setdefault(movie_id, row)
+
+    updates = {}  # row -> {column: value}; rows >= len(df) are new
+    next_row = len(df)
+    for record in records:
+        if not isinstance(record, dict):
+            raise ValueError('Each movie must be an object')
+        unknown = sorted(set(record) - set(columns))
+        if unknown:
+            raise ValueError(f"Unknown movie fields: {', '.join(unknown)}")
+        movie_id = record.get('id')
+        if isinstance(movie_id, bool) or not isinstance(movie_id, int):
+            raise ValueError('Each movie needs an integer "id"')
+        row = row_for_id.get(movie_id)
+        if row is None:
+            if not str(record.get('original_title') or '').strip():
+                raise ValueError(f'New movie {movie_id} needs an "original_title"')
+            row = row_for_id[movie_id] = next_row
+            next_row += 1
+        updates.setdefault(row, {}).update(record)
+
+    df = df.copy()
+    new_rows = [fields for row, fields in sorted(updates.items()) if row >= len(df)]
+    for row, fields in updates.items():
+        if row < len(df):
+            for col, value in fields.items():
+                df.at[row, col] = value
+    if new_rows:
+        df = pd.concat([df, pd.DataFrame(new_rows, columns=columns)], ignore_index=True)
+
+    touched = sorted(updates)
+    for col in TEXT_COLUMNS:
+        df.loc[touched, col] = df.loc[touched, col].fillna('')
+    df.loc[touched, 'soup'] = df.loc[touched, 'overview'] + ' ' + df.loc[touched, 'genres'] + ' ' + df.loc[touched, 'keywords']
+    return df, touched
+
+
+def csv_fingerprint(csv_path, k, updates_path=None, representation=None):
+    """Hash of the movie data and update log contents plus everything that shapes the model"""
+    representation = representation or DEFAULT_REPRESENTATION
+    digest = hashlib.sha256()
+    digest.update(f"v{ARTIFACT_VERSION}:k{k}:".encode())
+    if NEIGHBOR_MODE == 'ann':
+        digest.update(f"ann:t{ANN_QUERY_TERMS}:c{ANN_CANDIDATES}:".encode())
+    for key, value in sorted(representation.items()):
+        if value != BASELINE_REPRESENTATION[key]:
+            digest.update(f"{key}={value}:".encode())
+    paths = [csv_path] if not is_table(csv_path) else [
+        os.path.join(csv_path, name) for name in sorted(os.listdir(csv_path))]
+    paths += [updates_path] if updates_path and os.path.exists(updates_path) else []
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def build_title_index(titles):
+    """Map each title to the row of its first occurrence"""
+    index = {}
+    for row, title in enumerate(titles):
+        index.setdefault(title, row)
+    return index
+
+
+def check_representation(representation):
+    """Full representation dict (missing keys from the defaults); raises ValueError if invalid"""
+    rep = dict(DEFAULT_REPRESENTATION, **(representation or {}))
+    if rep['vector_dtype'] not in ('float64', 'float32'):
+        raise ValueError("vector_dtype must be float64 or float32")
+    if rep['score_dtype'] not in ('float32', 'float16'):
+        raise ValueError("score_dtype must be float32 or float16")
+    if rep['lsa_components'] and NEIGHBOR_MODE == 'ann':
+        raise ValueError("NEIGHBOR_MODE=ann searches sparse TF-IDF rows; it can't be combined with LSA")
+    return rep
+
+
+def make_vectorizer(representation, vocabulary=None):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    return TfidfVectorizer(
+        stop_words='english',
+        max_features=representation['max_features'],
+        min_df=representation['min_df'],
+        dtype=np.dtype(representation['vector_dtype']),
+        vocabulary=vocabulary,
+    )
+
+
+class SavedVectorizer:
+    """The fitted TfidfVectorizer of a loaded artifact, rebuilt on first use.
+
+    Serving only needs it to vectorize added movies, so loading an artifact
+    doesn't import scikit-learn; attributes are forwarded to the real one.
+    """
+
+    def __init__(self, representation, vocabulary, idf):
+        self.representation = representation
+        self.vocabulary = vocabulary
+        self.idf_ = np.asarray(idf)
+
+    @cached_property
+    def vectorizer(self):
+        tfidf = make_vectorizer(self.representation, vocabulary={t: i for i, t in enumerate(self.vocabulary)})
+        tfidf.idf_ = self.idf_
+        return tfidf
+
+    def get_feature_names_out(self):
+        return np.asarray(self.vocabulary, dtype=object)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.vectorizer, name)
+
+
+def _count_terms(texts, dtype):
+    """Term counts of texts and their vocabulary in first-seen order (a fit_tfidf worker)"""
+    from sklearn.feature_extraction.text import CountVectorizer
+    counter = CountVectorizer(stop_words='english', dtype=dtype)
+    try:
+        counts = counter.fit_transform(texts)
+    except ValueError:  # only stop words / no tokens in this slice
+        return np.empty(0, dtype=str), sparse.csr_matrix((len(texts), 0), dtype=dtype)
+    return np.array(list(counter.vocabulary_), dtype=str), counts
+
+
+def fit_tfidf(texts, representation, workers=BUILD_WORKERS):
+    """Fitted vectorizer and TF-IDF matrix of texts, tokenized by `workers` processes.
+
+    Same vocabulary, idf and matrix (bit for bit) as
+    make_vectorizer(representation).fit_transform(texts): each worker counts
+    the terms of a slice of texts, the counts are merged on the union of the
+    slice vocabularies, and min_df / max_features are applied to the merged
+    counts as sklearn does.
+    """
+    texts = list(texts)
+    if workers <= 1 or len(texts) < PARALLEL_MIN_ROWS:
+        tfidf = make_vectorizer(representation)
+        return tfidf, tfidf.fit_transform(texts)
+
+    dtype = np.dtype(representation['vector_dtype'])
+    bounds = np.linspace(0, len(texts), workers * 4 + 1).astype(int)
+    with process_pool(workers) as pool:
+        parts = list(pool.map(_count_terms, [texts[a:b] for a, b in zip(bounds[:-1], bounds[1:])],
+                              [dtype] * (len(bounds) - 1)))
+
+    # Columns are the sorted vocabulary; sklearn stores each row's entries in
+    # the order terms were first seen in the corpus, which fixes the order
+    # the l2 norm sums them in, so entries are put in that order too
+    seen = np.concatenate([slice_seen for slice_seen, _ in parts])
+    _, first = np.unique(seen, return_index=True)
+    seen = seen[np.sort(first)]
+    terms = np.sort(seen)
+    seen_rank = np.empty(len(terms), dtype=np.int64)
+    seen_rank[np.searchsorted(terms, seen)] = np.arange(len(seen))
+    blocks = []
+    for slice_seen, counts in parts:
+        columns = np.searchsorted(terms, np.sort(slice_seen))[counts.indices] if len(slice_seen) else counts.indices
+        blocks.append(sparse.csr_matrix((counts.data, columns, counts.indptr), shape=(counts.shape[0], len(terms))))
+    counts = sparse.vstack(blocks, format='csr')
+    rows = np.repeat(np.arange(counts.shape[0], dtype=np.int64), np.diff(counts.indptr))
+    order = np.argsort(rows * len(terms) + seen_rank[counts.indices])
+    counts = sparse.csr_matrix((counts.data[order], counts.indices[order], counts.indptr), shape=counts.shape)
+
+    # sklearn's CountVectorizer._limit_features
+    mask = np.bincount(counts.indices, minlength=len(terms)) >= representation['min_df']
+    limit = representation['max_features']
+    if limit is not None and mask.sum() > limit:
+        term_counts = np.asarray(counts.sum(axis=0)).ravel()
+        keep = np.flatnonzero(mask)[(-term_counts[mask]).argsort()[:limit]]
+        mask = np.zeros(len(terms), dtype=bool)
+        mask[keep] = True
+    if not mask.any():
+        raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+    kept = np.flatnonzero(mask)
+    if len(kept) < len(terms):
+        counts = counts[:, kept]
+
+    from sklearn.feature_extraction.text import TfidfTransformer
+    transformer = TfidfTransformer()
+    tfidf_matrix = transformer.fit_transform(counts)
+    tfidf = make_vectorizer(representation, vocabulary={term: i for i, term in enumerate(terms[kept].tolist())})
+    tfidf.idf_ = transformer.idf_
+    return tfidf, tfidf_matrix
+
+
+def lsa_embed(tfidf_rows, lsa_components):
+    """Unit-norm LSA embedding (dense) of TF-IDF rows"""
+    from sklearn.preprocessing import normalize
+    return normalize(np.asarray(tfidf_rows @ lsa_components.T))
+
+
+def transform_text(model, texts):
+    """Similarity vectors for new movie text, using the model's fitted vocabulary / idf"""
+    vectors = model['tfidf'].transform(texts)
+    if model.get('lsa_components') is not None:
+        vectors = lsa_embed(vectors, model['lsa_components'])
+    return vectors
+
+
+def model_nbytes(model):
+    """Bytes held by the similarity vectors and by the neighbor tables"""
+    vectors = model['tfidf_matrix']
+    if sparse.issparse(vectors):
+        vector_bytes = vectors.data.nbytes + vectors.indices.nbytes + vectors.indptr.nbytes
+    else:
+        vector_bytes = vectors.nbytes
+    return {
+        'vectors': vector_bytes,
+        'neighbors': model['neighbor_ids'].nbytes + model['neighbor_scores'].nbytes,
+    }
+
+
+def build_model(csv_path=DEFAULT_CSV_PATH, k=50, updates_path=None, representation=None):
+    """Fit TF-IDF and precompute the neighbor index from the CSV (and update log)"""
+    rep = check_representation(representation)
+    df = load_movies(csv_path, updates_path)
+
+    print("Building TF-IDF matrix...")
+    with phase('tfidf_fit'):
+        tfidf, tfidf_matrix = fit_tfidf(df['soup'], rep)
+
+    lsa_components = None
+    if rep['lsa_components']:
+        n_components = max(1, min(rep['lsa_components'], tfidf_matrix.shape[1] - 1))
+        print("Reducing to {} LSA dimensions...".format(n_components))
+        from sklearn.decomposition import TruncatedSVD
+        with phase('lsa'):
+            svd = TruncatedSVD(n_components=n_components, random_state=42).fit(tfidf_matrix)
+            lsa_components = svd.components_.astype(rep['vector_dtype'])
+            tfidf_matrix = lsa_embed(tfidf_matrix, lsa_components)
+
+    ann, ann_recall = None, None
+    if NEIGHBOR_MODE == 'ann':
+        print("Computing approximate top-{} neighbor index...".format(k))
+        with phase('neighbor_index'):
+            ann = AnnIndex.build(tfidf_matrix)
+            neighbor_ids, neighbor_scores = ann.neighbor_tables(tfidf_matrix, k=k)
+        ann_recall = sample_recall(neighbor_scores, tfidf_matrix)
+        print(f"ANN recall@{k} vs exact (sampled): {ann_recall:.3f}")
+    else:
+        print("Computing top-{} neighbor index...".format(k))
+        with phase('neighbor_index'):
+            neighbor_ids, neighbor_scores = build_neighbor_index(tfidf_matrix, k=k)
+    neighbor_scores = neighbor_scores.astype(rep['score_dtype'], copy=False)
+
+    return {
+        'fingerprint': csv_fingerprint(csv_path, k, updates_path, rep),
+        'k': k,
+        'fitted_at': time.time(),
+        'pending_updates': 0,
+        'df': df,
+        'tfidf': tfidf,
+        'tfidf_matrix': tfidf_matrix,
+        'neighbor_ids': neighbor_ids,
+        'neighbor_scores': neighbor_scores,
+        'indices': build_title_index(df['original_title']),
+        'ann': ann,
+        'ann_recall': ann_recall,
+        'representation': rep,
+        'lsa_components': lsa_components,
+    }
+
+
+def save_model(model, artifact_dir=DEFAULT_ARTIFACT_DIR):
+    """Write the model to artifact_dir, replacing any previous artifact atomically.
+
+    Every save is a new version directory next to artifact_dir, and
+    artifact_dir is a symlink flipped to it with one os.replace(), so readers
+    always see a complete artifact (see publish_version). Writers that may
+    run concurrently hold artifact_lock around their save.
+    """
+    artifact_dir = os.path.abspath(artifact_dir)
+    parent = os.path.dirname(artifact_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=f'.{os.path.basename(artifact_dir)}-tmp-', dir=parent)
+
+    try:
+        tfidf_matrix = model['tfidf_matrix']
+        arrays = {
+            'idf': model['tfidf'].idf_,
+            'neighbor_ids': model['neighbor_ids'],
+            'neighbor_scores': model['neighbor_scores'],
+        }
+        if model.get('lsa_components') is not None:
+            arrays['vectors'] = tfidf_matrix
+            arrays['lsa_components'] = model['lsa_components']
+        else:
+            tfidf_matrix = tfidf_matrix.tocsr()
+            arrays['tfidf_data'] = tfidf_matrix.data
+            arrays['tfidf_indices'] = tfidf_matrix.indices
+            arrays['tfidf_indptr'] = tfidf_matrix.indptr
+        if model.get('ann') is not None:
+            arrays.update(model['ann'].arrays())
+        for name, arr in arrays.items():
+            np.save(os.path.join(tmp_dir, name + '.npy'), np.ascontiguousarray(arr))
+
+        # Columnar movie table: one .npy per column ('soup' is rebuilt on load)
+        df = model['df']
+        columns = [c for c in df.columns if c != 'soup']
+        os.makedirs(os.path.join(tmp_dir, 'movies'))
+        for i, col in enumerate(columns):
+            np.save(os.path.join(tmp_dir, 'movies', f'{i}.npy'), df[col].to_numpy(), allow_pickle=True)
+
+        vocabulary = model['tfidf'].get_feature_names_out().tolist()
+        with open(os.path.join(tmp_dir, 'vocabulary.json'), 'w', encoding='utf-8') as f:
+            json.dump(vocabulary, f, ensure_ascii=False)
+        with open(os.path.join(tmp_dir, 'titles.json'), 'w', encoding='utf-8') as f:
+            json.dump(model['indices'], f, ensure_ascii=False)
+
+        manifest = {
+            'version': ARTIFACT_VERSION,
+            'fingerprint': model['fingerprint'],
+            'k': model['k'],
+            'shape': list(tfidf_matrix.shape),
+            'columns': columns,
+            # When TF-IDF was last fitted, and how many update records were
+            # patched in since then (without refitting the vocabulary / idf)
+            'fitted_at': model.get('fitted_at'),
+            'pending_updates': model.get('pending_updates', 0),
+            'neighbor_mode': 'ann' if model.get('ann') is not None else 'exact',
+            'ann_recall': model.get('ann_recall'),
+            'representation': model.get('representation', BASELINE_REPRESENTATION),
+            'built_at': time.time(),
+        }
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        publish_version(tmp_dir, artifact_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    return artifact_dir
+
+
+def publish_version(tmp_dir, artifact_dir):
+    """Make the complete artifact in tmp_dir the one served at artifact_dir.
+
+    tmp_dir is renamed to a version directory (.<name>-v-*), then a symlink to
+    it replaces artifact_dir in one rename. The version it replaced is kept
+    (a process may still be reading it); older ones are removed. A plain
+    directory left by an older release is first moved aside as a version.
+    """
+    parent, name = os.path.split(artifact_dir)
+    prefix = f'.{name}-v-'
+    version_dir = tempfile.mkdtemp(prefix=prefix, dir=parent)
+    os.replace(tmp_dir, version_dir)
+
+    previous = None
+    if os.path.islink(artifact_dir):
+        previous = os.path.basename(os.path.realpath(artifact_dir))
+    elif os.path.isdir(artifact_dir):
+        previous = os.path.basename(tempfile.mkdtemp(prefix=prefix, dir=parent))
+        os.replace(artifact_dir, os.path.join(parent, previous))
+
+    link = os.path.join(parent, f'.{name}-link-{os.getpid()}-{threading.get_ident()}')
+    os.symlink(os.path.basename(version_dir), link)
+    os.replace(link, artifact_dir)
+
+    for entry in os.listdir(parent):
+        if entry.startswith(prefix) and entry not in (os.path.basename(version_dir), previous):
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+def load_model(artifact_dir=DEFAULT_ARTIFACT_DIR, fingerprint=None, mmap_mode='r'):
+    """Load a saved model, or return None if it is missing, stale or unreadable.
+
+    Numeric arrays are memory-mapped by default (mmap_mode='r'), so the OS page
+    cache backs them instead of private process memory.
+    """
+    # Read one version directory throughout, even if a save flips the link meanwhile
+    artifact_dir = os.path.realpath(artifact_dir)
+    manifest = read_manifest(artifact_dir)
+    if manifest is None:
+        return None
+
+    try:
+        if manifest.get('version') != ARTIFACT_VERSION:
+            return None
+        if fingerprint is not None and manifest.get('fingerprint') != fingerprint:
+            return None
+
+        rep = dict(BASELINE_REPRESENTATION, **manifest.get('representation', {}))
+        ann_mode = manifest.get('neighbor_mode') == 'ann'
+        if rep['lsa_components']:
+            names = LSA_ARRAY_FILES
+        else:
+            names = ARRAY_FILES + (ANN_ARRAY_FILES if ann_mode else ())
+        arrays = {
+            name: np.load(os.path.join(artifact_dir, name + '.npy'), mmap_mode=mmap_mode)
+            for name in names
+        }
+        if rep['lsa_components']:
+            tfidf_matrix = arrays['vectors']
+        else:
+            tfidf_matrix = sparse.csr_matrix(
+                (arrays['tfidf_data'], arrays['tfidf_indices'], arrays['tfidf_indptr']),
+                shape=tuple(manifest['shape']),
+                copy=False,
+            )
+
+        with open(os.path.join(artifact_dir, 'vocabulary.json'), encoding='utf-8') as f:
+            vocabulary = json.load(f)
+        tfidf = SavedVectorizer(rep, vocabulary, arrays['idf'])
+
+        ann = None
+        if ann_mode:
+            postings = sparse.csr_matrix(
+                (arrays['postings_data'], arrays['postings_indices'], arrays['postings_indptr']),
+                shape=tuple(reversed(manifest['shape'])),
+                copy=False,
+            )
+            ann = AnnIndex(postings)
+
+        with open(os.path.join(artifact_dir, 'titles.json'), encoding='utf-8') as f:
+            indices = json.load(f)
+
+        df = pd.DataFrame({
+            col: np.load(os.path.join(artifact_dir, 'movies', f'{i}.npy'), allow_pickle=True)
+            for i, col in enumerate(manifest['columns'])
+        })
+        df['soup'] = df['overview'] + ' ' + df['genres'] + ' ' + df['keywords']
+    except Exception as e:
+        print(f"⚠️  Could not load model artifact from {artifact_dir}: {e}")
+        return None
+
+    return {
+        'fingerprint': manifest['fingerprint'],
+        'k': manifest['k'],
+        'fitted_at': manifest.get('fitted_at'),
+        'pending_updates': manifest.get('pending_updates', 0),
+        'built_at': manifest.get('built_at'),
+        'df': df,
+        'tfidf': tfidf,
+        'tfidf_matrix': tfidf_matrix,
+        'neighbor_ids': arrays['neighbor_ids'],
+        'neighbor_scores': arrays['neighbor_scores'],
+        'indices': indices,
+        'ann': ann,
+        'ann_recall': manifest.get('ann_recall'),
+        'representation': rep,
+        'lsa_components': arrays.get('lsa_components'),
+    }
+
+
+def read_manifest(artifact_dir=DEFAULT_ARTIFACT_DIR):
+    """The artifact's manifest.json as a dict, or None if it is missing or unreadable"""
+    try:
+        with open(os.path.join(artifact_dir, 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def artifact_lock(artifact_dir=DEFAULT_ARTIFACT_DIR):
+    """Exclusive lock serializing writers of the artifact and update log across processes"""
+    path = os.path.abspath(artifact_dir) + '.lock'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def load_current(csv_path, artifact_dir, k, updates_path):
+    """The saved model if it matches the CSV, update log and k, else None"""
+    with phase('fingerprint'):
+        fingerprint = csv_fingerprint(csv_path, k, updates_path) if os.path.exists(csv_path) else None
+    with phase('load_artifact'):
+        model = load_model(artifact_dir, fingerprint=fingerprint)
+    return model if model is not None and model['k'] == k else None
+
+
+def load_or_build(csv_path=DEFAULT_CSV_PATH, artifact_dir=DEFAULT_ARTIFACT_DIR, k=50,
+                  updates_path=DEFAULT_UPDATES_PATH):
+    """Load the artifact if it matches the CSV and update log, otherwise rebuild (and try to save) it.
+
+    The rebuild holds artifact_lock, so concurrent workers (and catalog
+    updates) never publish over each other; a worker that waited on the lock
+    loads the artifact the first one saved instead of rebuilding it.
+    """
+    model = load_current(csv_path, artifact_dir, k, updates_path)
+    if model is not None:
+        print(f"Loaded model artifact from {artifact_dir}")
+        return model
+
+    with ExitStack() as stack:
+        try:
+            stack.enter_context(artifact_lock(artifact_dir))
+        except OSError as e:
+            print(f"⚠️  Could not lock the model artifact ({e}); building without saving")
+            return build_model(csv_path, k=k, updates_path=updates_path)
+
+        model = load_current(csv_path, artifact_dir, k, updates_path)
+        if model is not None:
+            print(f"Loaded model artifact from {artifact_dir} (saved by another process)")
+            return model
+
+        print("Model artifact missing or stale; rebuilding...")
+        model = build_model(csv_path, k=k, updates_path=updates_path)
+        try:
+            with phase('save_artifact'):
+                save_model(model, artifact_dir)
+            print(f"Saved model artifact to {artifact_dir}")
+        except OSError as e:
+            print(f"⚠️  Could not save model artifact: {e}")
+            return model
+        # Serve the memory-mapped copy so forked workers share it
+        return load_model(artifact_dir) or model
+
+
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CSV_PATH
+    artifact_dir = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_ARTIFACT_DIR
+    k = int(os.getenv("TOP_K_NEIGHBORS", "50"))
+
+    with artifact_lock(artifact_dir):
+        model = build_model(csv_path, k=k, updates_path=DEFAULT_UPDATES_PATH)
+        save_model(model, artifact_dir)
+    nbytes = model_nbytes(model)
+    print(f"✅ Model artifact written to {artifact_dir} ({len(model['df'])} movies, k={k}; "
+          f"vectors {nbytes['vectors'] / 2**20:.1f} MB, neighbor tables {nbytes['neighbors'] / 2**20:.1f} MB)")
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+
+class MovieStore:
+    """Read-only, columnar copy of the movie fields the API returns.
+
+    Built once from the DataFrame: typed numpy arrays for numbers, plain lists
+    for text, and a TMDB id -> row map. Serializing a movie is a handful of
+    list/array lookups instead of a pandas row access.
+    """
+
+    __slots__ = ('ids', 'titles', 'ratings', 'vote_counts', 'genres', 'overviews',
+                 'display_ratings', 'id_to_row')
+
+    def __init__(self, df):
+        self.ids = df['id'].to_numpy(dtype=np.int64)
+        self.titles = df['original_title'].tolist()
+        self.ratings = df['vote_average'].to_numpy(dtype=np.float64)
+        self.vote_counts = df['vote_count'].to_numpy(dtype=np.float64)
+        self.genres = df['genres'].tolist() if 'genres' in df.columns else [''] * len(df)
+        self.overviews = df['overview'].tolist() if 'overview' in df.columns else [''] * len(df)
+        # Rounded rating as shown on cards ('N/A' when missing)
+        self.display_ratings = [round(r, 1) if not np.isnan(r) else 'N/A' for r in self.ratings.tolist()]
+
+        self.id_to_row = {}
+        for row, movie_id in enumerate(self.ids.tolist()):
+            self.id_to_row.setdefault(movie_id, row)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def row_for_id(self, movie_id):
+        return self.id_to_row.get(movie_id)
+
+    def card(self, row, poster=None, score=None):
+        """Movie as returned in lists and recommendations"""
+        item = {
+            'id': int(self.ids[row]),
+            'title': self.titles[row],
+            'rating': self.display_ratings[row],
+            'poster': poster,
+            'genres': self.genres[row],
+            'overview': self.overviews[row],
+        }
+        if score is not None:
+            item['score'] = score
+        return item
+
+    def details(self, row, poster=None):
+        """Movie as returned by /api/movie/<id>"""
+        rating = self.ratings[row]
+        vote_count = self.vote_counts[row]
+        return {
+            'id': int(self.ids[row]),
+            'title': self.titles[row],
+            'overview': self.overviews[row],
+            'genres': self.genres[row],
+            'rating': float(rating) if pd.notna(rating) else None,
+            'vote_count': int(vote_count) if pd.notna(vote_count) else 0,
+            'poster': poster,
+        }
@@ -0,0 +1,160 @@
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+# Processes used to build neighbor tables / fit TF-IDF (1 = in-process)
+BUILD_WORKERS = int(os.getenv("BUILD_WORKERS", "1"))
+
+# Cap on the dense (block x N) similarity slab each search holds at once
+SLAB_BYTES = 256 * 2**20
+
+# Smaller inputs are built in-process (a pool costs more than it saves)
+PARALLEL_MIN_ROWS = 1024
+
+
+def top_n_indices(scores, n, exclude=None):
+    """Return the row ids of the n highest scores, best first.
+
+    Uses argpartition and only sorts the selected slice. Ties are broken by
+    lower row id, matching a stable descending sort. `exclude` is a row id
+    (e.g. the query movie itself) that is never returned.
+    """
+    scores = np.asarray(scores)
+    if exclude is not None:
+        scores = scores.astype(np.float64, copy=True)
+        scores[exclude] = -np.inf
+        n = min(n, scores.shape[0] - 1)
+    else:
+        n = min(n, scores.shape[0])
+    if n <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    if n < scores.shape[0]:
+        top = np.argpartition(-scores, n - 1)[:n]
+        # argpartition picks arbitrarily among scores tied at the cut-off
+        if np.count_nonzero(scores >= scores[top].min()) > n:
+            return np.argsort(-scores, kind='stable')[:n]
+    else:
+        top = np.arange(n)
+    top.sort()
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+def top_k_rows(sims, k):
+    """Per row of a dense similarity block: top-k column ids and scores, best first.
+
+    Ties are broken by lower column id, same as a stable descending sort.
+    """
+    n_rows, n_cols = sims.shape
+    width = min(k, n_cols)
+    if width < n_cols:
+        top = np.argpartition(-sims, width - 1, axis=1)[:, :width]
+        # argpartition picks arbitrarily among scores tied at the cut-off;
+        # redo those rows with a stable sort so the lowest ids win.
+        cutoff = np.take_along_axis(sims, top, axis=1).min(axis=1)
+        tied = np.flatnonzero((sims >= cutoff[:, None]).sum(axis=1) > width)
+        for row in tied:
+            top[row] = top_n_indices(sims[row], width)
+    else:
+        top = np.tile(np.arange(n_cols), (n_rows, 1))
+    top.sort(axis=1)
+    top_scores = np.take_along_axis(sims, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def dot_block(queries, tfidf_matrix):
+    """Dense (Q x N) dot products of query rows with every row of tfidf_matrix.
+
+    What sklearn's linear_kernel computes for these inputs, without importing
+    scikit-learn (about a second) into the serving process.
+    """
+    dtype = np.result_type(queries.dtype, tfidf_matrix.dtype)
+    sims = queries.astype(dtype, copy=False) @ tfidf_matrix.astype(dtype, copy=False).T
+    return sims.toarray() if sparse.issparse(sims) else np.asarray(sims)
+
+
+def search_neighbors(queries, tfidf_matrix, k, block_size=512):
+    """Top-k rows of tfidf_matrix by cosine similarity to each query row.
+
+    `queries` is any (Q x V) matrix in the same TF-IDF space (rows of
+    tfidf_matrix, transformed new text, centroids...). Similarities are
+    computed as block x tfidf_matrix.T sparse products, block_size queries at a
+    time (fewer for catalogs where that slab would exceed SLAB_BYTES), so only
+    a (block_size x N) slab is ever dense. Returns int32 ids and float32
+    scores of shape (Q, min(k, N)).
+    """
+    n_queries = queries.shape[0]
+    width = min(k, tfidf_matrix.shape[0])
+    block_size = max(1, min(block_size, SLAB_BYTES // (8 * max(tfidf_matrix.shape[0], 1))))
+    neighbor_ids = np.empty((n_queries, width), dtype=np.int32)
+    neighbor_scores = np.empty((n_queries, width), dtype=np.float32)
+
+    for start in range(0, n_queries, block_size):
+        stop = min(start + block_size, n_queries)
+        sims = dot_block(queries[start:stop], tfidf_matrix)
+        neighbor_ids[start:stop], neighbor_scores[start:stop] = top_k_rows(sims, width)
+
+    return neighbor_ids, neighbor_scores
+
+
+def process_pool(workers, initializer=None, initargs=()):
+    """Process pool that forks where the platform allows, so workers inherit
+    initargs (large matrices, memory-mapped arrays) instead of unpickling them"""
+    context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                               initializer=initializer, initargs=initargs)
+
+
+_shared = {}
+
+
+def _init_worker(shared):
+    _shared.update(shared)
+
+
+def _search_slice(bounds):
+    start, stop = bounds
+    return _shared['search'](_shared['queries'][start:stop], _shared['matrix'], _shared['k'])
+
+
+def parallel_search(search, queries, tfidf_matrix, k, workers=BUILD_WORKERS):
+    """search(queries, tfidf_matrix, k) with the query rows split across worker processes.
+
+    Each worker runs `search` (search_neighbors, AnnIndex.search, ...) on
+    contiguous slices of queries and returns only their (rows x k) tables,
+    so the result is identical to the serial call.
+    """
+    n_queries = queries.shape[0]
+    if workers <= 1 or n_queries < PARALLEL_MIN_ROWS:
+        return search(queries, tfidf_matrix, k)
+
+    # A few slices per worker balances uneven slices
+    step = -(-n_queries // (workers * 4))
+    slices = [(start, min(start + step, n_queries)) for start in range(0, n_queries, step)]
+    width = min(k, tfidf_matrix.shape[0])
+    neighbor_ids = np.empty((n_queries, width), dtype=np.int32)
+    neighbor_scores = np.empty((n_queries, width), dtype=np.float32)
+
+    shared = {'search': search, 'queries': queries, 'matrix': tfidf_matrix, 'k': k}
+    with process_pool(workers, _init_worker, (shared,)) as pool:
+        for (start, stop), (ids, scores) in zip(slices, pool.map(_search_slice, slices)):
+            neighbor_ids[start:stop], neighbor_scores[start:stop] = ids, scores
+    return neighbor_ids, neighbor_scores
+
+
+def build_neighbor_index(tfidf_matrix, k=50, block_size=512, workers=BUILD_WORKERS):
+    """Precompute the top-k most similar movies for every row of tfidf_matrix.
+
+    Returns (neighbor_ids, neighbor_scores) with shapes (N, k + 1): int32 row
+    ids and float32 cosine scores, sorted by descending score with ties broken
+    by lower row id (same order as a stable sort over the full similarity
+    row). Column 0 is normally the movie itself. With workers > 1 the rows are
+    split across processes (see parallel_search).
+    """
+    search = functools.partial(search_neighbors, block_size=block_size)
+    return parallel_search(search, tfidf_matrix, tfidf_matrix, k + 1, workers)
@@ -0,0 +1,207 @@
+"""Poster resolution against the TMDB API.
+
+Lookups go memory (bounded LRU, cache.TTLCache) -> on-disk cache (SQLite,
+shared by all workers on the host) -> TMDB. Misses are fetched concurrently
+over a pooled HTTP session with bounded parallelism, and a batch never waits
+longer than its deadline: posters that are still in flight come back as None
+for this response and are cached when they land. "No poster" answers expire
+after POSTER_NEGATIVE_TTL; timeouts and server errors are never cached.
+Point TMDB_API_BASE at a local stub server for tests.
+"""
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from cache import MISSING, TTLCache
+
+TMDB_API_BASE = os.getenv("TMDB_API_BASE", "https://api.themoviedb.org/3")
+TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p/w500"
+
+POSTER_CACHE_PATH = os.getenv("POSTER_CACHE_PATH", "poster_cache.sqlite3")
+POSTER_CACHE_TTL = int(os.getenv("POSTER_CACHE_TTL", str(7 * 24 * 3600)))
+POSTER_NEGATIVE_TTL = int(os.getenv("POSTER_NEGATIVE_TTL", str(3600)))
+POSTER_MEMORY_ENTRIES = int(os.getenv("POSTER_MEMORY_ENTRIES", "10000"))
+POSTER_MAX_WORKERS = int(os.getenv("POSTER_MAX_WORKERS", "8"))
+POSTER_TIMEOUT = float(os.getenv("POSTER_TIMEOUT", "5"))
+POSTER_DEADLINE = float(os.getenv("POSTER_DEADLINE", "3"))
+
+metrics.describe('poster_lookups_total',
+                 'Poster lookups by the level that answered them (memory, disk, tmdb or unresolved)')
+metrics.describe('tmdb_request_seconds', 'Outbound TMDB poster request latency by outcome')
+
+
+class PosterDiskCache:
+    """Persistent movie_id -> poster URL cache with per-entry expiry.
+
+    Backed by SQLite in WAL mode so several gunicorn workers can read and write
+    the same file. A NULL url records "TMDB has no poster for this movie" and
+    expires after negative_ttl instead of ttl.
+    """
+
+    def __init__(self, path, ttl, negative_ttl):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        # Connections must not cross a fork; reopen in each worker
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS posters ("
+                "movie_id INTEGER PRIMARY KEY, url TEXT, expires REAL NOT NULL)"
+            )
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get_many(self, movie_ids):
+        """Return {movie_id: (url or None, seconds left)} for ids with an unexpired entry"""
+        if not movie_ids:
+            return {}
+        placeholders = ','.join('?' * len(movie_ids))
+        now = time.time()
+        try:
+            with self._lock:
+                rows = self._connection().execute(
+                    f"SELECT movie_id, url, expires FROM posters WHERE expires > ? AND movie_id IN ({placeholders})",
+                    [now, *movie_ids],
+                ).fetchall()
+        except sqlite3.Error:
+            return {}
+        return {movie_id: (url, expires - now) for movie_id, url, expires in rows}
+
+    def put(self, movie_id, url):
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO posters (movie_id, url, expires) VALUES (?, ?, ?)",
+                    (movie_id, url, time.time() + (self.ttl if url else self.negative_ttl)),
+                )
+                conn.commit()
+        except sqlite3.Error:
+            pass
+
+
+class PosterResolver:
+    """Batch poster lookups with caching, pooled HTTP and bounded concurrency"""
+
+    def __init__(self, api_key, base_url=TMDB_API_BASE, cache_path=POSTER_CACHE_PATH,
+                 ttl=POSTER_CACHE_TTL, negative_ttl=POSTER_NEGATIVE_TTL,
+                 memory_entries=POSTER_MEMORY_ENTRIES, max_workers=POSTER_MAX_WORKERS,
+                 timeout=POSTER_TIMEOUT, deadline=POSTER_DEADLINE):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_workers = max_workers
+        self.memory = TTLCache(memory_entries, ttl, negative_ttl)
+        self.disk = PosterDiskCache(cache_path, ttl, negative_ttl) if cache_path else None
+        # Re-entrant: add_done_callback runs _store inline if the fetch already finished
+        self._lock = threading.RLock()
+        self._inflight = {}
+        self._session = None
+        self._executor = None
+        self._pid = None
+
+    def _ensure_pool(self):
+        # Threads and sockets don't survive a fork; build them lazily per worker
+        if self._pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._session = session
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='poster')
+            self._inflight = {}
+            self._pid = os.getpid()
+
+    def _fetch(self, movie_id):
+        """Fetch one poster URL. Returns None if TMDB has none; raises on transient errors"""
+        start = time.perf_counter()
+        try:
+            resp = self._session.get(
+                f"{self.base_url}/movie/{movie_id}",
+                params={'api_key': self.api_key, 'language': 'en-US'},
+                timeout=self.timeout,
+            )
+        except requests.RequestException:
+            metrics.observe('tmdb_request_seconds', time.perf_counter() - start, outcome='error')
+            raise
+        outcome = 'not_found' if resp.status_code == 404 else 'ok' if resp.ok else 'error'
+        metrics.observe('tmdb_request_seconds', time.perf_counter() - start, outcome=outcome)
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        poster_path = resp.json().get('poster_path')
+        return f"{TMDB_IMAGE_BASE}{poster_path}" if poster_path else None
+
+    def _store(self, movie_id, future):
+        with self._lock:
+            self._inflight.pop(movie_id, None)
+        if future.exception() is not None:
+            # Timeouts / 5xx / connection errors: don't cache, retry next time
+            return
+        url = future.result()
+        self.memory.set(movie_id, url)
+        if self.disk is not None:
+            self.disk.put(movie_id, url)
+
+    def resolve_many(self, movie_ids, deadline=None):
+        """Return {movie_id: poster URL or None} for every id, within the deadline"""
+        movie_ids = [int(m) for m in movie_ids]
+        result = {}
+        missing = []
+        for movie_id in dict.fromkeys(movie_ids):
+            url = self.memory.get(movie_id)
+            if url is MISSING:
+                missing.append(movie_id)
+            else:
+                result[movie_id] = url
+        in_memory = on_disk = len(result)
+
+        if missing and self.disk is not None:
+            for movie_id, (url, ttl) in self.disk.get_many(missing).items():
+                self.memory.set(movie_id, url, ttl=ttl)
+                result[movie_id] = url
+            on_disk = len(result)
+            missing = [m for m in missing if m not in result]
+
+        if missing and self.api_key:
+            futures = {}
+            with self._lock:
+                self._ensure_pool()
+                for movie_id in missing:
+                    future = self._inflight.get(movie_id)
+                    if future is None:
+                        future = self._executor.submit(self._fetch, movie_id)
+                        self._inflight[movie_id] = future
+                        future.add_done_callback(lambda f, m=movie_id: self._store(m, f))
+                    futures[movie_id] = future
+
+            wait(futures.values(), timeout=self.deadline if deadline is None else deadline)
+            for movie_id, future in futures.items():
+                if future.done() and future.exception() is None:
+                    result[movie_id] = future.result()
+
+        # Where each distinct id was answered; 'unresolved' = late, failed or no API key
+        fetched = len(result) - on_disk
+        for source, count in (('memory', in_memory), ('disk', on_disk - in_memory), ('tmdb', fetched),
+                              ('unresolved', len(missing) - fetched)):
+            if count:
+                metrics.inc('poster_lookups_total', count, source=source)
+
+        return {movie_id: result.get(movie_id) for movie_id in movie_ids}
+
+    def resolve(self, movie_id):
+        return self.resolve_many([movie_id])[int(movie_id)]
@@ -0,0 +1,196 @@
+"""Streaming data preparation: TMDB CSVs -> columnar movie table.
+
+Does the work of step1_data_loading.py and the cleaning half of
+step2_cleaning_eda.py with memory bounded by the chunk size, so it scales to
+catalogs far larger than TMDB 5000:
+
+1. credits are read in chunks and reduced to the top-billed cast and the
+   directors of each movie id (the only per-movie state kept in memory);
+2. one pass over the movies' vote columns gives step 2's IQR outlier bounds
+   on vote_average and the min / max used to normalize the votes;
+3. movies are read in chunks, joined with the credits, their JSON columns
+   parsed, filtered, normalized and appended to the table (see columnar.py).
+
+JSON cells are parsed with json.loads, which gives the same lists as step 2's
+literal_eval about 10x faster. genres / keywords keep step 2's format (the
+list's Python repr) so the TF-IDF soup is unchanged. The charts stay in
+step 2, which is only needed for the report.
+
+    python prepare_data.py [--movies tmdb_5000_movies.csv] [--credits tmdb_5000_credits.csv]
+                           [--out movies_clean] [--chunksize 20000]
+
+model_store.load_movies reads the table directory in place of movies_clean.csv
+(see MOVIES_PATH there).
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from columnar import ColumnWriter
+from memstats import peak_memory_mb
+
+CAST_LIMIT = 5
+
+# Output columns: step 2's movies_clean.csv plus release_date
+SCHEMA = {
+    'id': 'int64',
+    'original_title': 'str',
+    'overview': 'str',
+    'genres': 'str',
+    'keywords': 'str',
+    'cast': 'str',
+    'crew': 'str',
+    'vote_average': 'float64',
+    'vote_count': 'int64',
+    'release_date': 'str',
+    'vote_average_normalized': 'float64',
+    'vote_count_normalized': 'float64',
+}
+MOVIE_COLUMNS = ['id', 'original_title', 'overview', 'genres', 'keywords', 'vote_average', 'vote_count',
+                 'release_date']
+
+
+def json_items(text):
+    """Objects of a TMDB JSON list cell ('[{"id": 28, ...}, ...]'); [] if malformed"""
+    try:
+        items = json.loads(text)
+    except (TypeError, ValueError):
+        return []
+    return items if isinstance(items, list) else []
+
+
+def json_names(text, limit=None):
+    """'name' values of a JSON list cell, like step 2's convert_json_to_list"""
+    try:
+        return [item['name'] for item in json_items(text)[:limit]]
+    except (KeyError, TypeError):
+        return []
+
+
+def director_names(text):
+    """Names of the crew members whose job is Director"""
+    return [item.get('name') for item in json_items(text)
+            if isinstance(item, dict) and item.get('job') == 'Director']
+
+
+def name_lists(values, parse=json_names):
+    """Column of JSON cells -> column of name lists, in step 2's CSV format"""
+    return [str(parse(text)) for text in values]
+
+
+def read_credits(path, chunksize):
+    """movie id -> (cast, crew) DataFrame with names only"""
+    parts = []
+    # Positional like step 1: movie_id, title, cast, crew
+    for chunk in pd.read_csv(path, usecols=[0, 2, 3], chunksize=chunksize):
+        chunk.columns = ['id', 'cast', 'crew']
+        parts.append(pd.DataFrame({
+            'id': chunk['id'].to_numpy(),
+            'cast': [str(json_names(text, CAST_LIMIT)) for text in chunk['cast']],
+            'crew': name_lists(chunk['crew'], director_names),
+        }))
+    credits = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=['id', 'cast', 'crew'])
+    return credits.drop_duplicates('id').set_index('id')
+
+
+def vote_bounds(path, credit_ids, chunksize):
+    """IQR bounds on vote_average and the min / max of the votes kept, over movies with credits"""
+    averages, counts, read = [], [], 0
+    for chunk in pd.read_csv(path, usecols=['id', 'vote_average', 'vote_count'], chunksize=chunksize):
+        read += len(chunk)
+        chunk = chunk[credit_ids.get_indexer(chunk['id']) >= 0]
+        averages.append(chunk['vote_average'].to_numpy(dtype=np.float64))
+        counts.append(chunk['vote_count'].to_numpy(dtype=np.float64))
+    averages = np.concatenate(averages) if averages else np.empty(0)
+    counts = np.concatenate(counts) if counts else np.empty(0)
+    if np.isnan(averages).all():
+        return {'lower': 0.0, 'upper': 0.0, 'average': (0, 0), 'count': (0, 0), 'read': read}
+
+    q1, q3 = np.nanquantile(averages, [0.25, 0.75])
+    lower, upper = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    kept = (averages >= lower) & (averages <= upper)
+    counts = np.nan_to_num(counts[kept])
+    return {
+        'lower': lower, 'upper': upper,
+        'average': (averages[kept].min(), averages[kept].max()),
+        'count': (counts.min(), counts.max()),
+        'read': read,
+    }
+
+
+def min_max(values, bounds):
+    lo, hi = bounds
+    # MinMaxScaler maps a constant column to 0
+    return (values - lo) / (hi - lo) if hi > lo else np.zeros(len(values))
+
+
+def prepare(movies_path, credits_path, out_path, chunksize=20000):
+    """Run the three passes and write the table; returns per-stage stats"""
+    stats = {}
+    start = time.perf_counter()
+    credits = read_credits(credits_path, chunksize)
+    stats['credits'] = (len(credits), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    bounds = vote_bounds(movies_path, credits.index, chunksize)
+    stats['vote bounds'] = (bounds['read'], time.perf_counter() - start)
+
+    start = time.perf_counter()
+    read = 0
+    writer = ColumnWriter(out_path, SCHEMA)
+    try:
+        for chunk in pd.read_csv(movies_path, usecols=lambda c: c in MOVIE_COLUMNS, chunksize=chunksize):
+            read += len(chunk)
+            if 'release_date' not in chunk.columns:
+                chunk['release_date'] = None
+            chunk = chunk.join(credits, on='id', how='inner')
+            vote_average = chunk['vote_average'].to_numpy(dtype=np.float64)
+            chunk = chunk[(vote_average >= bounds['lower']) & (vote_average <= bounds['upper'])]
+            if chunk.empty:
+                continue
+            chunk = chunk.assign(
+                genres=name_lists(chunk['genres']),
+                keywords=name_lists(chunk['keywords']),
+                overview=chunk['overview'].fillna(''),
+                vote_count=chunk['vote_count'].fillna(0),
+            )
+            chunk['vote_average_normalized'] = min_max(chunk['vote_average'].to_numpy(dtype=np.float64),
+                                                       bounds['average'])
+            chunk['vote_count_normalized'] = min_max(chunk['vote_count'].to_numpy(dtype=np.float64),
+                                                     bounds['count'])
+            writer.append(chunk)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    stats['movies'] = (read, time.perf_counter() - start)
+    stats['written'] = writer.rows
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--movies', default='tmdb_5000_movies.csv')
+    parser.add_argument('--credits', default='tmdb_5000_credits.csv')
+    parser.add_argument('--out', default='movies_clean')
+    parser.add_argument('--chunksize', type=int, default=20000, help='rows read per chunk')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        stats = prepare(args.movies, args.credits, args.out, args.chunksize)
+    except FileNotFoundError as e:
+        sys.exit(f"❌ {e}")
+    for stage in ('credits', 'vote bounds', 'movies'):
+        rows, seconds = stats[stage]
+        print(f"{stage:<12}: {rows:>9} rows in {seconds:6.2f} s ({rows / max(seconds, 1e-9):,.0f} rows/s)")
+    print(f"✅ {stats['written']} movies written to {args.out}/ in {time.perf_counter() - start:.2f} s "
+          f"(peak memory {peak_memory_mb()} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Precomputed "top movies" rankings for /api/top.
+
+Movies are ranked by the IMDB weighted rating
+
+    WR = v / (v + m) * R + m / (v + m) * C
+
+where R is the movie's average vote, v its vote count, C the mean vote over
+the catalog and m the vote count at the MIN_VOTES_QUANTILE quantile. A film
+with a handful of votes is pulled towards C, so it no longer outranks films
+rated by thousands. The overall order and one order per genre are sorted
+once per catalog; a request only slices them.
+"""
+import os
+
+import numpy as np
+
+MIN_VOTES_QUANTILE = float(os.getenv("RANKING_MIN_VOTES_QUANTILE", "0.9"))
+
+
+def weighted_ratings(ratings, vote_counts, quantile=MIN_VOTES_QUANTILE):
+    """(weighted rating per row, C, m); NaN where the movie has no rating"""
+    ratings = np.asarray(ratings, dtype=np.float64)
+    votes = np.nan_to_num(np.asarray(vote_counts, dtype=np.float64), nan=0.0).clip(min=0)
+    rated = ~np.isnan(ratings)
+    mean = float(ratings[rated].mean()) if rated.any() else 0.0
+    min_votes = float(np.quantile(votes, quantile)) if len(votes) else 0.0
+    total = votes + min_votes
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # No votes at all (v + m = 0): fall back to the plain average
+        weighted = np.where(total > 0, (votes * ratings + min_votes * mean) / total, ratings)
+    return weighted, mean, min_votes
+
+
+class Rankings:
+    """Rows by descending weighted rating, overall and per genre.
+
+    Ties go to the movie with more votes, then to table order; unrated movies
+    come last. `order` and every `by_genre[genre]` are int32 row arrays.
+    """
+
+    def __init__(self, ratings, vote_counts, genre_index, quantile=MIN_VOTES_QUANTILE):
+        self.weighted, self.mean_rating, self.min_votes = weighted_ratings(ratings, vote_counts, quantile)
+        self.votes = np.nan_to_num(np.asarray(vote_counts, dtype=np.float64), nan=0.0)
+        score = np.where(np.isnan(self.weighted), -np.inf, self.weighted)
+        self.order = np.lexsort((-self.votes, -score)).astype(np.int32)
+
+        # Rank of every row, so each genre's rows sort by a plain argsort
+        rank = np.empty(len(self.order), dtype=np.int32)
+        rank[self.order] = np.arange(len(self.order), dtype=np.int32)
+        self.by_genre = {genre: rows[np.argsort(rank[rows], kind='stable')]
+                         for genre, rows in genre_index.postings.items()}
+        self.genre_names = {genre.casefold(): genre for genre in genre_index.genres}
+
+    def genre(self, name):
+        """Canonical genre name for name (case-insensitive), or None if unknown"""
+        return self.genre_names.get(name.casefold())
+
+    def top(self, n, genre=None, min_votes=0):
+        """The n best rows, optionally of one genre (see genre()) and with at least min_votes votes"""
+        ranked = self.order if genre is None else self.by_genre.get(genre, self.order[:0])
+        if min_votes <= 0:
+            return ranked[:n].tolist()
+        # Scan down the ranking in growing chunks until n rows pass the vote filter
+        rows, start, chunk = [], 0, max(4 * n, 256)
+        while len(rows) < n and start < len(ranked):
+            block = ranked[start:start + chunk]
+            rows.extend(block[self.votes[block] >= min_votes].tolist())
+            start += chunk
+            chunk *= 2
+        return rows[:n]
@@ -147,22 +147,44 @@ async function loadMoviesList() {
     try {
         if (!USE_API) throw new Error('Offline demo mode');
 
-        const response = await fetch(`${API_BASE}/movies`);
+        // Most popular titles; refined per keystroke by updateAutocomplete()
+        const response = await fetch(`${API_BASE}/autocomplete?prefix=&limit=20`);
         const data = await response.json();
-        moviesList = data.movies;
+        moviesList = data.titles;
     } catch (error) {
         console.warn('Using demo movie list:', error.message || error);
         moviesList = DEMO_MOVIES.map(m => m.title);
     }
 
+    fillMovieDatalist(moviesList);
+}
+
+function fillMovieDatalist(titles) {
     const datalist = document.getElementById('movie-list');
-    moviesList.forEach(movie => {
+    datalist.innerHTML = '';
+    titles.forEach(movie => {
         const option = document.createElement('option');
         option.value = movie;
         datalist.appendChild(option);
     });
 }
 
+// Typeahead: ask the API for completions of what has been typed so far
+let autocompleteSeq = 0;
+async function updateAutocomplete(prefix) {
+    if (!USE_API) return;
+    const seq = ++autocompleteSeq;
+    try {
+        const res = await fetch(`${API_BASE}/autocomplete?prefix=${encodeURIComponent(prefix)}&limit=10`);
+        if (!res.ok) return;
+        const data = await res.json();
+        // Ignore responses that arrive after a newer keystroke
+        if (seq === autocompleteSeq) fillMovieDatalist(data.titles || []);
+    } catch (error) {
+        console.warn('Autocomplete failed:', error.message || error);
+    }
+}
+
 async function loadGenresList() {
     try {
         if (!USE_API) throw new Error('Offline demo mode');
@@ -546,38 +568,27 @@ async function buildHistoryRecommendations() {
     emptyState.style.display = 'none';
     historyGrid.innerHTML = '<p class="empty-state">Loading recommendations...</p>';
 
-    const uniqueTitles = Array.from(new Set(searchHistory.map(entry => entry.title))).slice(0, 5);
+    const uniqueTitles = Array.from(new Set(searchHistory.map(entry => entry.title)));
     const combined = [];
-    const seenTitles = new Set();
 
-    for (const title of uniqueTitles) {
-        try {
-            if (!USE_API) {
-                DEMO_MOVIES.forEach(movie => {
-                    if (!seenTitles.has(movie.title)) {
-                        seenTitles.add(movie.title);
-                        combined.push(movie);
-                    }
-                });
-            } else {
-                const res = await fetch(`${API_BASE}/recommend`, {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ movie: title })
-                });
-                const data = await res.json();
-                if (data.recommendations) {
-                    data.recommendations.forEach(movie => {
-                        if (!seenTitles.has(movie.title)) {
-                            seenTitles.add(movie.title);
-                            combined.push(movie);
-                        }
-                    });
-                }
-            }
-        } catch (err) {
-            console.error('History recommendation error', err);
+    try {
+        if (!USE_API) {
+            combined.push(...DEMO_MOVIES);
+        } else {
+            // One "more like these" query over the whole history; recent searches weigh more
+            const res = await fetch(`${API_BASE}/recommend/profile`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    movies: uniqueTitles.map((title, i) => ({ title, weight: 1 / (i + 1) })),
+                    n: 12
+                })
+            });
+            const data = await res.json();
+            if (data.recommendations) combined.push(...data.recommendations);
         }
+    } catch (err) {
+        console.error('History recommendation error', err);
     }
 
     if (combined.length === 0) {
@@ -628,6 +639,10 @@ function renderRecentKeywords() {
 
 const movieInputEl = document.getElementById('movie-input');
 if (movieInputEl) {
+    const debouncedAutocomplete = debounce(updateAutocomplete, 120);
+    movieInputEl.addEventListener('input', () => {
+        debouncedAutocomplete(movieInputEl.value.trimStart());
+    });
     movieInputEl.addEventListener('focus', () => {
         renderRecentKeywords();
     });
@@ -0,0 +1,206 @@
+"""Indexed multi-facet movie search for /api/search.
+
+Title words go into an inverted index (folded tokens -> rows, with BM25
+statistics); genres come from GenreIndex postings; rating and release year
+filters are range lookups over presorted arrays. A query intersects the
+smallest candidate sets first and only ranks the survivors, so cost follows
+the number of matches rather than the catalog size.
+"""
+import base64
+import json
+import re
+from bisect import bisect_left
+
+import numpy as np
+
+from title_index import fold
+
+TOKEN_RE = re.compile(r'\w+')
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+SORTS = ('relevance', 'popularity', 'rating')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(fold(text))
+
+
+def encode_cursor(offset, version):
+    raw = json.dumps({'o': offset, 'v': version}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, version):
+    """Offset stored in cursor; raises ValueError if malformed or from another dataset version"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        offset = int(data['o'])
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if data.get('v') != version or offset < 0:
+        raise ValueError('Cursor is from an older dataset; restart the search')
+    return offset
+
+
+def release_years(values):
+    """Year (int) per release date string, -1 where missing/unparseable"""
+    years = np.full(len(values), -1, dtype=np.int32)
+    for row, value in enumerate(values):
+        text = '' if value is None or value != value else str(value)
+        if len(text) >= 4 and text[:4].isdigit():
+            years[row] = int(text[:4])
+    return years
+
+
+class SearchIndex:
+
+    def __init__(self, titles, ratings, release_dates, genre_index, title_index):
+        self.genre_index = genre_index
+        self.title_index = title_index
+        n_rows = len(titles)
+
+        # Popularity rank per row (0 = most voted), shared with TitleIndex
+        self.popularity_rank = np.empty(n_rows, dtype=np.int32)
+        self.popularity_rank[title_index.rank_to_row] = np.arange(n_rows, dtype=np.int32)
+
+        # Title inverted index: token -> (rows, term frequencies)
+        postings = {}
+        lengths = np.zeros(n_rows, dtype=np.float32)
+        self.folded_titles = []
+        for row, title in enumerate(titles):
+            text = '' if title is None or title != title else str(title)
+            self.folded_titles.append(fold(text))
+            tokens = tokenize(text)
+            lengths[row] = len(tokens)
+            for token in tokens:
+                counts = postings.setdefault(token, {})
+                counts[row] = counts.get(row, 0) + 1
+        self.tokens = sorted(postings)
+        self.postings = {
+            token: (np.fromiter(counts.keys(), dtype=np.int32, count=len(counts)),
+                    np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+            for token, counts in postings.items()
+        }
+        self.doc_lengths = lengths
+        self.avg_length = float(lengths.mean()) if n_rows else 0.0
+        self.n_rows = n_rows
+
+        # Numeric facets: values plus row order sorted by value (missing excluded)
+        self.ratings = np.asarray(ratings, dtype=np.float64)
+        self.years = release_years(release_dates)
+        self.rating_order, self.rating_sorted = self._sorted_facet(self.ratings, ~np.isnan(self.ratings))
+        self.year_order, self.year_sorted = self._sorted_facet(self.years, self.years >= 0)
+
+    @staticmethod
+    def _sorted_facet(values, present):
+        rows = np.flatnonzero(present)
+        order = rows[np.argsort(values[rows], kind='stable')].astype(np.int32)
+        return order, values[order]
+
+    @staticmethod
+    def _range(order, sorted_values, low, high):
+        lo = 0 if low is None else np.searchsorted(sorted_values, low, side='left')
+        hi = len(order) if high is None else np.searchsorted(sorted_values, high, side='right')
+        return np.sort(order[lo:hi])
+
+    def _idf(self, df):
+        return np.log(1 + (self.n_rows - df + 0.5) / (df + 0.5))
+
+    def _title_matches(self, query):
+        """(rows, bm25 scores) for titles containing every query word (last word as a prefix)"""
+        words = tokenize(query)
+        if not words:
+            return None, None
+        rows, scores = None, None
+        for position, word in enumerate(words):
+            if position == len(words) - 1:
+                lo = bisect_left(self.tokens, word)
+                hi = bisect_left(self.tokens, word + '\U0010ffff', lo)
+                expansions = self.tokens[lo:hi]
+            else:
+                expansions = [word] if word in self.postings else []
+            if not expansions:
+                return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+            # Best-scoring expansion per row for this query word
+            term_rows = np.concatenate([self.postings[t][0] for t in expansions])
+            term_scores = np.concatenate([self._bm25(t) for t in expansions])
+            order = np.lexsort((-term_scores, term_rows))
+            term_rows, term_scores = term_rows[order], term_scores[order]
+            first = np.ones(len(term_rows), dtype=bool)
+            first[1:] = term_rows[1:] != term_rows[:-1]
+            term_rows, term_scores = term_rows[first], term_scores[first]
+
+            if rows is None:
+                rows, scores = term_rows, term_scores
+            else:
+                rows, left, right = np.intersect1d(rows, term_rows, assume_unique=True, return_indices=True)
+                scores = scores[left] + term_scores[right]
+            if not len(rows):
+                break
+        return rows, scores
+
+    def _bm25(self, token):
+        rows, tf = self.postings[token]
+        norm = K1 * (1 - B + B * self.doc_lengths[rows] / (self.avg_length or 1))
+        return (self._idf(len(rows)) * tf * (K1 + 1) / (tf + norm)).astype(np.float32)
+
+    def search(self, query='', genre='', min_rating=None, max_rating=None,
+               year_from=None, year_to=None, sort='relevance', offset=0, limit=20):
+        """Return (rows for this page, total number of matches)"""
+        candidate_sets = []
+        scores = None
+        if query:
+            rows, scores = self._title_matches(query)
+            if rows is None or not len(rows):
+                # No word match: fall back to substring matching on the title
+                rows = np.sort(self.title_index.rows_containing(query))
+                scores = np.zeros(len(rows), dtype=np.float32)
+            title_rows = rows
+            candidate_sets.append(rows)
+        if genre:
+            candidate_sets.append(self.genre_index.rows_matching(genre))
+        if min_rating is not None or max_rating is not None:
+            candidate_sets.append(self._range(self.rating_order, self.rating_sorted, min_rating, max_rating))
+        if year_from is not None or year_to is not None:
+            candidate_sets.append(self._range(self.year_order, self.year_sorted, year_from, year_to))
+
+        if not candidate_sets:
+            matches = np.arange(self.n_rows, dtype=np.int32)
+        else:
+            candidate_sets.sort(key=len)
+            matches = candidate_sets[0]
+            for other in candidate_sets[1:]:
+                if not len(matches):
+                    break
+                matches = np.intersect1d(matches, other, assume_unique=True)
+
+        total = len(matches)
+        wanted = offset + limit
+        if offset >= total:
+            return [], total
+
+        # Primary key (ascending) per sort mode; popularity rank breaks ties
+        popularity = self.popularity_rank[matches]
+        if sort == 'rating':
+            primary = -np.nan_to_num(self.ratings[matches], nan=-1.0)
+        elif sort == 'popularity' or not query:
+            primary = popularity.astype(np.float64)
+        else:
+            # Re-align title scores with the surviving rows; exact titles first
+            relevance = scores[np.searchsorted(title_rows, matches)].astype(np.float64)
+            folded_query = fold(query).strip()
+            exact = np.fromiter((self.folded_titles[r] == folded_query for r in matches.tolist()),
+                                dtype=bool, count=total)
+            primary = -(relevance + exact * 1e6)
+
+        if wanted < total:
+            # Only fully order the rows that can appear up to this page
+            cut = np.partition(primary, wanted - 1)[wanted - 1]
+            keep = primary <= cut
+            matches, primary, popularity = matches[keep], primary[keep], popularity[keep]
+        order = np.lexsort((popularity, primary))
+        return matches[order][offset:wanted].tolist(), total
@@ -0,0 +1,105 @@
+"""Shared fixtures: a small synthetic catalog and an API process pointed at it.
+
+model_store, posters and api read their paths and settings from the
+environment at import, so the environment is set here, before any test
+module imports them. Nothing touches the working tree or the network.
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORDS = ['space', 'love', 'war', 'ocean', 'night', 'king', 'dream', 'island', 'robot', 'ghost',
+         'city', 'river', 'storm', 'heist', 'family', 'secret', 'desert', 'empire', 'winter', 'school']
+GENRES = ['Drama', 'Comedy', 'Action', 'Horror', 'Romance', 'Science Fiction', 'Thriller']
+N_MOVIES = 120
+TOP_K = 10
+
+
+def make_movies(n=N_MOVIES, seed=7):
+    """Movies with unique titles, overlapping vocabularies and a spread of votes"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        genres = rng.sample(GENRES, rng.randint(1, 3))
+        rows.append({
+            'id': 1001 + i,
+            'original_title': f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}",
+            'overview': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))),
+            'genres': str(genres),
+            'keywords': ' '.join(rng.sample(WORDS, 3)),
+            'vote_average': round(rng.uniform(3, 9.5), 1),
+            'vote_count': rng.choice([2, 15, 80, 400, 2500, 9000]),
+            'release_date': f"{rng.randint(1960, 2020)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+        })
+    return pd.DataFrame(rows)
+
+
+_TMP = tempfile.mkdtemp(prefix='movie-tests-')
+MOVIES_CSV = os.path.join(_TMP, 'movies_clean.csv')
+make_movies().to_csv(MOVIES_CSV, index=False)
+
+os.environ.update({
+    'MOVIES_PATH': MOVIES_CSV,
+    'MODEL_DIR': os.path.join(_TMP, 'model_artifact'),
+    'CATALOG_UPDATES_PATH': os.path.join(_TMP, 'catalog_updates.jsonl'),
+    'POSTER_CACHE_PATH': '',
+    'TMDB_API_KEY': '',
+    'TOP_K_NEIGHBORS': str(TOP_K),
+    'MODEL_WARMUP': 'eager',
+    'CATALOG_POLL_INTERVAL': '0',
+    'CATALOG_REFIT_INTERVAL': '0',
+    'RESPONSE_CACHE_WARM': '0',
+    'METRICS_DIR': '',
+    'BUILD_WORKERS': '1',
+})
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_TMP, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def api():
+    import api as module
+    return module
+
+
+@pytest.fixture(scope='session', name='make_movies')
+def make_movies_fixture():
+    return make_movies
+
+
+@pytest.fixture
+def client(api):
+    return api.app.test_client()
+
+
+@pytest.fixture
+def single_recommendations(client):
+    """Recommendations (without the matched movie) /api/recommend gives for a title"""
+    def recommendations(title):
+        data = client.post('/api/recommend', json={'movie': title}).get_json()
+        assert data['recommendations'][0]['title'] == title
+        return data['recommendations'][1:]
+    return recommendations
+
+
+@pytest.fixture(scope='session')
+def seed_titles(api):
+    return [api.catalog.movies_store.titles[row] for row in (0, 3, 17, 42)]
+
+
+@pytest.fixture
+def movies_csv(tmp_path):
+    """A private copy of the synthetic catalog, for tests that build or update models"""
+    path = tmp_path / 'movies_clean.csv'
+    shutil.copy(MOVIES_CSV, path)
+    return str(path)
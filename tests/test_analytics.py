@@ -0,0 +1,59 @@
+import os
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from genre_index import GenreIndex, parse_genres
+
+
+@pytest.mark.parametrize('value, genres', [
+    ("['Action', 'Science Fiction']", ['Action', 'Science Fiction']),
+    ('Drama|Comedy', ['Drama', 'Comedy']),
+    ('Horror, Thriller', ['Horror', 'Thriller']),
+    ('', []),
+    (None, []),
+    (float('nan'), []),
+])
+def test_parse_genres(value, genres):
+    assert parse_genres(value) == genres
+
+
+def test_genre_index_postings_and_counts():
+    index = GenreIndex(["['Drama', 'Comedy']", "['Comedy']", None, "Drama|Drama"])
+    assert index.genres == ['Drama', 'Comedy']
+    assert index.postings['Drama'].tolist() == [0, 3]
+    assert index.most_common(5) == [('Drama', 2), ('Comedy', 2)]
+    assert index.rows_matching('COM').tolist() == [0, 1]
+    assert index.matrix().toarray().tolist() == [[1, 1], [0, 1], [0, 0], [1, 0]]
+
+
+def test_analytics_match_the_catalog(client):
+    df = pd.read_csv(os.environ['MOVIES_PATH'])
+    counts = Counter(genre for value in df['genres'] for genre in parse_genres(value))
+    assert client.get('/api/genres').get_json()['genres'] == sorted(counts)
+
+    distribution = client.get('/api/analytics/rating-distribution').get_json()
+    expected, _ = np.histogram(df['vote_average'], bins=[0, 2, 4, 6, 8, 10])
+    assert distribution['counts'] == expected.tolist()
+
+    frequency = client.get('/api/analytics/genre-frequency').get_json()
+    assert dict(zip(frequency['labels'], frequency['counts'])) == dict(counts)
+    assert frequency['counts'] == sorted(frequency['counts'], reverse=True)
+
+
+@pytest.mark.parametrize('path', ['/api/stats', '/api/genres', '/api/analytics/rating-distribution',
+                                  '/api/analytics/genre-frequency'])
+def test_matching_etag_gets_304(client, path):
+    first = client.get(path)
+    assert first.status_code == 200 and first.headers['ETag']
+
+    again = client.get(path, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == first.headers['ETag']
+
+    other = client.get(path, headers={'If-None-Match': '"something-else"'})
+    assert other.status_code == 200
+    assert other.data == first.data
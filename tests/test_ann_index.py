@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+from ann_index import AnnIndex, prune_rows, recall_at_k, sample_recall
+from model_store import BASELINE_REPRESENTATION, fit_tfidf
+from neighbors import build_neighbor_index
+
+K = 10
+
+
+@pytest.fixture(scope='module')
+def tfidf_matrix(make_movies):
+    df = make_movies(n=1500, seed=11)
+    soup = df['overview'] + ' ' + df['genres'] + ' ' + df['keywords']
+    return fit_tfidf(soup, BASELINE_REPRESENTATION, workers=1)[1]
+
+
+def test_prune_rows_keeps_the_largest_entries():
+    matrix = sparse.csr_matrix(np.array([[0.1, 0.5, 0.0, 0.3], [0.0, 0.2, 0.0, 0.0]]))
+    assert prune_rows(matrix, 2).toarray().tolist() == [[0.0, 0.5, 0.0, 0.3], [0.0, 0.2, 0.0, 0.0]]
+
+
+def test_recall_counts_ties_with_the_kth_score():
+    exact = np.array([[0.9, 0.8, 0.5]])
+    assert recall_at_k(np.array([[0.9, 0.8, 0.5]]), exact) == 1.0
+    assert recall_at_k(np.array([[0.9, 0.5, 0.5]]), exact) == 1.0   # another movie tied at 0.5
+    assert recall_at_k(np.array([[0.9, 0.8, 0.4]]), exact) == pytest.approx(2 / 3)
+
+
+def test_unpruned_search_is_exact(tfidf_matrix):
+    ann = AnnIndex.build(tfidf_matrix, query_terms=tfidf_matrix.shape[1], candidates=tfidf_matrix.shape[0])
+    ids, scores = ann.neighbor_tables(tfidf_matrix, k=K, workers=1)
+    exact_ids, exact_scores = build_neighbor_index(tfidf_matrix, k=K, workers=1)
+    np.testing.assert_array_equal(ids, exact_ids)
+    np.testing.assert_allclose(scores, exact_scores, atol=1e-6)
+
+
+def test_pruned_search_keeps_high_recall_with_true_scores(tfidf_matrix):
+    ann = AnnIndex.build(tfidf_matrix, query_terms=8, candidates=300)
+    ids, scores = ann.neighbor_tables(tfidf_matrix, k=K, workers=1)
+    assert sample_recall(scores, tfidf_matrix, sample=300) >= 0.9
+
+    # Scores are exact cosines of the returned rows, in descending order
+    rows = np.arange(0, tfidf_matrix.shape[0], 37)
+    true = np.asarray(tfidf_matrix[rows].multiply(tfidf_matrix[ids[rows, 3]]).sum(axis=1)).ravel()
+    np.testing.assert_allclose(scores[rows, 3], true, atol=1e-6)
+    assert (np.diff(scores, axis=1) <= 1e-7).all()
+
+
+def test_fewer_candidates_cannot_raise_recall(tfidf_matrix):
+    recalls = [sample_recall(AnnIndex.build(tfidf_matrix, query_terms=3, candidates=width)
+                             .neighbor_tables(tfidf_matrix, k=K, workers=1)[1], tfidf_matrix)
+               for width in (20, 60, 300)]
+    assert recalls == sorted(recalls)
@@ -0,0 +1,74 @@
+import pytest
+
+from cache import MISSING, TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(3, ttl=60, clock=clock)
+    for key in 'abc':
+        cache.set(key, key.upper())
+    assert cache.get('a') == 'A'  # 'b' is now the oldest
+    cache.set('d', 'D')
+    cache.set('e', 'E')
+
+    assert cache.get('b') is MISSING and cache.get('c') is MISSING
+    assert [cache.get(key) for key in 'ade'] == ['A', 'D', 'E']
+    assert cache.stats() == {'entries': 3, 'max_entries': 3, 'hits': 4, 'misses': 2,
+                             'evictions': 2, 'expirations': 0}
+
+
+def test_overwriting_a_key_does_not_evict(clock):
+    cache = TTLCache(2, ttl=60, clock=clock)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('a', 3)
+    assert len(cache) == 2 and cache.get('a') == 3 and cache.get('b') == 2
+    assert cache.stats()['evictions'] == 0
+
+
+def test_entries_expire_after_their_ttl(clock):
+    cache = TTLCache(10, ttl=60, clock=clock)
+    cache.set('a', 1)
+    cache.set('b', 2, ttl=5)
+    clock.now += 5
+    assert 'b' not in cache
+    assert cache.get('b', 'gone') == 'gone'
+    assert cache.get('a') == 1
+    clock.now += 55
+    assert cache.get('a') is MISSING
+    assert cache.stats()['expirations'] == 2 and len(cache) == 0
+
+
+def test_none_values_use_the_negative_ttl(clock):
+    cache = TTLCache(10, ttl=60, negative_ttl=10, clock=clock)
+    cache.set('poster', 'url')
+    cache.set('no-poster', None)
+    clock.now += 10
+    assert cache.get('no-poster') is MISSING
+    assert cache.get('poster') == 'url'
+
+    # Without a negative_ttl, None values keep the normal ttl
+    cache = TTLCache(10, ttl=60, clock=clock)
+    cache.set('no-poster', None)
+    clock.now += 59
+    assert cache.get('no-poster') is None
+
+
+def test_non_positive_ttl_is_not_stored(clock):
+    cache = TTLCache(10, ttl=60, negative_ttl=0, clock=clock)
+    cache.set('no-poster', None)
+    cache.set('a', 1, ttl=0)
+    assert len(cache) == 0
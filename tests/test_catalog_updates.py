@@ -0,0 +1,113 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import model_store
+from catalog_updates import update_model
+from model_store import build_model, load_or_build
+from neighbors import build_neighbor_index
+
+K = 10
+
+RECORDS = [
+    # Edit an existing movie's text and rating
+    {'id': 1003, 'overview': 'a robot heist on a winter island', 'vote_average': 8.8},
+    # Add two movies, one of them reusing another movie's words
+    {'id': 9001, 'original_title': 'Ocean Robot Secret', 'overview': 'ocean robot secret storm',
+     'genres': "['Drama']", 'keywords': 'ocean robot', 'vote_average': 7.0, 'vote_count': 120,
+     'release_date': '2021-05-01'},
+    {'id': 9002, 'original_title': 'Desert King', 'overview': 'king of the desert empire',
+     'genres': "['Action']", 'keywords': 'desert king', 'vote_average': 6.1, 'vote_count': 40,
+     'release_date': '2022-01-11'},
+]
+
+
+def patched_csv(csv_path, records, tmp_path):
+    """The CSV with records applied by hand (the file an offline rebuild would read)"""
+    df = pd.read_csv(csv_path)
+    new_rows = []
+    for record in records:
+        rows = df.index[df['id'] == record['id']]
+        if len(rows):
+            for col, value in record.items():
+                df.loc[rows[0], col] = value
+        else:
+            new_rows.append(record)
+    df = pd.concat([df, pd.DataFrame(new_rows)], ignore_index=True)
+    path = tmp_path / 'patched.csv'
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_update_model_matches_rebuild_on_patched_csv(movies_csv, tmp_path):
+    model = build_model(movies_csv, k=K)
+    updated = update_model(model, RECORDS)
+    rebuilt = build_model(patched_csv(movies_csv, RECORDS, tmp_path), k=K)
+
+    pd.testing.assert_frame_equal(updated['df'], rebuilt['df'], check_dtype=False)
+    assert updated['indices'] == rebuilt['indices']
+
+    # A refit recomputes the idf over the new catalog, while update_model keeps
+    # the fitted vocabulary and idf until the next refit; so the vectors
+    # are those of the old vectorizer over the patched text...
+    expected = model['tfidf'].transform(rebuilt['df']['soup'])
+    np.testing.assert_allclose(updated['tfidf_matrix'].toarray(), expected.toarray(), rtol=0, atol=1e-12)
+
+    # ... and the neighbor tables exactly what a full build computes from them
+    ids, scores = build_neighbor_index(updated['tfidf_matrix'], k=K)
+    np.testing.assert_array_equal(updated['neighbor_ids'], ids)
+    np.testing.assert_array_equal(updated['neighbor_scores'], scores)
+
+
+def test_idf_preserving_edit_matches_refit(movies_csv, tmp_path):
+    # Swapping two movies' text leaves every document frequency (so the idf)
+    # unchanged: the updated model is then the refitted one
+    df = pd.read_csv(movies_csv)
+    a, b = df.iloc[4], df.iloc[11]
+    records = [
+        {'id': int(a['id']), 'overview': b['overview'], 'genres': b['genres'], 'keywords': b['keywords']},
+        {'id': int(b['id']), 'overview': a['overview'], 'genres': a['genres'], 'keywords': a['keywords']},
+    ]
+    model = build_model(movies_csv, k=K)
+    updated = update_model(model, records)
+    rebuilt = build_model(patched_csv(movies_csv, records, tmp_path), k=K)
+
+    pd.testing.assert_frame_equal(updated['df'], rebuilt['df'], check_dtype=False)
+    np.testing.assert_allclose(updated['tfidf_matrix'].toarray(), rebuilt['tfidf_matrix'].toarray(),
+                               rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(updated['neighbor_ids'], rebuilt['neighbor_ids'])
+    np.testing.assert_allclose(updated['neighbor_scores'], rebuilt['neighbor_scores'], rtol=0, atol=1e-6)
+
+
+def test_neighbor_ties_go_to_lower_rows():
+    # update_model merges candidates in this order, so it must match the full build
+    # Rows 1 and 2 are identical, so both tie for row 0's second place
+    matrix = sparse.csr_matrix(np.array([[1.0, 0.0], [0.6, 0.8], [0.6, 0.8], [0.0, 1.0]]))
+    ids, scores = build_neighbor_index(matrix, k=3, workers=1)
+    assert ids[0].tolist() == [0, 1, 2, 3]
+    assert scores[0, 1] == scores[0, 2]
+
+
+def test_concurrent_rebuilds_build_and_publish_once(movies_csv, tmp_path, monkeypatch):
+    builds = []
+
+    def slow_build(*args, **kwargs):
+        builds.append(1)
+        time.sleep(0.2)  # long enough for every worker to find the artifact missing
+        return build_model(*args, **kwargs)
+
+    monkeypatch.setattr(model_store, 'build_model', slow_build)
+    artifact_dir = str(tmp_path / 'model_artifact')
+    updates_path = str(tmp_path / 'catalog_updates.jsonl')
+    with ThreadPoolExecutor(4) as pool:
+        models = list(pool.map(lambda _: load_or_build(movies_csv, artifact_dir, k=K, updates_path=updates_path),
+                               range(4)))
+
+    assert len(builds) == 1
+    assert len({model['fingerprint'] for model in models}) == 1
+    versions = [entry for entry in os.listdir(tmp_path) if entry.startswith('.model_artifact-v-')]
+    assert versions == [os.path.basename(os.path.realpath(artifact_dir))]
@@ -0,0 +1,89 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from columnar import ColumnWriter, is_table, read_table
+from prepare_data import prepare
+
+SCHEMA = {'id': 'int64', 'title': 'str', 'rating': 'float64'}
+
+
+def chunk(ids, titles, ratings):
+    return pd.DataFrame({'id': ids, 'title': titles, 'rating': ratings})
+
+
+def test_chunks_round_trip(tmp_path):
+    path = tmp_path / 'movies'
+    writer = ColumnWriter(path, SCHEMA)
+    writer.append(chunk([1, 2], ['Amélie', '東京物語'], [7.5, np.nan]))
+    writer.append(chunk([], [], []))
+    writer.append(chunk([3, 4], ['', None], [0.0, 9.9]))
+    writer.close()
+
+    assert is_table(path) and not is_table(tmp_path)
+    df = read_table(path)
+    assert df['id'].tolist() == [1, 2, 3, 4]
+    # Empty text reads back as missing, like read_csv
+    assert df['title'][:2].tolist() == ['Amélie', '東京物語']
+    assert df['title'].isna().tolist() == [False, False, True, True]
+    np.testing.assert_array_equal(df['rating'], [7.5, np.nan, 0.0, 9.9])
+    assert read_table(path, columns=['title']).columns.tolist() == ['title']
+    assert [name for name in os.listdir(tmp_path) if name != 'movies'] == []
+
+
+def test_close_replaces_the_table_and_abort_leaves_nothing(tmp_path):
+    path = tmp_path / 'movies'
+    for ids in ([1, 2, 3], [9]):
+        writer = ColumnWriter(path, SCHEMA)
+        writer.append(chunk(ids, ['x'] * len(ids), [1.0] * len(ids)))
+        writer.close()
+    assert read_table(path)['id'].tolist() == [9]
+
+    writer = ColumnWriter(path, SCHEMA)
+    writer.append(chunk([5], ['y'], [2.0]))
+    writer.abort()
+    assert read_table(path)['id'].tolist() == [9]
+    assert sorted(os.listdir(tmp_path)) == ['movies']
+
+
+def tmdb_csvs(tmp_path, n=40):
+    rng = np.random.default_rng(5)
+    genres = [json.dumps([{'id': 1, 'name': 'Drama'}, {'id': 2, 'name': 'Comedy'}][:1 + i % 2]) for i in range(n)]
+    movies = pd.DataFrame({
+        'id': np.arange(100, 100 + n),
+        'original_title': [f'Movie {i}' for i in range(n)],
+        'overview': [f'story number {i}' if i % 7 else None for i in range(n)],
+        'genres': genres,
+        'keywords': [json.dumps([{'id': 3, 'name': f'kw{i % 4}'}]) for i in range(n)],
+        'vote_average': np.round(rng.uniform(4, 8, n), 1),
+        'vote_count': rng.integers(0, 5000, n),
+        'release_date': ['2001-01-01' if i % 5 else None for i in range(n)],
+    })
+    movies.loc[3, 'vote_average'] = 0.0  # an outlier step 2 drops
+    credits = pd.DataFrame({
+        'movie_id': movies['id'],
+        'title': movies['original_title'],
+        'cast': [json.dumps([{'name': f'Actor {j}'} for j in range(i % 8)]) for i in range(n)],
+        'crew': [json.dumps([{'name': 'Dir', 'job': 'Director'}, {'name': 'Ed', 'job': 'Editor'}])] * n,
+    })
+    movies_path, credits_path = tmp_path / 'movies.csv', tmp_path / 'credits.csv'
+    movies.to_csv(movies_path, index=False)
+    credits.to_csv(credits_path, index=False)
+    return movies_path, credits_path
+
+
+@pytest.mark.parametrize('chunksize', [7, 1000])
+def test_prepare_output_does_not_depend_on_the_chunk_size(tmp_path, chunksize):
+    movies_path, credits_path = tmdb_csvs(tmp_path)
+    prepare(movies_path, credits_path, tmp_path / 'one', chunksize=1000)
+    prepare(movies_path, credits_path, tmp_path / 'chunked', chunksize=chunksize)
+    expected, df = read_table(tmp_path / 'one'), read_table(tmp_path / 'chunked')
+    pd.testing.assert_frame_equal(df, expected)
+
+    assert 103 not in df['id'].tolist()
+    assert df.loc[0, 'genres'] == "['Drama']" and df.loc[1, 'genres'] == "['Drama', 'Comedy']"
+    assert df.loc[0, 'crew'] == "['Dir']"
+    assert df['vote_count_normalized'].between(0, 1).all()
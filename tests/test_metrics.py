@@ -0,0 +1,98 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from metrics import RETIRED_FILE, Registry
+
+
+@pytest.fixture
+def registry():
+    return Registry(buckets=(0.1, 1.0))
+
+
+def write_snapshot(directory, pid, registry):
+    with open(os.path.join(directory, f'metrics-{pid}.json'), 'w', encoding='utf-8') as f:
+        json.dump(registry.snapshot(), f)
+
+
+@pytest.fixture(scope='module')
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', ''])
+    process.wait()
+    return process.pid
+
+
+def test_render_counters_gauges_and_histograms(registry):
+    registry.describe('requests_total', 'Requests served')
+    registry.inc('requests_total', endpoint='search')
+    registry.inc('requests_total', 2, endpoint='search')
+    registry.inc('requests_total', endpoint='say "hi"\n')
+    registry.set('load_seconds', 1.5, phase='model')
+    for seconds in (0.05, 0.5, 3):
+        registry.observe('latency_seconds', seconds)
+
+    assert registry.render([registry.snapshot()]).splitlines() == [
+        '# HELP requests_total Requests served',
+        '# TYPE requests_total counter',
+        'requests_total{endpoint="say \\"hi\\"\\n"} 1',
+        'requests_total{endpoint="search"} 3',
+        '# TYPE load_seconds gauge',
+        'load_seconds{phase="model"} 1.5',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        'latency_seconds_sum 3.55',
+        'latency_seconds_count 3',
+    ]
+
+
+def test_workers_are_merged(registry):
+    other = Registry(buckets=(0.1, 1.0))
+    for worker, load in ((registry, 2), (other, 5)):
+        worker.inc('requests_total', 3)
+        worker.set('load_seconds', load)
+        worker.observe('latency_seconds', 0.5)
+
+    text = registry.render([registry.snapshot(), other.snapshot()])
+    assert 'requests_total 6' in text
+    assert 'load_seconds 5' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_sum 1' in text
+
+
+def test_exited_workers_are_folded_into_the_retired_totals(registry, tmp_path, dead_pid):
+    directory = str(tmp_path)
+    registry.inc('requests_total', 1)
+    live, dead = Registry(buckets=(0.1, 1.0)), Registry(buckets=(0.1, 1.0))
+    live.inc('requests_total', 10)
+    dead.inc('requests_total', 100)
+    dead.observe('latency_seconds', 0.05)
+    dead.set('load_seconds', 9)
+    write_snapshot(directory, os.getppid(), live)
+    write_snapshot(directory, dead_pid, dead)
+
+    for _ in range(2):  # the second collect must not count the dead worker again
+        text = registry.render(registry.collect(directory))
+        assert 'requests_total 111' in text
+        assert 'latency_seconds_count 1' in text
+        assert 'load_seconds' not in text
+
+    assert sorted(os.listdir(directory)) == sorted([
+        f'metrics-{os.getpid()}.json', f'metrics-{os.getppid()}.json', RETIRED_FILE, 'metrics.lock'])
+    with open(os.path.join(directory, RETIRED_FILE), encoding='utf-8') as f:
+        assert json.load(f)['gauges'] == []
+
+
+def test_a_snapshot_left_under_our_pid_is_retired_not_overwritten(registry, tmp_path):
+    directory = str(tmp_path)
+    previous = Registry(buckets=(0.1, 1.0))
+    previous.inc('requests_total', 7)
+    write_snapshot(directory, os.getpid(), previous)
+
+    registry.inc('requests_total', 1)
+    registry.flush(directory, force=True)
+    assert 'requests_total 8' in registry.render(registry.collect(directory))
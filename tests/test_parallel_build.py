@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from model_store import BASELINE_REPRESENTATION, fit_tfidf
+from neighbors import PARALLEL_MIN_ROWS, build_neighbor_index, parallel_search, search_neighbors
+
+
+@pytest.fixture(scope='module')
+def soup(make_movies):
+    # Enough rows for the parallel paths to split the work
+    df = make_movies(n=PARALLEL_MIN_ROWS + 300, seed=3)
+    return (df['overview'] + ' ' + df['genres'] + ' ' + df['keywords']).tolist()
+
+
+@pytest.fixture(scope='module')
+def tfidf_matrix(soup):
+    return fit_tfidf(soup, BASELINE_REPRESENTATION, workers=1)[1]
+
+
+def test_parallel_search_matches_serial(tfidf_matrix):
+    serial = search_neighbors(tfidf_matrix, tfidf_matrix, 11)
+    parallel = parallel_search(search_neighbors, tfidf_matrix, tfidf_matrix, 11, workers=2)
+    np.testing.assert_array_equal(parallel[0], serial[0])
+    np.testing.assert_array_equal(parallel[1], serial[1])
+
+
+def test_parallel_neighbor_index_matches_serial(tfidf_matrix):
+    serial = build_neighbor_index(tfidf_matrix, k=10, workers=1)
+    parallel = build_neighbor_index(tfidf_matrix, k=10, workers=3)
+    np.testing.assert_array_equal(parallel[0], serial[0])
+    np.testing.assert_array_equal(parallel[1], serial[1])
+
+
+def test_parallel_fit_tfidf_matches_serial(soup, tfidf_matrix):
+    serial_tfidf = fit_tfidf(soup, BASELINE_REPRESENTATION, workers=1)[0]
+    tfidf, matrix = fit_tfidf(soup, BASELINE_REPRESENTATION, workers=2)
+    assert list(tfidf.get_feature_names_out()) == list(serial_tfidf.get_feature_names_out())
+    np.testing.assert_array_equal(tfidf.idf_, serial_tfidf.idf_)
+    assert (matrix != tfidf_matrix).nnz == 0
+
+
+
+@pytest.mark.parametrize('limits', [{'min_df': 40}, {'max_features': 12}, {'vector_dtype': 'float32'}])
+def test_parallel_fit_tfidf_applies_vocabulary_limits_like_sklearn(soup, limits):
+    representation = dict(BASELINE_REPRESENTATION, **limits)
+    serial_tfidf, serial = fit_tfidf(soup, representation, workers=1)
+    tfidf, matrix = fit_tfidf(soup, representation, workers=2)
+    assert list(tfidf.get_feature_names_out()) == list(serial_tfidf.get_feature_names_out())
+    assert matrix.dtype == serial.dtype
+    assert (matrix != serial).nnz == 0
@@ -0,0 +1,168 @@
+"""PosterResolver against a local stub of the TMDB API"""
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from posters import TMDB_IMAGE_BASE, PosterResolver
+
+FAST, SLOW, NO_POSTER, BROKEN, HANGS = 101, 102, 103, 104, 105
+
+
+class StubTmdb(BaseHTTPRequestHandler):
+    """/movie/<id>: a poster path, or the status / delay set for that id in `behavior`"""
+    behavior = {}
+    calls = Counter()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        movie_id = int(self.path.split('?')[0].rstrip('/').rsplit('/', 1)[-1])
+        with self.lock:
+            self.calls[movie_id] += 1
+        delay, status = self.behavior.get(movie_id, (0.0, 200))
+        time.sleep(delay)
+        body = json.dumps({'poster_path': f'/{movie_id}.jpg'} if status == 200 else {'status_code': 34}).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:  # the client gave up (timeout test)
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def tmdb():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubTmdb)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}/3'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def stub_state():
+    StubTmdb.behavior = {SLOW: (0.5, 200), NO_POSTER: (0.0, 404), BROKEN: (0.0, 503), HANGS: (0.5, 200)}
+    StubTmdb.calls.clear()
+
+
+@pytest.fixture
+def make_resolver(tmdb, tmp_path):
+    def make(**options):
+        options = dict(dict(cache_path=str(tmp_path / 'posters.sqlite3'), timeout=2, deadline=2), **options)
+        return PosterResolver('test-key', base_url=tmdb, **options)
+    return make
+
+
+def poster(movie_id):
+    return f'{TMDB_IMAGE_BASE}/{movie_id}.jpg'
+
+
+def wait_until(condition, timeout=3):
+    stop = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < stop, 'timed out'
+        time.sleep(0.01)
+
+
+def stored(resolver, *movie_ids):
+    """Wait until the answers for movie_ids reached both caches (stored by a done callback,
+    which runs just after a waiting resolve_many has been released)"""
+    wait_until(lambda: all(m in resolver.memory for m in movie_ids)
+               and len(resolver.disk.get_many(list(movie_ids))) == len(movie_ids))
+
+
+def test_posters_are_fetched_once_then_cached(make_resolver):
+    resolver = make_resolver()
+    assert resolver.resolve_many([FAST, NO_POSTER, FAST]) == {FAST: poster(FAST), NO_POSTER: None}
+    assert resolver.resolve_many([FAST, NO_POSTER]) == {FAST: poster(FAST), NO_POSTER: None}
+    assert StubTmdb.calls == {FAST: 1, NO_POSTER: 1}
+    stored(resolver, FAST, NO_POSTER)
+
+    # A second worker (empty memory) is answered by the shared disk cache
+    assert make_resolver().resolve_many([FAST, NO_POSTER]) == {FAST: poster(FAST), NO_POSTER: None}
+    assert StubTmdb.calls == {FAST: 1, NO_POSTER: 1}
+
+
+def test_deadline_returns_partial_results_and_caches_late_ones(make_resolver):
+    resolver = make_resolver(deadline=0.1)
+    start = time.monotonic()
+    assert resolver.resolve_many([FAST, SLOW]) == {FAST: poster(FAST), SLOW: None}
+    assert time.monotonic() - start < 0.4
+
+    # The late answer lands in both caches once its request completes
+    stored(resolver, SLOW)
+    assert resolver.disk.get_many([SLOW])[SLOW][0] == poster(SLOW)
+    assert resolver.resolve_many([SLOW]) == {SLOW: poster(SLOW)}
+    assert StubTmdb.calls[SLOW] == 1
+
+
+def test_concurrent_batches_share_an_inflight_request(make_resolver):
+    resolver = make_resolver(deadline=0.05)
+    resolver.resolve_many([SLOW])
+    resolver.resolve_many([SLOW])
+    stored(resolver, SLOW)
+    assert StubTmdb.calls[SLOW] == 1
+
+
+@pytest.mark.parametrize('movie_id, options', [(BROKEN, {}), (HANGS, {'timeout': 0.1})])
+def test_server_errors_and_timeouts_are_not_cached(make_resolver, movie_id, options):
+    resolver = make_resolver(**options)
+    assert resolver.resolve(movie_id) is None
+    wait_until(lambda: not resolver._inflight)
+    assert movie_id not in resolver.memory
+    assert resolver.disk.get_many([movie_id]) == {}
+
+    # Retried on the next request
+    assert resolver.resolve(movie_id) is None
+    assert StubTmdb.calls[movie_id] == 2
+
+
+def test_negative_entries_expire_in_memory_and_on_disk(make_resolver):
+    resolver = make_resolver(negative_ttl=0.3)
+    assert resolver.resolve(NO_POSTER) is None
+    stored(resolver, NO_POSTER)
+
+    time.sleep(0.35)
+    assert NO_POSTER not in resolver.memory
+    assert resolver.disk.get_many([NO_POSTER]) == {}
+    assert resolver.resolve(NO_POSTER) is None
+    assert StubTmdb.calls[NO_POSTER] == 2
+
+    # Positive entries keep their longer ttl
+    assert resolver.resolve(FAST) == poster(FAST)
+    stored(resolver, FAST)
+    time.sleep(0.35)
+    assert resolver.resolve(FAST) == poster(FAST)
+    assert StubTmdb.calls[FAST] == 1
+
+
+def test_promotion_from_disk_keeps_the_remaining_ttl(make_resolver):
+    first = make_resolver(ttl=1.0)
+    first.resolve(FAST)
+    stored(first, FAST)
+    time.sleep(0.6)
+
+    # Promoted with ~0.4 s left, not a fresh ttl: gone from memory 0.5 s later
+    resolver = make_resolver(ttl=1.0)
+    assert resolver.resolve(FAST) == poster(FAST)
+    assert StubTmdb.calls[FAST] == 1
+    time.sleep(0.5)
+    assert FAST not in resolver.memory
+    assert resolver.resolve(FAST) == poster(FAST)
+    assert StubTmdb.calls[FAST] == 2
+
+
+def test_without_api_key_nothing_is_fetched(tmdb):
+    resolver = PosterResolver('', base_url=tmdb, cache_path='')
+    assert resolver.resolve_many([FAST, SLOW]) == {FAST: None, SLOW: None}
+    assert not StubTmdb.calls
+    assert FAST not in resolver.memory
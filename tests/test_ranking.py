@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from genre_index import GenreIndex
+from ranking import Rankings, weighted_ratings
+
+RATINGS = [9.0, 7.0, 10.0, np.nan, 7.0, 5.0]
+VOTES = [1000, 1000, 1, 50, 5000, 300]
+GENRES = ["['Drama']", "['Comedy']", "['Drama']", "['Drama']", "['Comedy', 'Drama']", "['Comedy']"]
+
+
+@pytest.fixture(scope='module')
+def rankings():
+    return Rankings(RATINGS, VOTES, GenreIndex(GENRES), quantile=0.5)
+
+
+def test_weighted_rating_formula():
+    weighted, mean, min_votes = weighted_ratings(RATINGS, VOTES, quantile=0.5)
+    assert mean == pytest.approx(7.6)
+    assert min_votes == 650
+    votes, ratings = np.array(VOTES, dtype=float), np.array(RATINGS)
+    expected = votes / (votes + 650) * ratings + 650 / (votes + 650) * 7.6
+    np.testing.assert_allclose(weighted, expected)
+    assert np.isnan(weighted[3])
+
+
+def test_a_handful_of_votes_is_pulled_towards_the_mean(rankings):
+    # The 10/10 film with one vote ranks below the 9/10 one with a thousand
+    assert rankings.weighted[2] == pytest.approx(7.6, abs=0.01)
+    assert rankings.top(2) == [0, 2]
+
+
+def test_order_puts_unrated_movies_last(rankings):
+    assert rankings.top(10) == [0, 2, 1, 4, 5, 3]
+    assert rankings.top(0) == []
+
+
+def test_ties_go_to_more_votes_then_table_order():
+    tied = Rankings([8.0, 8.0, 8.0], [10, 10, 20], GenreIndex([None] * 3))
+    assert tied.top(3) == [2, 0, 1]
+
+
+def test_genre_lookup_is_case_insensitive(rankings):
+    assert rankings.genre('drama') == rankings.genre('DRAMA') == 'Drama'
+    assert rankings.genre('Western') is None
+    assert rankings.top(10, genre='Drama') == [0, 2, 4, 3]
+    assert rankings.top(10, genre='Western') == []
+
+
+@pytest.mark.parametrize('genre, min_votes, rows', [(None, 500, [0, 1, 4]), (None, 1000, [0, 1, 4]),
+                                                     ('Drama', 100, [0, 4]), (None, 10 ** 6, [])])
+def test_min_votes_filters_without_reordering(rankings, genre, min_votes, rows):
+    assert rankings.top(10, genre=genre, min_votes=min_votes) == rows
+    assert rankings.top(1, genre=genre, min_votes=min_votes) == rows[:1]
+
+
+def test_top_endpoint_serves_the_rankings(api, client):
+    cat = api.catalog
+    titles = cat.movies_store.titles
+    data = client.get('/api/top?count=5&genre=drama&min_votes=400').get_json()
+    assert data['genre'] == 'Drama' and data['min_votes'] == 400
+    expected = cat.rankings.top(5, genre='Drama', min_votes=400)
+    assert [movie['title'] for movie in data['movies']] == [titles[row] for row in expected]
+    assert all(cat.rankings.votes[row] >= 400 for row in expected)
+
+
+def test_top_endpoint_rejects_an_unknown_genre(client):
+    response = client.get('/api/top?genre=Western')
+    assert response.status_code == 400
+    assert 'Western' in response.get_json()['error']
@@ -0,0 +1,33 @@
+import pytest
+
+
+def test_batch_matches_single_recommend(client, seed_titles, single_recommendations):
+    data = client.post('/api/recommend/batch', json={'movies': seed_titles}).get_json()
+    assert [result['base_title'] for result in data['results']] == seed_titles
+    for title, result in zip(seed_titles, data['results']):
+        assert result['recommendations'] == single_recommendations(title)
+
+
+def test_batch_reports_unknown_seeds(client, seed_titles, single_recommendations):
+    data = client.post('/api/recommend/batch', json={'movies': [seed_titles[0], 'No Such Film Anywhere']}).get_json()
+    assert data['results'][0]['recommendations'] == single_recommendations(seed_titles[0])
+    assert 'error' in data['results'][1]
+
+
+def test_batch_n_sets_the_length(client, seed_titles):
+    data = client.post('/api/recommend/batch', json={'movies': seed_titles[:1], 'n': 3}).get_json()
+    assert data['n'] == 3 and data['results'][0]['count'] == 3
+
+
+@pytest.mark.parametrize('body', [
+    {},
+    {'movies': []},
+    {'movies': 'Alien'},
+    {'movies': [None]},
+    {'movies': ['Alien', 5]},
+    {'movies': [{'title': 'Alien'}]},
+    {'movies': ['Alien'], 'n': True},
+    {'movies': ['Alien'], 'n': '5'},
+])
+def test_invalid_batches_are_rejected(client, body):
+    assert client.post('/api/recommend/batch', json=body).status_code == 400
@@ -0,0 +1,40 @@
+import pytest
+
+
+def test_profile_of_one_seed_matches_single_recommend(client, seed_titles, single_recommendations):
+    for title in seed_titles:
+        data = client.post('/api/recommend/profile', json={'movies': [title], 'n': 5}).get_json()
+        assert data['recommendations'] == single_recommendations(title)
+
+
+def test_profile_excludes_its_seeds_and_ranks_by_score(client, seed_titles):
+    seeds = [seed_titles[0], {'title': seed_titles[1], 'weight': 2}, {'title': seed_titles[2].upper()}]
+    data = client.post('/api/recommend/profile', json={'movies': seeds, 'n': 8}).get_json()
+    assert [seed['base_title'] for seed in data['seeds']] == seed_titles[:3]
+    assert [seed['weight'] for seed in data['seeds']] == [1, 2, 1]
+    titles = [card['title'] for card in data['recommendations']]
+    assert len(titles) == 8 and not set(titles) & set(seed_titles[:3])
+    scores = [card['score'] for card in data['recommendations']]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_profile_of_unknown_titles_is_404(client):
+    response = client.post('/api/recommend/profile', json={'movies': ['No Such Film Anywhere', '']})
+    assert response.status_code == 404
+    assert [seed['base_title'] for seed in response.get_json()['seeds']] == [None, None]
+
+
+@pytest.mark.parametrize('body', [
+    {},
+    {'movies': []},
+    {'movies': [None]},
+    {'movies': [0]},
+    {'movies': [{'title': False}]},
+    {'movies': [{'title': 5, 'weight': 1}]},
+    {'movies': [{'weight': 2}]},
+    {'movies': [{'title': 'Alien', 'weight': 0}]},
+    {'movies': [{'title': 'Alien', 'weight': True}]},
+    {'movies': ['Alien'], 'n': True},
+])
+def test_invalid_profiles_are_rejected(client, body):
+    assert client.post('/api/recommend/profile', json=body).status_code == 400
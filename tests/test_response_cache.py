@@ -0,0 +1,86 @@
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+from cache import TTLCache
+
+
+# Conditional GETs
+
+@pytest.mark.parametrize('path', ['/api/top?count=5', '/api/top?count=5&genre=drama',
+                                  '/api/movie/1004', '/api/search?q=love&limit=4'])
+def test_matching_etag_gets_304(client, path):
+    first = client.get(path)
+    assert first.status_code == 200 and first.headers['ETag']
+
+    again = client.get(path, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == first.headers['ETag']
+
+    other = client.get(path, headers={'If-None-Match': '"something-else"'})
+    assert other.status_code == 200
+    assert other.data == first.data
+
+
+def test_cached_json_sends_what_jsonify_would(api, client):
+    response = client.get('/api/top?count=5')
+    with api.app.app_context():
+        assert response.data == api.jsonify(response.get_json()).get_data()
+    assert response.mimetype == 'application/json'
+
+
+
+# Server-side cache
+
+@pytest.fixture
+def fresh_cache(api, monkeypatch):
+    cache = TTLCache(100, 60)
+    monkeypatch.setattr(api, 'response_cache', cache)
+    return cache
+
+
+def test_entries_are_keyed_by_model_version(api, fresh_cache):
+    builds = []
+
+    def build():
+        builds.append(1)
+        return len(builds)
+
+    old, new = SimpleNamespace(version='v1'), SimpleNamespace(version='v2')
+    assert api.cached(old, ('top', 5), build) == 1
+    assert api.cached(old, ('top', 5), build) == 1
+    assert api.cached(new, ('top', 5), build) == 2
+    assert fresh_cache.stats()['hits'] == 1 and fresh_cache.stats()['misses'] == 2
+    assert ('v1', 'top', 5) in fresh_cache and ('v2', 'top', 5) in fresh_cache
+
+
+def test_incomplete_values_get_the_retry_ttl(api, fresh_cache, monkeypatch):
+    monkeypatch.setattr(api, 'RESPONSE_CACHE_RETRY', 0)  # not stored at all
+    cat = SimpleNamespace(version='v1')
+    api.cached(cat, ('top', 5), lambda: {'poster': None}, complete=api.has_posters)
+    assert len(fresh_cache) == 0
+    api.cached(cat, ('top', 6), lambda: {'poster': 'url'}, complete=api.has_posters)
+    assert len(fresh_cache) == 1
+
+
+def test_repeated_recommendations_are_served_from_the_cache(client, fresh_cache, seed_titles):
+    first = client.post('/api/recommend', json={'movie': seed_titles[0]}).get_json()
+    hits = fresh_cache.stats()['hits']
+    assert client.post('/api/recommend', json={'movie': seed_titles[0]}).get_json() == first
+    assert fresh_cache.stats()['hits'] > hits
+
+
+def test_warm_up_prefills_searched_then_popular_titles(api, fresh_cache, monkeypatch, seed_titles):
+    monkeypatch.setattr(api, 'RESPONSE_CACHE_WARM', 3)
+    monkeypatch.setattr(api, 'search_counts', Counter())
+    cat = api.catalog
+    api.record_search(seed_titles[1])
+    api.warm_response_cache(cat)
+
+    searched = cat.indices[seed_titles[1]]
+    popular = [row for row in cat.title_index.rank_to_row.tolist() if row != searched][:2]
+    assert len(fresh_cache) == 3
+    for row in [searched] + popular:
+        assert (cat.version, 'recommend', row) in fresh_cache
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from genre_index import GenreIndex
+from search_index import SearchIndex, decode_cursor, encode_cursor
+from title_index import TitleIndex
+
+MOVIES = [
+    # title, genres, rating, votes, release date
+    ('War Games', "['Thriller']", 7.1, 900, '1983-06-03'),
+    ('The Long War of the Worlds', "['Science Fiction']", 6.0, 5000, '2005-06-29'),
+    ('War', "['Action']", 5.5, 100, '2007-08-24'),
+    ('Star Wars', "['Science Fiction', 'Action']", 8.2, 9000, '1977-05-25'),
+    ('Night Games', "['Horror']", 4.8, 300, None),
+    ('Warriors of the Night', "['Action', 'Horror']", 6.6, 40, '1979-02-09'),
+    ('Amélie', "['Comedy', 'Romance']", 7.8, 3000, '2001-04-25'),
+    ('Gamera', "['Science Fiction']", float('nan'), 10, '1965-11-26'),
+]
+
+
+@pytest.fixture(scope='module')
+def index():
+    titles, genres, ratings, votes, dates = (list(column) for column in zip(*MOVIES))
+    return SearchIndex(titles, ratings, dates, GenreIndex(genres), TitleIndex(titles, votes))
+
+
+def search(index, **kwargs):
+    rows, total = index.search(**kwargs)
+    return [MOVIES[row][0] for row in rows], total
+
+
+def test_exact_title_first_then_bm25(index):
+    titles, total = search(index, query='war')
+    # Rarer words ('wars', 'warriors') score higher, and among titles with
+    # 'war' the shorter 'War Games' beats the more voted 6-word title
+    assert titles == ['War', 'Star Wars', 'Warriors of the Night', 'War Games', 'The Long War of the Worlds']
+    assert total == 5
+
+
+def test_only_the_last_word_matches_as_a_prefix(index):
+    assert search(index, query='gam', sort='popularity') == (['War Games', 'Night Games', 'Gamera'], 3)
+    assert search(index, query='night gam') == (['Night Games'], 1)
+    assert search(index, query='nigh games') == ([], 0)
+
+
+def test_substring_fallback_when_no_word_matches(index):
+    assert search(index, query='meli') == (['Amélie'], 1)
+
+
+def test_facets_match_a_scan(index):
+    titles, total = search(index, genre='action', min_rating=6, year_to=1990, sort='rating')
+    expected = [title for title, genres, rating, _, date in sorted(MOVIES, key=lambda m: -np.nan_to_num(m[2]))
+                if 'Action' in genres and rating >= 6 and date and int(date[:4]) <= 1990]
+    assert (titles, total) == (expected, 2)
+
+
+def test_unknown_rating_and_year_are_excluded_by_range_filters(index):
+    assert 'Gamera' not in search(index, min_rating=0)[0]
+    assert 'Night Games' not in search(index, year_from=1900)[0]
+    assert search(index)[1] == len(MOVIES)
+
+
+@pytest.mark.parametrize('sort', ['relevance', 'popularity', 'rating'])
+def test_offset_pages_concatenate(index, sort):
+    full, total = search(index, query='', genre='', min_rating=0, sort=sort, limit=50)
+    pages = [search(index, min_rating=0, sort=sort, offset=offset, limit=2)[0] for offset in range(0, total, 2)]
+    assert sum(pages, []) == full
+
+
+# Cursors
+
+def test_cursor_round_trips():
+    assert decode_cursor(encode_cursor(40, 'v1'), 'v1') == 40
+
+
+@pytest.mark.parametrize('cursor', ['', 'not-base64!', encode_cursor(-1, 'v1')])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 'v1')
+
+
+def test_cursor_from_another_version_is_rejected():
+    with pytest.raises(ValueError, match='older dataset'):
+        decode_cursor(encode_cursor(40, 'v1'), 'v2')
+
+
+def test_search_pages_concatenate_to_one_page(client):
+    full = client.get('/api/search?q=space&limit=50').get_json()
+    assert full['total_matches'] > 6 and full['next_cursor'] is None
+
+    paged, cursor = [], None
+    while True:
+        page = client.get('/api/search', query_string={'q': 'space', 'limit': 3, 'cursor': cursor or ''})
+        assert page.status_code == 200
+        data = page.get_json()
+        assert data['total_matches'] == full['total_matches']
+        paged += data['movies']
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+    assert paged == full['movies']
+
+
+def test_search_rejects_stale_and_malformed_cursors(api, client):
+    stale = encode_cursor(3, 'old-' + api.catalog.version)
+    response = client.get('/api/search', query_string={'q': 'space', 'cursor': stale})
+    assert response.status_code == 400
+    assert 'older dataset' in response.get_json()['error']
+
+    response = client.get('/api/search', query_string={'q': 'space', 'cursor': 'garbage'})
+    assert response.status_code == 400
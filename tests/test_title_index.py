@@ -0,0 +1,90 @@
+import pytest
+
+from title_index import TitleIndex, bounded_edit_distance, fold
+
+TITLES = ['Amélie', 'Alien', 'Aliens', 'Alien', 'The Matrix', 'Up', 'Matrix Reloaded', 'Ed Wood', 'X']
+VOTES = [900, 50, 700, 8000, 6000, 300, 2000, 100, 5]
+
+
+@pytest.fixture(scope='module')
+def index():
+    return TitleIndex(TITLES, VOTES)
+
+
+def test_exact_title_is_its_first_row(index):
+    assert index.resolve('Alien') == (1, 'exact')
+
+
+@pytest.mark.parametrize('query, row', [('alien', 3), ('ALIENS', 2), ('amelie', 0), ('AMÉLIE', 0)])
+def test_case_and_accent_insensitive_match_the_most_popular_row(index, query, row):
+    assert index.resolve(query) == (row, 'case-insensitive')
+
+
+@pytest.mark.parametrize('query, row', [('matri', 4), ('reload', 6), ('lien', 3), ('méli', 0)])
+def test_partial_match_is_the_most_popular_title_containing_the_query(index, query, row):
+    assert index.resolve(query) == (row, 'partial')
+
+
+def test_unknown_title_resolves_to_nothing(index):
+    assert index.resolve('Gattaca') == (None, None)
+    assert index.resolve('') == (None, None)
+
+
+@pytest.mark.parametrize('query', ['x', 'p', 'd ', ' w', 'up', 'qz', 'é'])
+def test_short_queries_use_postings_and_match_a_scan(index, query):
+    folded = fold(query)
+    by_popularity = index.rank_to_row.tolist()
+    expected = [row for row in by_popularity if folded in fold(TITLES[row])]
+    assert index.rows_containing(query).tolist() == expected
+    assert index.find_substring(query) == (expected[0] if expected else None)
+
+
+# "Did you mean" suggestions
+
+@pytest.mark.parametrize('query, title', [('Amelei', 'Amélie'), ('The Matrx', 'The Matrix'), ('Alens', 'Aliens'),
+                                          ('matrix reloded', 'Matrix Reloaded')])
+def test_typos_suggest_the_intended_title_first(index, query, title):
+    assert index.suggest(query, n=3)[0] == title
+
+
+def test_suggestions_are_distinct_and_above_cutoff(index):
+    suggestions = index.suggest('Alein', n=5, cutoff=0.3)
+    assert len(suggestions) == len(set(suggestions))
+    assert set(suggestions) <= {'Alien', 'Aliens'}
+    assert index.suggest('zzzzzzzz', n=5, cutoff=0.5) == []
+    assert index.suggest('   ') == []
+
+
+@pytest.mark.parametrize('a, b, distance', [('matrix', 'matrix', 0), ('matrix', 'matirx', 1), ('alien', 'aliens', 1),
+                                            ('ed wood', 'eddwod', 2), ('up', 'amelie', 3)])
+def test_bounded_edit_distance(a, b, distance):
+    assert bounded_edit_distance(a, b, 2) == min(distance, 3)
+    assert bounded_edit_distance(b, a, 2) == min(distance, 3)
+
+
+# Prefix completion
+
+@pytest.mark.parametrize('prefix, titles', [
+    ('', ['Alien', 'The Matrix', 'Matrix Reloaded', 'Amélie', 'Aliens', 'Up', 'Ed Wood', 'X']),
+    ('a', ['Alien', 'Amélie', 'Aliens']),
+    ('ALI', ['Alien', 'Aliens']),      # precomputed prefixes
+    ('alie', ['Alien', 'Aliens']),     # sorted-range lookup
+    ('amé', ['Amélie']),
+    ('the matrix r', []),
+])
+def test_completions_are_distinct_titles_by_popularity(index, prefix, titles):
+    assert index.complete(prefix) == titles
+
+
+def test_completion_limit(index):
+    assert index.complete('', limit=2) == ['Alien', 'The Matrix']
+    assert index.complete('alie', limit=1) == ['Alien']
+
+
+def test_autocomplete_endpoint_answers_304_for_its_etag(client, api):
+    title = api.catalog.movies_store.titles[0]
+    first = client.get('/api/autocomplete', query_string={'prefix': title[:4]})
+    assert title in first.get_json()['titles']
+    again = client.get('/api/autocomplete', query_string={'prefix': title[:4]},
+                       headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
@@ -0,0 +1,56 @@
+import pytest
+
+
+@pytest.fixture
+def unloaded(api, monkeypatch):
+    """The API as it is before its model is loaded (restored afterwards)"""
+    monkeypatch.setattr(api, 'catalog', None)
+    monkeypatch.setitem(api.load_state, 'status', 'loading')
+    monkeypatch.setitem(api.load_state, 'error', None)
+    monkeypatch.setitem(api.load_state, 'seconds', None)
+    monkeypatch.setitem(api.app.config, 'MODEL_WARMUP', 'background')
+    return api
+
+
+def test_ready_is_503_until_the_model_is_loaded(unloaded, client):
+    response = client.get('/api/ready')
+    assert response.status_code == 503
+    assert response.get_json() == {'status': 'loading', 'error': None}
+
+    # Liveness and metrics answer meanwhile; model endpoints ask to retry
+    health = client.get('/api/health')
+    assert health.status_code == 200 and health.get_json()['ready'] is False
+    assert client.get('/metrics').status_code == 200
+    top = client.get('/api/top?count=3')
+    assert top.status_code == 503 and top.headers['Retry-After'] == '5'
+
+    unloaded.load_catalog()
+    response = client.get('/api/ready')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'ready'
+    assert response.get_json()['dataset_version'] == unloaded.catalog.version
+    assert client.get('/api/top?count=3').status_code == 200
+
+
+def test_ready_reports_a_failed_load(unloaded, client, monkeypatch):
+    def broken(*args, **kwargs):
+        raise OSError('artifact unreadable')
+
+    monkeypatch.setattr(unloaded, 'load_or_build', broken)
+    with pytest.raises(OSError):
+        unloaded.load_catalog()
+    response = client.get('/api/ready')
+    assert response.status_code == 503
+    assert response.get_json() == {'status': 'failed', 'error': 'artifact unreadable'}
+
+
+def test_lazy_mode_loads_on_the_first_request(unloaded, client, monkeypatch):
+    monkeypatch.setitem(unloaded.app.config, 'MODEL_WARMUP', 'lazy')
+    assert client.get('/api/ready').status_code == 503
+    assert client.get('/api/top?count=3').status_code == 200
+    assert client.get('/api/ready').status_code == 200
+
+
+def test_unknown_warmup_mode_is_rejected(api):
+    with pytest.raises(ValueError):
+        api.configure_app('sometimes')
@@ -0,0 +1,271 @@
+"""Prebuilt lookup structures for resolving user-typed movie titles.
+
+Built once at startup from the title column and a popularity column
+(vote_count). Every lookup is a dict hit or a trigram postings intersection;
+nothing scans the DataFrame per request.
+"""
+import heapq
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+
+NGRAM = 3
+
+# Fuzzy suggestions: postings are merged rarest-first until this many entries
+# have been read, then the best FUZZY_CANDIDATES titles are reranked
+FUZZY_POSTINGS_BUDGET = 60000
+FUZZY_CANDIDATES = 40
+
+# Prefix completion: top COMPLETE_MAX titles are precomputed for every prefix
+# up to PREFIX_CACHE_LEN characters; longer prefixes select from a sorted range
+PREFIX_CACHE_LEN = 3
+COMPLETE_MAX = 20
+
+
+def fold(text):
+    """Casefold and strip accents: 'Amélie' -> 'amelie'"""
+    text = unicodedata.normalize('NFKD', str(text).casefold())
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def ngrams(text, n=NGRAM):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def padded_ngrams(text, n=NGRAM):
+    """n-grams of ' text ', so word starts/ends and short titles get grams too"""
+    return ngrams(f' {text} ', n)
+
+
+def bounded_edit_distance(a, b, bound):
+    """Edit distance (insert / delete / substitute / swap adjacent) between a and b.
+
+    Returns bound + 1 as soon as the distance must exceed bound. Only cells
+    within bound of the diagonal are computed (the others already exceed it).
+    """
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    if len(a) < len(b):
+        a, b = b, a
+    over = bound + 1
+    before = None
+    previous = [j if j <= bound else over for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        current = [over] * (len(b) + 1)
+        if i <= bound:
+            current[0] = i
+        for j in range(max(1, i - bound), min(len(b), i + bound) + 1):
+            cb = b[j - 1]
+            # min() of three, spelled out: this loop is the hot path of suggest()
+            cost = previous[j - 1] + (ca != cb)
+            if previous[j] < cost:
+                cost = previous[j] + 1
+            if current[j - 1] < cost:
+                cost = current[j - 1] + 1
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb and before[j - 2] < cost:
+                cost = before[j - 2] + 1
+            current[j] = cost
+        if min(current) > bound:
+            return over
+        before, previous = previous, current
+    return min(previous[-1], over)
+
+
+class TitleIndex:
+    """Title resolution with the same tiers as /api/recommend.
+
+    - exact: first row with that exact title
+    - case-insensitive: casefolded (then accent-folded) title, most popular row
+    - partial: folded substring match, most popular row
+
+    suggest() gives "did you mean" titles for queries that resolve to nothing;
+    complete() gives popularity-ranked completions for a typed prefix.
+
+    Rows are ranked by descending popularity (ties keep table order, NaN last);
+    postings hold ranks, so the first verified candidate is the most popular.
+    """
+
+    def __init__(self, titles, popularity):
+        self.titles = ['' if t is None or t != t else str(t) for t in titles]
+        popularity = np.asarray(popularity, dtype=np.float64)
+        popularity = np.where(np.isnan(popularity), -np.inf, popularity)
+        # rank -> row, most popular first
+        self.rank_to_row = np.argsort(-popularity, kind='stable').astype(np.int32)
+
+        self.exact = {}
+        for row, title in enumerate(self.titles):
+            self.exact.setdefault(title, row)
+
+        self.casefolded = {}
+        self.folded = {}
+        self.folded_by_rank = []
+        postings = {}
+        for rank, row in enumerate(self.rank_to_row.tolist()):
+            title = self.titles[row]
+            folded = fold(title)
+            self.casefolded.setdefault(title.casefold(), row)
+            self.folded.setdefault(folded, row)
+            self.folded_by_rank.append(folded)
+            # Padded grams are a superset of the plain ones used by substring search
+            for gram in padded_ngrams(folded):
+                postings.setdefault(gram, []).append(rank)
+        self.postings = {gram: np.array(ranks, dtype=np.int32) for gram, ranks in postings.items()}
+        # Queries shorter than a trigram: every character of a title is the
+        # middle of one of its padded trigrams, so the titles containing a 1-2
+        # character query are the union of the postings of the padded grams
+        # whose tail starts with it (gram[1] / gram[1:])
+        self.short_grams = {}
+        for gram in self.postings:
+            self.short_grams.setdefault(gram[1], []).append(gram)
+            self.short_grams.setdefault(gram[1:], []).append(gram)
+        self.gram_counts = np.array([len(padded_ngrams(t)) for t in self.folded_by_rank], dtype=np.int32)
+
+        # Prefix completion over distinct titles, each at its most popular rank
+        best_rank = {}
+        for rank, row in enumerate(self.rank_to_row.tolist()):
+            best_rank.setdefault(self.titles[row], rank)
+        entries = sorted((self.folded_by_rank[rank], rank) for rank in best_rank.values())
+        self.prefix_keys = [key for key, _ in entries]
+        self.prefix_ranks = np.array([rank for _, rank in entries], dtype=np.int32)
+        prefix_top = {'': sorted(best_rank.values())[:COMPLETE_MAX]}
+        for key, rank in entries:
+            for length in range(1, min(len(key), PREFIX_CACHE_LEN) + 1):
+                prefix_top.setdefault(key[:length], []).append(rank)
+        self.prefix_top = {p: sorted(ranks)[:COMPLETE_MAX] for p, ranks in prefix_top.items()}
+
+    def __len__(self):
+        return len(self.titles)
+
+    def candidates(self, folded_query):
+        """Ranks whose folded title may contain folded_query, most popular first"""
+        grams = ngrams(folded_query)
+        if not grams:
+            lists = self.short_postings(folded_query)
+            return np.unique(np.concatenate(lists)).tolist() if lists else []
+        lists = []
+        for gram in grams:
+            ranks = self.postings.get(gram)
+            if ranks is None:
+                return []
+            lists.append(ranks)
+        lists.sort(key=len)
+        ranks = lists[0]
+        for other in lists[1:]:
+            ranks = np.intersect1d(ranks, other, assume_unique=True)
+            if not len(ranks):
+                break
+        return ranks.tolist()
+
+    def short_postings(self, folded_query):
+        """Postings (rank arrays) covering every title that contains a 1-2 character query"""
+        return [self.postings[gram] for gram in self.short_grams.get(folded_query, [])]
+
+    def rows_containing(self, query):
+        """Rows of all titles containing query (case/accent-insensitive), most popular first"""
+        folded_query = fold(query)
+        if not folded_query:
+            return np.empty(0, dtype=np.int32)
+        ranks = [rank for rank in self.candidates(folded_query) if folded_query in self.folded_by_rank[rank]]
+        return self.rank_to_row[np.asarray(ranks, dtype=np.intp)]
+
+    def find_substring(self, query):
+        """Row of the most popular title containing query (case/accent-insensitive)"""
+        folded_query = fold(query)
+        if not folded_query:
+            return None
+        if len(folded_query) < NGRAM:
+            # Postings are sorted by rank: merge lazily and stop at the first hit
+            ranks = heapq.merge(*self.short_postings(folded_query))
+        else:
+            ranks = self.candidates(folded_query)
+        for rank in ranks:
+            if folded_query in self.folded_by_rank[rank]:
+                return int(self.rank_to_row[rank])
+        return None
+
+    def suggest(self, query, n=5, cutoff=0.3):
+        """Up to n distinct titles close to query, best first.
+
+        Candidates are the titles sharing the most trigrams with the query
+        (postings read rarest-first within a budget, so very common trigrams
+        are pruned), reranked by edit-distance similarity 1 - distance /
+        max(len); titles scoring below cutoff are dropped.
+        """
+        folded_query = fold(query)
+        if not folded_query.strip():
+            return []
+        grams = padded_ngrams(folded_query)
+
+        lists = sorted((self.postings[g] for g in grams if g in self.postings), key=len)
+        if not lists:
+            return []
+        budget = FUZZY_POSTINGS_BUDGET
+        for used, ranks in enumerate(lists):
+            budget -= len(ranks)
+            if budget < 0 and used > 0:
+                lists = lists[:used]
+                break
+
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.folded_by_rank))
+        hit_ranks = np.flatnonzero(shared)
+        # Dice coefficient over trigram sets
+        dice = 2.0 * shared[hit_ranks] / (len(grams) + self.gram_counts[hit_ranks])
+        if len(hit_ranks) > FUZZY_CANDIDATES:
+            top = np.argpartition(-dice, FUZZY_CANDIDATES - 1)[:FUZZY_CANDIDATES]
+            hit_ranks, dice = hit_ranks[top], dice[top]
+
+        # Rerank best-trigram-first; once n titles are in hand, later candidates
+        # only need to beat the n-th best, which tightens the distance bound
+        order = np.lexsort((hit_ranks, -dice))
+        best = {}
+        threshold = cutoff
+        for rank, gram_score in zip(hit_ranks[order].tolist(), dice[order].tolist()):
+            folded = self.folded_by_rank[rank]
+            longest = max(len(folded), len(folded_query))
+            bound = int((1 - threshold) * longest + 1e-9)
+            distance = bounded_edit_distance(folded_query, folded, bound)
+            if distance > bound:
+                continue
+            similarity = 1 - distance / longest
+            title = self.titles[self.rank_to_row[rank]]
+            if title not in best:
+                best[title] = (-similarity, -gram_score, rank)
+                if len(best) >= n:
+                    nth = sorted((-key[0] for key in best.values()), reverse=True)[n - 1]
+                    threshold = max(threshold, nth)
+
+        ranked = sorted(best, key=best.get)
+        return ranked[:n]
+
+    def complete(self, prefix, limit=10):
+        """Up to limit distinct titles starting with prefix, most popular first"""
+        limit = min(limit, COMPLETE_MAX)
+        key = fold(prefix)
+        if len(key) <= PREFIX_CACHE_LEN:
+            ranks = self.prefix_top.get(key, [])[:limit]
+        else:
+            lo = bisect_left(self.prefix_keys, key)
+            hi = bisect_left(self.prefix_keys, key + '\U0010ffff', lo)
+            ranks = self.prefix_ranks[lo:hi]
+            if len(ranks) > limit:
+                ranks = np.partition(ranks, limit - 1)[:limit]
+            ranks = np.sort(ranks).tolist()
+        return [self.titles[self.rank_to_row[rank]] for rank in ranks]
+
+    def resolve(self, query):
+        """Return (row, match_type) or (None, None)"""
+        row = self.exact.get(query)
+        if row is not None:
+            return row, 'exact'
+
+        row = self.casefolded.get(query.casefold())
+        if row is None:
+            row = self.folded.get(fold(query))
+        if row is not None:
+            return row, 'case-insensitive'
+
+        row = self.find_substring(query)
+        if row is not None:
+            return row, 'partial'
+        return None, None